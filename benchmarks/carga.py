@@ -0,0 +1,519 @@
+"""Teste de carga dos handlers do bot contra um Discord falso, em processo e sem rede.
+
+Monta um servidor sintético no estado do cliente (como depois do GUILD_CREATE) e troca a
+camada REST por um DiscordFalso, que responde às rotas usadas pelo bot (criar canal,
+enviar mensagem) e emite os eventos do gateway correspondentes. Interações (botões,
+modals, autocompletar) são objetos falsos com guild, membro e canal reais.
+
+Cenários, cada um com vazão e latências p50/p99:
+  aniversarios    carga do índice, consulta do dia, filtro por servidor e lote de envio
+                  (individual e consolidado) para cada tamanho em --registros
+  tickets         rajada de envios do modal de ticket (cada usuário envia duas vezes)
+  fechar_ticket   checagem de permissão do botão de fechar (dono, admin, suporte, outro)
+  salvar_dados    tempestade de comandos que alteram configurações (gravações e atraso do loop)
+  autocompletar   consultas de prefixo de cargos, canais e categorias
+
+Uso: python benchmarks/carga.py [--registros 10000 100000 1000000] [--saida carga.json]
+                                [--comparar anterior.json] [--cenarios tickets autocompletar]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+
+from memoria import RAIZ, rss_mb, usuario
+
+CENARIOS = ("aniversarios", "tickets", "fechar_ticket", "salvar_dados", "autocompletar")
+METRICAS_COMPARADAS = {"p50_ms": 1, "p99_ms": 1, "vazao_por_s": -1}  # 1: menor é melhor
+PALAVRAS = ("suporte", "geral", "vendas", "financeiro", "marketing", "projetos", "equipe", "avisos",
+            "produto", "design", "dados", "infra", "jurídico", "compras", "eventos", "comercial")
+
+GUILD_ID = 900
+BOT_ID = 1
+ADMIN_ID = 2
+CARGO_ADMIN_ID = 910
+CATEGORIA_TICKETS_ID = 920
+CANAL_ANIVERSARIOS_ID = 921
+PRIMEIRO_USUARIO = 10_000
+PRIMEIRO_ANIVERSARIANTE = 10_000_000
+
+def estatisticas(latencias, duracao=None):
+    """Vazão e percentis (em ms) de uma lista de latências em segundos."""
+    if not latencias:
+        return {"operacoes": 0}
+    ordenadas = sorted(latencias)
+
+    def percentil(p):
+        return round(ordenadas[min(len(ordenadas) - 1, int(p / 100 * len(ordenadas)))] * 1000, 4)
+
+    duracao = sum(latencias) if duracao is None else duracao
+    return {
+        "operacoes": len(ordenadas),
+        "vazao_por_s": round(len(ordenadas) / duracao, 1) if duracao > 0 else None,
+        "p50_ms": percentil(50),
+        "p99_ms": percentil(99),
+        "max_ms": round(ordenadas[-1] * 1000, 4),
+    }
+
+def medir_chamadas(funcao, argumentos):
+    """Chama funcao(*args) para cada item e devolve as latências."""
+    latencias = []
+    for args in argumentos:
+        inicio = time.perf_counter()
+        funcao(*args)
+        latencias.append(time.perf_counter() - inicio)
+    return latencias
+
+# ===== DISCORD FALSO =====
+def cargo(role_id, nome, permissoes=0, posicao=1):
+    return {"id": str(role_id), "name": nome, "permissions": str(permissoes), "position": posicao,
+            "color": 0, "hoist": False, "managed": False, "mentionable": False}
+
+def canal(channel_id, nome, tipo=0, categoria=None, posicao=0):
+    return {"id": str(channel_id), "type": tipo, "name": nome, "position": posicao,
+            "parent_id": str(categoria) if categoria else None, "permission_overwrites": []}
+
+def membro(user_id, cargos=()):
+    return {"user": usuario(user_id), "roles": [str(c) for c in cargos], "joined_at": "2024-01-01T00:00:00+00:00",
+            "deaf": False, "mute": False, "flags": 0}
+
+def servidor_sintetico(bot, membros, itens):
+    """Servidor com o bot (admin), cargos de suporte, categoria de tickets e itens para o autocompletar."""
+    cargos_suporte = sorted({info["role_id"] for info in bot.SUPPORT_TYPES.values()})
+    roles = [cargo(GUILD_ID, "@everyone", posicao=0), cargo(CARGO_ADMIN_ID, "Admin", permissoes=8, posicao=2)]
+    roles += [cargo(role_id, f"Suporte {i}") for i, role_id in enumerate(cargos_suporte)]
+    channels = [canal(CATEGORIA_TICKETS_ID, "Tickets", tipo=4), canal(CANAL_ANIVERSARIOS_ID, "aniversarios")]
+
+    proximo_id = 100_000
+    for i in range(itens):
+        palavra = PALAVRAS[i % len(PALAVRAS)]
+        roles.append(cargo(proximo_id, f"{palavra.title()} {i}"))
+        channels.append(canal(proximo_id + 1, f"{palavra}-{i}"))
+        if i % 10 == 0:
+            channels.append(canal(proximo_id + 2, f"{palavra.upper()} {i}", tipo=4))
+        proximo_id += 3
+
+    members = [membro(BOT_ID, [CARGO_ADMIN_ID]), membro(ADMIN_ID, [CARGO_ADMIN_ID])]
+    for i in range(membros):
+        # Um em cada dez usuários tem um cargo de suporte
+        cargos = [cargos_suporte[i % len(cargos_suporte)]] if i % 10 == 0 else []
+        members.append(membro(PRIMEIRO_USUARIO + i, cargos))
+
+    return {"id": str(GUILD_ID), "name": "Servidor sintético", "owner_id": str(ADMIN_ID), "member_count": len(members),
+            "large": True, "roles": roles, "channels": channels, "members": members}
+
+class RespostaHTTPFalsa:
+    def __init__(self, status, reason):
+        self.status = status
+        self.reason = reason
+
+class DiscordFalso:
+    """Responde às rotas REST do bot em memória e emite os eventos do gateway de cada resposta."""
+
+    def __init__(self, discord, estado, latencia=0.0):
+        self.discord = discord
+        self.estado = estado
+        self.latencia = latencia
+        self.chamadas = Counter()
+        self.proximo_id = 10 ** 15
+        self.rotas = {
+            ("POST", "/guilds/{guild_id}/channels"): self.criar_canal,
+            ("POST", "/channels/{channel_id}/messages"): self.enviar_mensagem,
+        }
+
+    def novo_id(self):
+        self.proximo_id += 1
+        return str(self.proximo_id)
+
+    async def request(self, route, *, json=None, form=None, files=None, reason=None, **kwargs):
+        self.chamadas[f"{route.method} {route.path}"] += 1
+        if self.latencia:
+            await asyncio.sleep(self.latencia)
+        rota = self.rotas.get((route.method, route.path))
+        if rota is None:
+            raise self.discord.NotFound(RespostaHTTPFalsa(404, "Not Found"), f"Rota não simulada: {route.path}")
+        if form:
+            # Envio com anexos: o JSON vai no campo payload_json do multipart
+            json = self.discord.utils._from_json(form[0]["value"])
+        return rota(route, json or {})
+
+    def criar_canal(self, route, dados):
+        resposta = {
+            "id": self.novo_id(), "guild_id": str(route.guild_id), "type": dados["type"], "name": dados["name"],
+            "position": 0, "parent_id": dados.get("parent_id"), "topic": dados.get("topic"),
+            "permission_overwrites": [{**o, "id": str(o["id"])} for o in dados.get("permission_overwrites", [])],
+        }
+        self.estado.parse_channel_create(resposta)  # CHANNEL_CREATE
+        return resposta
+
+    def enviar_mensagem(self, route, dados):
+        return {
+            "id": self.novo_id(), "channel_id": str(route.channel_id), "type": 0,
+            "content": dados.get("content") or "", "author": usuario(BOT_ID),
+            "timestamp": datetime.now(timezone.utc).isoformat(), "edited_timestamp": None, "tts": False,
+            "mention_everyone": False, "mentions": [], "mention_roles": [], "attachments": [],
+            "embeds": dados.get("embeds", []), "components": dados.get("components", []), "pinned": False,
+        }
+
+class RespostaInteracaoFalsa:
+    def __init__(self):
+        self.feita = False
+        self.mensagens = []
+
+    def is_done(self):
+        return self.feita
+
+    async def defer(self, **kwargs):
+        self.feita = True
+
+    async def send_message(self, content=None, **kwargs):
+        self.feita = True
+        self.mensagens.append(content)
+
+class AcompanhamentoFalso:
+    def __init__(self):
+        self.mensagens = []
+
+    async def send(self, content=None, **kwargs):
+        self.mensagens.append(content)
+
+class InteracaoFalsa:
+    """O suficiente de discord.Interaction para os callbacks do bot (respostas ficam em memória)."""
+
+    def __init__(self, client, guild, user, channel=None):
+        self.client = client
+        self.guild = guild
+        self.guild_id = guild.id
+        self.user = user
+        self.channel = channel
+        self.channel_id = channel.id if channel else None
+        self.response = RespostaInteracaoFalsa()
+        self.followup = AcompanhamentoFalso()
+
+    def respostas(self):
+        return self.response.mensagens + self.followup.mensagens
+
+# ===== CENÁRIOS =====
+def aniversarios_sinteticos(quantidade):
+    """Registros com datas espalhadas pelo ano (inclusive 29/02), como no aniversarios.json."""
+    aleatorio = random.Random(quantidade)
+    registros = {}
+    for i in range(quantidade):
+        nascimento = date(2000, 1, 1) + timedelta(days=aleatorio.randrange(366))
+        ano = aleatorio.randint(1950, 2010)
+        if (nascimento.month, nascimento.day) == (2, 29):
+            ano = 2000  # Precisa ser bissexto
+        registros[str(PRIMEIRO_ANIVERSARIANTE + i)] = {
+            "nome": f"Pessoa {i}",
+            "data_nascimento": nascimento.replace(year=ano).isoformat(),
+            "link_foto": "",
+        }
+    return registros
+
+async def cenario_aniversarios(bot, guild, tamanhos):
+    """Índice, consultas e lote de envio para cada quantidade de registros."""
+    resultados = {}
+    hoje = bot.hoje_local()
+    bot.definir_config("aniversario_channels", guild.id, CANAL_ANIVERSARIOS_ID)
+
+    for quantidade in tamanhos:
+        caminho = bot.CAMINHOS_ANIVERSARIOS[0]
+        if os.path.exists(caminho):
+            os.remove(caminho)
+        futuro = bot.armazenamento.salvar_aniversarios(aniversarios_sinteticos(quantidade))
+        if futuro is not None:
+            await asyncio.wrap_future(futuro)
+        # 80% dos aniversariantes estão no servidor
+        bot.membros_por_servidor[guild.id] = {
+            PRIMEIRO_ANIVERSARIANTE + i for i in range(quantidade) if i % 5
+        } | {m.id for m in guild.members}
+
+        rss_antes = rss_mb()
+        inicio = time.perf_counter()
+        bot.atualizar_indice_aniversarios(forcar=True)
+        carga = time.perf_counter() - inicio
+
+        dias = [(d.month, d.day) for d in (date(2000, 1, 1) + timedelta(days=i) for i in range(366))]
+        consulta = medir_chamadas(bot.aniversariantes_do_dia, dias * 5)
+        do_dia = bot.verificar_aniversariantes()
+        filtro = medir_chamadas(bot.aniversariantes_no_servidor, [(guild, do_dia)] * 50)
+
+        lotes = {}
+        for modo, consolidado in (("lote_individual", None), ("lote_consolidado", True)):
+            bot.definir_modelo_aniversario(guild.id, "consolidado", consolidado)
+            bot.mensagens_enviadas_hoje.clear()
+            inicio = time.perf_counter()
+            await bot.executar_lote_aniversarios([guild])
+            duracao = time.perf_counter() - inicio
+            enviadas = len(bot.mensagens_enviadas_hoje.get(hoje.isoformat(), {}).get(str(guild.id), ()))
+            lotes[modo] = {
+                "aniversariantes": enviadas,
+                "duracao_s": round(duracao, 3),
+                "vazao_por_s": round(enviadas / duracao, 1) if duracao > 0 else None,
+            }
+
+        resultados[str(quantidade)] = {
+            "carga_indice": {"duracao_s": round(carga, 3), "vazao_por_s": round(quantidade / carga, 1),
+                             "rss_mb": round(rss_mb() - rss_antes, 1)},
+            "consulta_dia": estatisticas(consulta),
+            "filtro_servidor": {**estatisticas(filtro), "aniversariantes_hoje": len(do_dia)},
+            **lotes,
+        }
+    return resultados
+
+async def cenario_tickets(bot, guild, usuarios, discord_falso):
+    """Rajada de modals de ticket: cada usuário envia o mesmo tipo duas vezes ao mesmo tempo."""
+    tipo, info = next(iter(bot.registro_suporte(guild.id)["tipos"].items()))
+    membros = [guild.get_member(PRIMEIRO_USUARIO + i) for i in range(usuarios)]
+
+    async def enviar(member):
+        modal = bot.TicketSupportModal(tipo, info)
+        modal.assunto._value = "Não consigo acessar"
+        modal.descricao._value = "Detalhes do problema para o teste de carga"
+        interacao = InteracaoFalsa(bot.bot, guild, member)
+        inicio = time.perf_counter()
+        await modal.on_submit(interacao)
+        return time.perf_counter() - inicio, interacao.respostas()
+
+    canais_antes = discord_falso.chamadas["POST /guilds/{guild_id}/channels"]
+    inicio = time.perf_counter()
+    resultados = await asyncio.gather(*(enviar(m) for m in membros for _ in range(2)))
+    duracao = time.perf_counter() - inicio
+
+    respostas = [r for _, mensagens in resultados for r in mensagens]
+    return {
+        **estatisticas([latencia for latencia, _ in resultados], duracao),
+        "usuarios": usuarios,
+        "canais_criados": discord_falso.chamadas["POST /guilds/{guild_id}/channels"] - canais_antes,
+        "duplicados_evitados": sum(1 for r in respostas if r and r.startswith("ℹ️")),
+        "erros": sum(1 for r in respostas if r and r.startswith("❌")),
+    }
+
+async def cenario_fechar_ticket(bot, guild, repeticoes):
+    """Botão de fechar em cada ticket aberto, clicado pelo dono, um admin, um suporte e um estranho."""
+    abertos = [(int(channel_id), t["owner_id"]) for channel_id, t in bot.tickets.items() if t["status"] == "aberto"]
+    suporte = guild.get_member(PRIMEIRO_USUARIO)  # i % 10 == 0: tem cargo de suporte
+    admin = guild.get_member(ADMIN_ID)
+    view = bot.TicketCloseView()
+
+    latencias = []
+    negados = 0
+    for _ in range(repeticoes):
+        for channel_id, owner_id in abertos:
+            canal_ticket = guild.get_channel(channel_id)
+            estranho = guild.get_member(PRIMEIRO_USUARIO + 1 + (owner_id - PRIMEIRO_USUARIO) % 9)
+            for member in (guild.get_member(owner_id), admin, suporte, estranho):
+                interacao = InteracaoFalsa(bot.bot, guild, member, canal_ticket)
+                inicio = time.perf_counter()
+                await view.close_ticket.callback(interacao)
+                latencias.append(time.perf_counter() - inicio)
+                negados += interacao.respostas()[0].startswith("❌")
+    return {**estatisticas(latencias), "tickets": len(abertos), "negados": negados}
+
+async def cenario_salvar_dados(bot, comandos, servidores):
+    """Comandos que alteram configurações em rajadas; mede a chamada, as gravações e o atraso do loop."""
+    gravacoes = Counter()
+
+    def contar(objeto, metodo):
+        original = getattr(objeto, metodo)
+        def contado(*args, **kwargs):
+            gravacoes[metodo] += 1
+            return original(*args, **kwargs)
+        setattr(objeto, metodo, contado)
+
+    contar(bot.gravador_dados, "gravar")
+    if hasattr(bot.armazenamento, "executar"):
+        contar(bot.armazenamento, "executar")
+
+    atrasos = []
+    rodando = True
+
+    async def monitorar_loop():
+        while rodando:
+            inicio = time.perf_counter()
+            await asyncio.sleep(0.001)
+            atrasos.append(max(0.0, time.perf_counter() - inicio - 0.001))
+
+    monitor = asyncio.create_task(monitorar_loop())
+    aleatorio = random.Random(comandos)
+    latencias = []
+    inicio = time.perf_counter()
+    for i in range(comandos):
+        guild_id = GUILD_ID + 1 + aleatorio.randrange(servidores)
+        t = time.perf_counter()
+        if i % 2:
+            bot.definir_config("ticket_limites", guild_id, aleatorio.randint(1, 5))
+        else:
+            bot.definir_config("aniversario_horarios", guild_id, aleatorio.randrange(24))
+        latencias.append(time.perf_counter() - t)
+        if i % 200 == 199:
+            await asyncio.sleep(0.005)  # Comandos chegam em rajadas de 200
+    duracao_rajadas = time.perf_counter() - inicio
+
+    # Esperar a última janela de gravação
+    while bot.gravador_dados.pendente():
+        await asyncio.sleep(0.05)
+    await asyncio.sleep(0.1)
+    rodando = False
+    await monitor
+
+    return {
+        **estatisticas(latencias, duracao_rajadas),
+        "servidores": servidores,
+        "armazenamento": bot.armazenamento.nome,
+        "gravacoes_arquivo": gravacoes["gravar"],
+        "escritas_banco": gravacoes["executar"],
+        "atraso_loop": {k: v for k, v in estatisticas(atrasos).items() if k.endswith("_ms")},
+        "tamanho_arquivo_kb": round(os.path.getsize(bot.ARQUIVO_DADOS) / 1024, 1) if os.path.exists(bot.ARQUIVO_DADOS) else None,
+    }
+
+async def cenario_autocompletar(bot, guild, consultas):
+    """Primeira consulta (monta os índices) e consultas de prefixo de 0 a 4 letras."""
+    interacao = InteracaoFalsa(bot.bot, guild, guild.get_member(ADMIN_ID))
+    bot.indices_autocompletar.pop(guild.id, None)
+    inicio = time.perf_counter()
+    await bot.autocompletar_canais(interacao, "")
+    montagem = time.perf_counter() - inicio
+
+    aleatorio = random.Random(consultas)
+    resultados = {"montagem_indices_ms": round(montagem * 1000, 3)}
+    for tipo, funcao in (("cargos", bot.autocompletar_cargos), ("canais", bot.autocompletar_canais),
+                         ("categorias", bot.autocompletar_categorias)):
+        latencias = []
+        vazias = 0
+        for _ in range(consultas):
+            texto = aleatorio.choice(PALAVRAS)[:aleatorio.randint(0, 4)]
+            inicio = time.perf_counter()
+            escolhas = await funcao(interacao, texto)
+            latencias.append(time.perf_counter() - inicio)
+            vazias += not escolhas
+        resultados[tipo] = {**estatisticas(latencias), "sem_resultado": vazias}
+    return resultados
+
+# ===== EXECUÇÃO =====
+def versao():
+    try:
+        return subprocess.run(["git", "-C", RAIZ, "describe", "--always", "--dirty"],
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+async def executar(args):
+    sys.path.insert(0, RAIZ)
+    os.chdir(tempfile.mkdtemp())  # O bot não deve tocar nos arquivos de dados do repositório
+    os.environ.setdefault("BOT_LOG_NIVEL", "WARNING")
+    os.environ.setdefault("BOT_BUSCA_DB", "busca.db")
+    if args.armazenamento:
+        os.environ["BOT_ARMAZENAMENTO"] = args.armazenamento
+    import discord
+    import bot
+
+    bot.carregar_dados()
+    cliente = bot.bot
+    await cliente._async_setup_hook()
+    estado = cliente._connection
+    estado.user = discord.ClientUser(state=estado, data=usuario(BOT_ID))
+
+    discord_falso = DiscordFalso(discord, estado, args.latencia_ms / 1000)
+    cliente.http.request = discord_falso.request
+    bot.instrumentar_rest(cliente.http)  # As métricas de REST passam a medir o Discord falso
+
+    guild = estado._add_guild_from_data(servidor_sintetico(bot, args.membros, args.itens))
+    bot.membros_por_servidor[guild.id] = {m.id for m in guild.members}
+
+    cenarios = {}
+    escolhidos = args.cenarios or CENARIOS
+    if "aniversarios" in escolhidos:
+        cenarios["aniversarios"] = await cenario_aniversarios(bot, guild, args.registros)
+    if "tickets" in escolhidos or "fechar_ticket" in escolhidos:
+        bot.definir_config("ticket_categories", guild.id, CATEGORIA_TICKETS_ID)
+        cenarios["tickets"] = await cenario_tickets(bot, guild, min(args.tickets, args.membros), discord_falso)
+    if "fechar_ticket" in escolhidos:
+        cenarios["fechar_ticket"] = await cenario_fechar_ticket(bot, guild, 3)
+    if "salvar_dados" in escolhidos:
+        cenarios["salvar_dados"] = await cenario_salvar_dados(bot, args.comandos, 500)
+    if "autocompletar" in escolhidos:
+        cenarios["autocompletar"] = await cenario_autocompletar(bot, guild, args.consultas)
+
+    # Deixa os envios/gravações pendentes terminarem antes de encerrar
+    while bot.gravador_dados.pendente() or bot.gravador_tickets.pendente():
+        await asyncio.sleep(0.05)
+
+    return {
+        "versao": versao(),
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "discord_py": discord.__version__,
+        "plataforma": platform.platform(),
+        "parametros": {k: v for k, v in vars(args).items() if k not in ("saida", "comparar", "tolerancia")},
+        "rest": dict(discord_falso.chamadas),
+        "cenarios": cenarios,
+    }
+
+def metricas_comparaveis(dados, caminho=()):
+    """(caminho, métrica, valor) de cada p50/p99/vazão do resultado."""
+    if not isinstance(dados, dict):
+        return
+    for chave, valor in dados.items():
+        if chave in METRICAS_COMPARADAS and isinstance(valor, (int, float)):
+            yield "/".join(caminho), chave, valor
+        else:
+            yield from metricas_comparaveis(valor, (*caminho, chave))
+
+def comparar(anterior, atual, tolerancia):
+    """Imprime a variação de cada métrica; retorna quantas pioraram além da tolerância."""
+    valores_anteriores = {(c, m): v for c, m, v in metricas_comparaveis(anterior["cenarios"])}
+    regressoes = 0
+    print(f"Comparando com {anterior.get('versao')} ({anterior.get('data')})")
+    for caminho, metrica, valor in metricas_comparaveis(atual["cenarios"]):
+        antes = valores_anteriores.get((caminho, metrica))
+        if not antes:
+            continue
+        variacao = (valor - antes) / antes
+        piorou = variacao * METRICAS_COMPARADAS[metrica] > tolerancia
+        regressoes += piorou
+        print(f"{'⚠️ ' if piorou else '   '}{caminho:<45} {metrica:<12} {antes:>12.4f} -> {valor:>12.4f} ({variacao:+.0%})")
+    return regressoes
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--registros", type=int, nargs="+", default=[10_000, 100_000, 1_000_000],
+                        help="Quantidades de aniversários testadas")
+    parser.add_argument("--membros", type=int, default=2_000, help="Membros em cache no servidor sintético")
+    parser.add_argument("--itens", type=int, default=5_000, help="Cargos e canais para o autocompletar")
+    parser.add_argument("--tickets", type=int, default=500, help="Usuários na rajada de tickets")
+    parser.add_argument("--comandos", type=int, default=20_000, help="Comandos na tempestade de configurações")
+    parser.add_argument("--consultas", type=int, default=5_000, help="Consultas por tipo de autocompletar")
+    parser.add_argument("--latencia-ms", type=float, default=0.0, help="Latência simulada de cada chamada REST")
+    parser.add_argument("--armazenamento", choices=("json", "sqlite"), help="Backend (padrão: BOT_ARMAZENAMENTO)")
+    parser.add_argument("--cenarios", nargs="+", choices=CENARIOS, help="Só estes cenários")
+    parser.add_argument("--saida", default="carga.json", help="Arquivo JSON dos resultados")
+    parser.add_argument("--comparar", help="Resultado anterior; sai com erro se alguma métrica piorar")
+    parser.add_argument("--tolerancia", type=float, default=0.2, help="Piora aceita na comparação (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    saida = os.path.abspath(args.saida)
+    anterior = None
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            anterior = json.load(f)
+
+    resultado = asyncio.run(executar(args))
+    with open(saida, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, indent=2, ensure_ascii=False)
+    print(json.dumps(resultado["cenarios"], indent=2, ensure_ascii=False))
+    print(f"Resultados gravados em {saida}")
+
+    if anterior and comparar(anterior, resultado, args.tolerancia):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
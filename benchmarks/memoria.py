@@ -0,0 +1,132 @@
+"""Compara o uso de memória (RSS) dos perfis padrão e de baixa memória do bot.
+
+Cada perfil roda em um processo separado, que monta um servidor sintético grande
+(membros no GUILD_CREATE, como depois do chunk) e recebe mensagens, usando as mesmas
+opções de cliente do bot (opcoes_cliente em bot.py).
+
+Uso: python benchmarks/memoria.py [--membros 100000] [--mensagens 5000] [--json]
+"""
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PERFIS = ("padrao", "baixo")
+
+def rss_mb():
+    """RSS atual do processo em MB (pico, se /proc não estiver disponível)."""
+    try:
+        with open("/proc/self/status") as f:
+            for linha in f:
+                if linha.startswith("VmRSS:"):
+                    return int(linha.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
+
+def usuario(user_id):
+    return {"id": str(user_id), "username": f"membro{user_id}", "discriminator": "0", "global_name": None, "avatar": None}
+
+def servidor_sintetico(guild_id, canal_id, membros):
+    return {
+        "id": str(guild_id),
+        "name": "Servidor sintético",
+        "owner_id": "1",
+        "member_count": membros,
+        "large": True,
+        "roles": [{"id": str(guild_id), "name": "@everyone", "permissions": "0", "position": 0, "color": 0,
+                   "hoist": False, "managed": False, "mentionable": False}],
+        "channels": [{"id": str(canal_id), "type": 0, "name": "geral", "position": 0, "permission_overwrites": []}],
+        "members": [
+            {"user": usuario(10_000 + i), "roles": [], "joined_at": "2024-01-01T00:00:00+00:00", "deaf": False, "mute": False, "flags": 0}
+            for i in range(membros)
+        ],
+    }
+
+def mensagem(message_id, guild_id, canal_id, autor_id):
+    return {
+        "id": str(message_id), "channel_id": str(canal_id), "guild_id": str(guild_id), "type": 0,
+        "content": f"mensagem {message_id}", "author": usuario(autor_id),
+        "timestamp": "2024-01-01T00:00:00+00:00", "edited_timestamp": None, "tts": False,
+        "mention_everyone": False, "mentions": [], "mention_roles": [], "attachments": [],
+        "embeds": [], "pinned": False,
+    }
+
+def medir(perfil, membros, mensagens):
+    """Roda dentro do processo filho: monta o estado do cliente e mede o RSS."""
+    sys.path.insert(0, RAIZ)
+    os.chdir(tempfile.mkdtemp())  # O bot não deve tocar nos arquivos de dados do repositório
+    import discord
+    import bot
+    
+    cliente = discord.Client(**bot.opcoes_cliente(perfil == "baixo"))
+    estado = cliente._connection
+    gc.collect()
+    antes = rss_mb()
+    
+    guild_id, canal_id = 900, 901
+    dados = servidor_sintetico(guild_id, canal_id, membros)
+    guild = estado._add_guild_from_data(dados)
+    del dados
+    # Conjunto de IDs mantido pelo bot em qualquer perfil (aniversários)
+    bot.membros_por_servidor[guild.id] = {10_000 + i for i in range(membros)}
+    
+    for i in range(mensagens):
+        estado.parse_message_create(mensagem(1_000_000 + i, guild_id, canal_id, 10_000 + i % max(membros, 1)))
+    
+    gc.collect()
+    depois = rss_mb()
+    return {
+        "perfil": perfil,
+        "membros": membros,
+        "mensagens": mensagens,
+        "membros_em_cache": len(guild.members),
+        "mensagens_em_cache": len(estado._messages or ()),
+        "rss_inicial_mb": round(antes, 1),
+        "rss_final_mb": round(depois, 1),
+        "rss_servidor_mb": round(depois - antes, 1),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--membros", type=int, default=100_000)
+    parser.add_argument("--mensagens", type=int, default=5_000)
+    parser.add_argument("--json", action="store_true", help="Imprime só o JSON dos resultados")
+    parser.add_argument("--perfil", choices=PERFIS, help=argparse.SUPPRESS)  # Usado pelo processo filho
+    args = parser.parse_args()
+    
+    if args.perfil:
+        print(json.dumps(medir(args.perfil, args.membros, args.mensagens)))
+        return
+    
+    resultados = []
+    for perfil in PERFIS:
+        saida = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--perfil", perfil,
+             "--membros", str(args.membros), "--mensagens", str(args.mensagens)],
+            capture_output=True, text=True, check=True
+        ).stdout
+        # O atexit do bot também imprime; o resultado é a linha JSON
+        resultados.append(next(json.loads(l) for l in saida.splitlines() if l.startswith("{")))
+    
+    if args.json:
+        print(json.dumps(resultados, indent=2))
+        return
+    
+    print(f"{'perfil':<8} {'membros em cache':>17} {'mensagens em cache':>19} {'RSS do servidor':>16} {'RSS final':>10}")
+    for r in resultados:
+        print(f"{r['perfil']:<8} {r['membros_em_cache']:>17} {r['mensagens_em_cache']:>19} "
+              f"{r['rss_servidor_mb']:>13.1f} MB {r['rss_final_mb']:>7.1f} MB")
+    padrao, baixo = resultados
+    if padrao["rss_servidor_mb"] > 0:
+        economia = 100 * (1 - baixo["rss_servidor_mb"] / padrao["rss_servidor_mb"])
+        print(f"Economia do perfil de baixa memória: {economia:.0f}%")
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,43 @@
+import time
+INICIO_PROCESSO = time.perf_counter()  # Antes dos demais imports: o relatório de inicialização inclui a importação
+
 import discord
+from discord import app_commands
 from discord.ext import commands, tasks
 from discord import TextStyle
 from discord.ui import View, Modal, TextInput, Button, Select
 from discord import SelectOption
+from discord.http import Route
 from math import ceil
+import aiohttp
 import asyncio
+import bisect
+import csv
+import functools
+import gzip
+import hashlib
+import hmac
+import io
 import logging
+import logging.handlers
 import os
 import json
+import queue
+import random
+import re
+import string
 import sys
 import socket
-import time
-from datetime import datetime, date, time as dt_time
+import tempfile
+import sqlite3
+import threading
+import unicodedata
+import weakref
+from collections import OrderedDict
+from urllib.parse import urlparse, parse_qs, parse_qsl, urlencode
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, time as dt_time
+from zoneinfo import ZoneInfo
 from dotenv import load_dotenv
 
 # ===== SINGLE INSTANCE CONTROL =====
@@ -27,36 +53,357 @@ def get_single_instance_lock():
         lock_socket.bind(('127.0.0.1', 65432))  # Porta específica para este bot
         lock_socket.listen(1)
         
-        print("✅ Instância única confirmada - Bot pode iniciar")
+        log.info("✅ Instância única confirmada - Bot pode iniciar")
         return lock_socket
         
     except OSError:
-        print("❌ ERRO: Já existe uma instância do bot rodando!")
-        print("🔍 Para verificar processos ativos:")
-        print("   Linux/Mac: ps aux | grep python")
-        print("   Windows: tasklist | findstr python")
-        print("🛑 Encerrando para evitar duplicação...")
+        log.error("❌ ERRO: Já existe uma instância do bot rodando! Encerrando para evitar duplicação "
+                  "(processos ativos: 'ps aux | grep python' no Linux/Mac, 'tasklist | findstr python' no Windows)")
         sys.exit(1)
 
 # ===== INITIALIZE LOGGING =====
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
-    datefmt="%d/%m/%Y %H:%M:%S"
-)
-logger = logging.getLogger('discord')
-logger.setLevel(logging.INFO)
+load_dotenv()
+
+# Os registros entram numa fila no event loop e uma thread grava na saída (sem I/O bloqueante no loop).
+# BOT_LOG_FORMATO: json (uma linha JSON por registro, padrão) ou texto
+# BOT_LOG_NIVEL: nível geral; BOT_LOG_NIVEIS: por subsistema, ex.: "bot.aniversarios=DEBUG,discord.http=WARNING"
+# BOT_LOG_AMOSTRA_DEBUG: fração das linhas de DEBUG mantidas (varreduras grandes geram muitas)
+CAMPOS_LOG = ("guild_id", "user_id", "comando", "latencia_ms")
+
+class FormatadorJSON(logging.Formatter):
+    """Uma linha JSON por registro, com os campos estruturados passados em extra=."""
+
+    def format(self, record):
+        dados = {
+            "ts": datetime.fromtimestamp(record.created).astimezone().isoformat(timespec="milliseconds"),
+            "nivel": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for campo in CAMPOS_LOG:
+            valor = getattr(record, campo, None)
+            if valor is not None:
+                dados[campo] = valor
+        return json.dumps(dados, ensure_ascii=False, default=str)
+
+class AmostragemDebug(logging.Filter):
+    """Deixa passar só uma fração das linhas de DEBUG; as demais são descartadas antes da fila."""
+
+    def __init__(self, taxa):
+        super().__init__()
+        self.taxa = taxa
+
+    def filter(self, record):
+        return record.levelno > logging.DEBUG or random.random() < self.taxa
+
+def configurar_logging():
+    """Troca os handlers da raiz por um QueueHandler e inicia a thread que escreve os registros."""
+    saida = logging.StreamHandler(sys.stderr)
+    if os.getenv("BOT_LOG_FORMATO", "json").lower() == "texto":
+        saida.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s", "%d/%m/%Y %H:%M:%S"))
+    else:
+        saida.setFormatter(FormatadorJSON())
+    
+    fila = queue.SimpleQueue()
+    manipulador = logging.handlers.QueueHandler(fila)
+    manipulador.addFilter(AmostragemDebug(float(os.getenv("BOT_LOG_AMOSTRA_DEBUG", "0.1"))))
+    
+    raiz = logging.getLogger()
+    raiz.handlers[:] = [manipulador]
+    raiz.setLevel(os.getenv("BOT_LOG_NIVEL", "INFO").upper())
+    for item in os.getenv("BOT_LOG_NIVEIS", "").split(","):
+        if "=" in item:
+            nome, nivel = item.split("=", 1)
+            logging.getLogger(nome.strip()).setLevel(nivel.strip().upper())
+    
+    ouvinte = logging.handlers.QueueListener(fila, saida, respect_handler_level=True)
+    ouvinte.start()
+    return ouvinte
+
+ouvinte_log = configurar_logging()
 
-# Criar lock de instância única ANTES de tudo
-lock_socket = get_single_instance_lock()
+def parar_logging():
+    """Esvazia a fila e encerra a thread de log (só na primeira chamada)."""
+    global ouvinte_log
+    if ouvinte_log is not None:
+        ouvinte_log.stop()
+        ouvinte_log = None
+
+log = logging.getLogger("bot")
+log_aniversarios = logging.getLogger("bot.aniversarios")
+log_membros = logging.getLogger("bot.membros")
+log_dados = logging.getLogger("bot.dados")
+log_fotos = logging.getLogger("bot.fotos")
+log_tickets = logging.getLogger("bot.tickets")
+log_sugestoes = logging.getLogger("bot.sugestoes")
+log_comandos = logging.getLogger("bot.comandos")
 
 # ===== BOT SETUP =====
-intents = discord.Intents.default()
-intents.members = True
-intents.message_content = True
-intents.voice_states = True
 
-bot = commands.Bot(command_prefix="!", intents=intents)
+# BOT_PERFIL_MEMORIA=baixo: só os intents que as funções usam, sem cache de membros/mensagens
+# e sem message_content (comandos pela barra ou mencionando o bot)
+PERFIL_BAIXA_MEMORIA = os.getenv("BOT_PERFIL_MEMORIA", "").lower() == "baixo"
+
+def opcoes_cliente(baixa_memoria=False):
+    """Intents e caches do cliente para o perfil escolhido."""
+    if not baixa_memoria:
+        intents = discord.Intents.default()
+        intents.members = True
+        intents.message_content = True
+        intents.voice_states = True
+        return {"intents": intents}
+    
+    intents = discord.Intents.none()
+    intents.guilds = True          # Canais, cargos e categorias
+    intents.members = True         # Entradas/saídas: cargo automático e membros dos aniversários
+    intents.guild_messages = True  # Comandos mencionando o bot
+    return {
+        "intents": intents,
+        # Os aniversários usam os conjuntos de IDs (membros_por_servidor), não o cache de Members
+        "member_cache_flags": discord.MemberCacheFlags.none(),
+        "chunk_guilds_at_startup": False,
+        "max_messages": None,
+    }
+
+bot = commands.Bot(command_prefix=commands.when_mentioned_or("!"), **opcoes_cliente(PERFIL_BAIXA_MEMORIA))
+
+# ===== FUSO HORÁRIO =====
+try:
+    FUSO_HORARIO = ZoneInfo(os.getenv("FUSO_HORARIO", "America/Sao_Paulo"))
+except Exception as e:
+    log.warning(f"⚠️ Fuso horário inválido ({e}) - usando o horário local da máquina")
+    FUSO_HORARIO = datetime.now().astimezone().tzinfo
+
+def agora_local():
+    """Data e hora atuais no fuso horário do bot."""
+    return datetime.now(FUSO_HORARIO)
+
+def hoje_local():
+    """Data de hoje no fuso horário do bot."""
+    return agora_local().date()
+
+# ===== MÉTRICAS =====
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def escapar_rotulo(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class Metricas:
+    """Histogramas e contadores em memória, exportados no formato de texto do Prometheus.
+    
+    Atualizados no event loop e lidos pela thread do servidor HTTP (daí a trava).
+    """
+
+    def __init__(self):
+        self.trava = threading.Lock()
+        self.familias = {}  # nome -> {tipo, ajuda, rotulos, series: {valores: dados}}
+
+    def registrar(self, nome, tipo, ajuda, rotulos=()):
+        self.familias[nome] = {"tipo": tipo, "ajuda": ajuda, "rotulos": rotulos, "series": {}}
+
+    def observar(self, nome, valores, segundos):
+        series = self.familias[nome]["series"]
+        with self.trava:
+            serie = series.get(valores)
+            if serie is None:
+                # Contagem por bucket (+Inf no fim), soma e total
+                serie = series[valores] = [0] * (len(BUCKETS_LATENCIA) + 1) + [0.0, 0]
+            serie[bisect.bisect_left(BUCKETS_LATENCIA, segundos)] += 1
+            serie[-2] += segundos
+            serie[-1] += 1
+
+    def incrementar(self, nome, valores=(), quantidade=1):
+        series = self.familias[nome]["series"]
+        with self.trava:
+            series[valores] = series.get(valores, 0) + quantidade
+
+    def definir(self, nome, valor, valores=()):
+        with self.trava:
+            self.familias[nome]["series"][valores] = valor
+
+    def renderizar(self):
+        linhas = []
+        with self.trava:
+            for nome, familia in self.familias.items():
+                linhas.append(f"# HELP {nome} {familia['ajuda']}")
+                linhas.append(f"# TYPE {nome} {familia['tipo']}")
+                for valores, serie in familia["series"].items():
+                    rotulos = [f'{r}="{escapar_rotulo(v)}"' for r, v in zip(familia["rotulos"], valores)]
+                    if familia["tipo"] != "histogram":
+                        texto = "{" + ",".join(rotulos) + "}" if rotulos else ""
+                        linhas.append(f"{nome}{texto} {serie}")
+                        continue
+                    
+                    acumulado = 0
+                    for limite, quantidade in zip((*BUCKETS_LATENCIA, "+Inf"), serie):
+                        acumulado += quantidade
+                        texto = ",".join([*rotulos, f'le="{limite}"'])
+                        linhas.append(f"{nome}_bucket{{{texto}}} {acumulado}")
+                    texto = "{" + ",".join(rotulos) + "}" if rotulos else ""
+                    linhas.append(f"{nome}_sum{texto} {serie[-2]:.6f}")
+                    linhas.append(f"{nome}_count{texto} {serie[-1]}")
+        return "\n".join(linhas) + "\n"
+
+metricas = Metricas()
+metricas.registrar("bot_comando_segundos", "histogram", "Duração dos comandos (prefixo e barra)", ("comando",))
+metricas.registrar("bot_interacao_segundos", "histogram", "Duração dos callbacks de views e modals", ("componente",))
+metricas.registrar("bot_task_segundos", "histogram", "Duração de cada execução das tasks agendadas", ("task",))
+metricas.registrar("bot_rest_segundos", "histogram", "Duração das chamadas REST ao Discord", ("metodo", "rota"))
+metricas.registrar("bot_erros_total", "counter", "Erros por origem", ("origem", "nome"))
+metricas.registrar("bot_rate_limit_total", "counter", "Respostas 429 e esperas por rate limit", ("origem",))
+metricas.registrar("bot_latencia_gateway_segundos", "gauge", "Latência do heartbeat do gateway")
+metricas.registrar("bot_servidores", "gauge", "Servidores conectados")
+metricas.registrar("bot_cargo_automatico_total", "counter", "Resultados da fila do cargo automático", ("resultado",))
+metricas.registrar("bot_cargo_automatico_fila", "gauge", "Membros aguardando o cargo automático")
+metricas.registrar("bot_mensagens_apagadas_total", "counter", "Mensagens apagadas pelo !clear", ("modo",))
+metricas.registrar("bot_api_requisicoes_total", "counter", "Requisições à API administrativa", ("metodo", "status"))
+metricas.registrar("bot_inicializacao_segundos", "gauge", "Segundos desde o início do processo até cada fase", ("fase",))
+
+def medido(histograma, origem, nome):
+    """Decorador que mede a duração (e conta os erros) de uma corrotina."""
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        async def medida(*args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                return await funcao(*args, **kwargs)
+            except Exception:
+                metricas.incrementar("bot_erros_total", (origem, nome))
+                raise
+            finally:
+                metricas.observar(histograma, (nome,), time.perf_counter() - inicio)
+        return medida
+    return decorador
+
+def medido_interacao(nome):
+    return medido("bot_interacao_segundos", "interacao", nome)
+
+def medido_task(nome):
+    return medido("bot_task_segundos", "task", nome)
+
+def instrumentar_rest(http):
+    """Mede cada requisição REST pela rota (modelo do caminho, ex.: /channels/{channel_id}/messages)."""
+    requisicao_original = http.request
+    
+    async def requisicao_medida(route, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return await requisicao_original(route, **kwargs)
+        except discord.RateLimited:
+            metricas.incrementar("bot_rate_limit_total", ("rest",))
+            raise
+        except discord.HTTPException as e:
+            metricas.incrementar("bot_erros_total", ("rest", str(e.status)))
+            raise
+        finally:
+            metricas.observar("bot_rest_segundos", (route.method, route.path), time.perf_counter() - inicio)
+    
+    http.request = requisicao_medida
+
+class ContadorRateLimit(logging.Handler):
+    """Conta os 429 que a biblioteca trata sozinha (ela só registra um aviso no log)."""
+
+    def emit(self, record):
+        if "rate limit" in record.getMessage().lower():
+            metricas.incrementar("bot_rate_limit_total", (record.name,))
+
+instrumentar_rest(bot.http)
+logging.getLogger("discord.http").addHandler(ContadorRateLimit(logging.WARNING))
+logging.getLogger("discord.gateway").addHandler(ContadorRateLimit(logging.WARNING))
+
+@bot.before_invoke
+async def iniciar_medicao_comando(ctx):
+    ctx.inicio_medicao = time.perf_counter()
+
+@bot.after_invoke
+async def finalizar_medicao_comando(ctx):
+    marcar_inicializacao("primeiro_comando")
+    inicio = getattr(ctx, "inicio_medicao", None)
+    if inicio is not None:
+        duracao = time.perf_counter() - inicio
+        metricas.observar("bot_comando_segundos", (ctx.command.qualified_name,), duracao)
+        log_comandos.info("Comando %s executado", ctx.command.qualified_name, extra={
+            "comando": ctx.command.qualified_name,
+            "guild_id": ctx.guild.id if ctx.guild else None,
+            "user_id": ctx.author.id,
+            "latencia_ms": round(duracao * 1000, 1),
+        })
+
+def texto_metricas():
+    """Métricas no formato Prometheus (chamado pela thread do servidor HTTP)."""
+    if bot.is_ready():
+        metricas.definir("bot_latencia_gateway_segundos", round(bot.latency, 6))
+        metricas.definir("bot_servidores", len(bot.guilds))
+    return metricas.renderizar()
+
+# ===== TEMPOS DE INICIALIZAÇÃO =====
+# Segundos desde o início do processo até o fim de cada fase, na ordem em que costumam acontecer
+FASES_INICIALIZACAO = {
+    "importacao": "importação",
+    "dados": "dados carregados",
+    "login": "login",
+    "pronto": "pronto",
+    "membros": "membros sincronizados",
+    "primeiro_comando": "primeiro comando",
+}
+tempos_inicializacao = {}
+
+def marcar_inicializacao(fase):
+    """Registra o fim de uma fase (só a primeira vez); com todas registradas, loga o relatório."""
+    if fase in tempos_inicializacao:
+        return
+    segundos = time.perf_counter() - INICIO_PROCESSO
+    tempos_inicializacao[fase] = segundos
+    metricas.definir("bot_inicializacao_segundos", round(segundos, 3), (fase,))
+    log.debug(f"⏱️ Inicialização: {FASES_INICIALIZACAO[fase]} em {segundos:.2f}s")
+    if len(tempos_inicializacao) == len(FASES_INICIALIZACAO):
+        log.info(f"⏱️ Inicialização: {texto_inicializacao()}", extra={"latencia_ms": round(segundos * 1000, 1)})
+
+def texto_inicializacao():
+    return " • ".join(
+        f"{rotulo} {tempos_inicializacao[fase]:.2f}s"
+        for fase, rotulo in FASES_INICIALIZACAO.items() if fase in tempos_inicializacao
+    ) or "-"
+
+# ===== SERVIDOR HTTP =====
+# Métricas e API administrativa (BOT_HTTP_PORTA=0 desativa) servidas por uma thread, fora do event loop
+HOST_HTTP = os.getenv("BOT_HTTP_HOST", "127.0.0.1")
+PORTA_HTTP = int(os.getenv("BOT_HTTP_PORTA", "9108"))
+servidor_http = None
+thread_http = None
+
+def criar_app_http():
+    from flask import Flask, Response
+    
+    app = Flask("bot")
+    
+    @app.get("/metrics")
+    def rota_metricas():
+        return Response(texto_metricas(), mimetype="text/plain; version=0.0.4")
+    
+    registrar_api(app)
+    return app
+
+def servir_http():
+    """Cria o servidor e atende as requisições (na thread http: importar o Flask não atrasa o login)."""
+    global servidor_http
+    from werkzeug.serving import make_server
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)  # Sem uma linha de log por coleta
+    try:
+        servidor_http = make_server(HOST_HTTP, PORTA_HTTP, criar_app_http(), threaded=True)
+    except OSError as e:
+        log.warning(f"⚠️ Servidor HTTP não iniciado em {HOST_HTTP}:{PORTA_HTTP}: {e}")
+        return
+    log.info(f"📈 Métricas em http://{HOST_HTTP}:{PORTA_HTTP}/metrics")
+    servidor_http.serve_forever()
+
+def iniciar_servidor_http():
+    """Sobe o servidor HTTP em uma thread daemon."""
+    global thread_http
+    if not PORTA_HTTP or thread_http is not None:
+        return
+    thread_http = threading.Thread(target=servir_http, name="http", daemon=True)
+    thread_http.start()
 
 # ===== DATA STORAGE =====
 auto_roles = {}
@@ -66,267 +413,946 @@ sugestao_channels = {}
 ticket_categories = {}
 ticket_support_roles = {}
 aniversario_channels = {}  # Canais para enviar mensagens de aniversário
-mensagens_enviadas_hoje = {}  # Controle de mensagens já enviadas
+aniversario_horarios = {}  # Hora local de envio dos aniversários por servidor
+tipos_suporte = {}  # Tipos de suporte personalizados por servidor: {guild_id: {chave: info}}
+ticket_limites = {}  # Máximo de tickets abertos por usuário em cada servidor
+aniversario_modelos = {}  # Personalização das mensagens de aniversário por servidor
+mensagens_enviadas_hoje = {}  # Controle de mensagens já enviadas: {data: {guild_id: {user_ids}}}
+controle_mensagens_pendente = False  # Há marcações ainda não gravadas em disco
+envios_pendentes = []  # Marcações (data, guild_id, user_id) ainda não gravadas
+tickets = {}  # Registro de tickets por canal: {channel_id: {guild_id, owner_id, tipo, criado_em, status}}
+pedidos_cargo = {}  # Pedidos de cargo pela mensagem na moderação: {message_id: {guild_id, user_id, nome, status, ...}}
+
+# Seções de configuração por servidor (nome no armazenamento -> dicionário em memória)
+CONFIGS = {
+    "auto_roles": auto_roles,
+    "ticket_response_channels": ticket_response_channels,
+    "mention_roles": mention_roles,
+    "sugestao_channels": sugestao_channels,
+    "ticket_categories": ticket_categories,
+    "ticket_support_roles": ticket_support_roles,
+    "aniversario_channels": aniversario_channels,
+    "aniversario_horarios": aniversario_horarios,
+    "tipos_suporte": tipos_suporte,
+    "ticket_limites": ticket_limites,
+    "aniversario_modelos": aniversario_modelos,
+}
 
 # Flag para controlar views
 views_registered = False
+tarefas_iniciadas = False  # Tasks e sincronizações do primeiro on_ready
 
 # ===== ANIVERSÁRIO SYSTEM =====
-def carregar_aniversarios():
-    """Carrega os dados de aniversário do JSON."""
-    # Tentar diferentes locais e nomes de arquivo possíveis
-    locais_e_nomes = [
-        # Na pasta atual
-        "aniversarios.json",
-        "aniversarios (1).json", 
-        "aniversario.json",
-        "Aniversarios.json",
-        # Na subpasta Bot-DISC
-        "Bot-DISC/aniversarios.json",
-        "Bot-DISC/aniversarios (1).json",
-        "Bot-DISC/aniversario.json",
-        "Bot-DISC/Aniversarios.json",
-        # Outros possíveis caminhos
-        "./Bot-DISC/aniversarios.json",
-        os.path.join("Bot-DISC", "aniversarios.json")
-    ]
-    
-    for caminho_arquivo in locais_e_nomes:
+# Locais e nomes possíveis do arquivo de aniversários
+CAMINHOS_ANIVERSARIOS = [
+    # Na pasta atual
+    "aniversarios.json",
+    "aniversarios (1).json",
+    "aniversario.json",
+    "Aniversarios.json",
+    # Na subpasta Bot-DISC
+    "Bot-DISC/aniversarios.json",
+    "Bot-DISC/aniversarios (1).json",
+    "Bot-DISC/aniversario.json",
+    "Bot-DISC/Aniversarios.json",
+    # Outros possíveis caminhos
+    "./Bot-DISC/aniversarios.json",
+    os.path.join("Bot-DISC", "aniversarios.json")
+]
+
+# Índice em memória dos aniversários (recarregado só quando a origem muda)
+indice_aniversarios = {
+    "origem": None,       # Descrição de onde os dados vieram
+    "assinatura": None,   # Assinatura da origem (ex.: arquivo, mtime, tamanho)
+    "dados": {},          # Registros brutos {user_id: {nome, data_nascimento, link_foto}}
+    "por_dia": {},        # (mês, dia) -> [registros]
+    "por_mes": {},        # mês -> [registros] ordenados por dia
+    "erros": [],          # [(user_id, dados, mensagem de erro)]
+}
+
+def localizar_arquivo_aniversarios(preferido=None):
+    """Retorna o caminho do arquivo de aniversários e sua assinatura (mtime, tamanho)."""
+    candidatos = [preferido] if preferido else []
+    candidatos += [c for c in CAMINHOS_ANIVERSARIOS if c != preferido]
+
+    for caminho_arquivo in candidatos:
         try:
-            if os.path.exists(caminho_arquivo):
-                with open(caminho_arquivo, "r", encoding="utf-8") as f:
-                    dados = json.load(f)
-                    print(f"✅ Arquivo {caminho_arquivo} carregado com {len(dados)} aniversários")
-                    return dados
+            info = os.stat(caminho_arquivo)
+        except OSError:
+            continue
+        return caminho_arquivo, (info.st_mtime_ns, info.st_size)
+    return None, None
+
+def indexar_aniversarios(dados):
+    """Monta os índices por (mês, dia) e por mês a partir dos dados brutos."""
+    por_dia = {}
+    por_mes = {}
+    erros = []
+
+    for user_id, info in dados.items():
+        try:
+            data_nascimento = datetime.strptime(info["data_nascimento"], "%Y-%m-%d").date()
+            registro = {
+                "user_id": user_id,
+                "id": int(user_id),  # Convertido uma vez para cruzar com os IDs de membros
+                "nome": info["nome"],
+                "link_foto": info.get("link_foto", ""),
+                "data_nascimento": data_nascimento,
+            }
         except Exception as e:
-            print(f"❌ Erro ao carregar {caminho_arquivo}: {e}")
+            erros.append((user_id, info, str(e)))
             continue
+
+        por_dia.setdefault((data_nascimento.month, data_nascimento.day), []).append(registro)
+        por_mes.setdefault(data_nascimento.month, []).append(registro)
+
+    for registros in por_mes.values():
+        registros.sort(key=lambda r: r["data_nascimento"].day)
+
+    return por_dia, por_mes, erros
+
+def montar_indice_aniversarios(forcar=False):
+    """Novo conteúdo do índice se a origem dos aniversários mudou (None se não mudou).
     
-    print("⚠️ Nenhum arquivo de aniversários encontrado")
-    print("🔍 Locais procurados:", ", ".join(locais_e_nomes))
-    return {}
+    Não altera o índice em memória, então pode rodar em uma thread; quem chama aplica o resultado.
+    """
+    assinatura = armazenamento.assinatura_aniversarios()
+
+    if assinatura is None:
+        if indice_aniversarios["assinatura"] is not None or forcar:
+            log_aniversarios.warning(f"⚠️ Nenhum arquivo de aniversários encontrado (locais procurados: {', '.join(CAMINHOS_ANIVERSARIOS)})")
+        return dict(origem=None, assinatura=None, dados={}, por_dia={}, por_mes={}, erros=[])
+
+    if not forcar and assinatura == indice_aniversarios["assinatura"]:
+        return None
+
+    origem = armazenamento.origem_aniversarios()
+    try:
+        dados = armazenamento.ler_aniversarios()
+    except Exception as e:
+        log_aniversarios.error(f"❌ Erro ao carregar {origem}: {e}")
+        return None
+
+    por_dia, por_mes, erros = indexar_aniversarios(dados)
+    log_aniversarios.info(f"✅ {origem} carregado com {len(dados)} aniversários")
+    for user_id, _, erro in erros:
+        log_aniversarios.warning(f"   ⚠️ Erro ao processar aniversário de {user_id}: {erro}")
+    return dict(origem=origem, assinatura=assinatura, dados=dados, por_dia=por_dia, por_mes=por_mes, erros=erros)
+
+def atualizar_indice_aniversarios(forcar=False):
+    """Recarrega o índice apenas se a origem dos aniversários mudou."""
+    novo = montar_indice_aniversarios(forcar)
+    if novo is not None:
+        indice_aniversarios.update(novo)
+    return indice_aniversarios
+
+async def atualizar_indice_aniversarios_async(forcar=False):
+    """Como atualizar_indice_aniversarios, mas lê e indexa em uma thread; só a troca roda no event loop."""
+    novo = await asyncio.to_thread(montar_indice_aniversarios, forcar)
+    if novo is not None:
+        indice_aniversarios.update(novo)
+    return indice_aniversarios
+
+tarefa_indice_aniversarios = None
+
+async def preparar_indice_aniversarios():
+    """Monta o índice em uma thread na primeira chamada (as seguintes esperam a mesma carga)."""
+    global tarefa_indice_aniversarios
+    if tarefa_indice_aniversarios is None:
+        tarefa_indice_aniversarios = asyncio.create_task(atualizar_indice_aniversarios_async())
+    await asyncio.shield(tarefa_indice_aniversarios)
+
+def carregar_aniversarios(forcar=False):
+    """Carrega os dados de aniversário do JSON (usando o índice em memória)."""
+    return atualizar_indice_aniversarios(forcar)["dados"]
+
+def aniversariantes_do_dia(mes, dia):
+    """Retorna os registros de quem faz aniversário no dia/mês informado."""
+    return atualizar_indice_aniversarios()["por_dia"].get((mes, dia), [])
+
+def aniversariantes_do_mes(mes):
+    """Retorna os registros de quem faz aniversário no mês, ordenados por dia."""
+    return atualizar_indice_aniversarios()["por_mes"].get(mes, [])
+
+ARQUIVO_CONTROLE_MENSAGENS = "mensagens_aniversario.json"
+TODOS_SERVIDORES = "*"  # Registros antigos (só por usuário) valem para todos os servidores
+
+def escrever_json_atomico(caminho, dados, indent=None):
+    """Grava o JSON em um arquivo temporário e substitui o original de uma vez."""
+    temporario = f"{caminho}.tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(dados, f, indent=indent, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporario, caminho)
 
 def carregar_controle_mensagens():
     """Carrega o controle de mensagens já enviadas."""
     try:
-        if os.path.exists("mensagens_aniversario.json"):
-            with open("mensagens_aniversario.json", "r", encoding="utf-8") as f:
-                dados = json.load(f)
-                mensagens_enviadas_hoje.update(dados)
-                print("✅ Controle de mensagens carregado")
+        for data, envios in armazenamento.carregar_envios().items():
+            por_servidor = mensagens_enviadas_hoje.setdefault(data, {})
+            for guild_id, user_ids in envios.items():
+                por_servidor.setdefault(guild_id, set()).update(user_ids)
+        log_aniversarios.info("✅ Controle de mensagens carregado")
     except Exception as e:
-        print(f"⚠️ Erro ao carregar controle de mensagens: {e}")
+        log_aniversarios.warning(f"⚠️ Erro ao carregar controle de mensagens: {e}")
 
 def salvar_controle_mensagens():
-    """Salva o controle de mensagens enviadas."""
+    """Salva o controle de mensagens enviadas (só se houver marcações pendentes)."""
+    global controle_mensagens_pendente
+    
+    if not controle_mensagens_pendente:
+        return
+    
+    novos = list(envios_pendentes)
     try:
-        with open("mensagens_aniversario.json", "w", encoding="utf-8") as f:
-            json.dump(mensagens_enviadas_hoje, f, indent=4, ensure_ascii=False)
+        armazenamento.salvar_envios(mensagens_enviadas_hoje, novos)
+        del envios_pendentes[:len(novos)]
+        controle_mensagens_pendente = False
     except Exception as e:
-        print(f"⚠️ Erro ao salvar controle de mensagens: {e}")
+        log_aniversarios.warning(f"⚠️ Erro ao salvar controle de mensagens: {e}")
 
 def limpar_controle_diario():
-    """Limpa o controle de mensagens se mudou o dia."""
-    hoje = date.today().isoformat()
-    
-    # Se há registros de outros dias, limpar
-    if mensagens_enviadas_hoje and list(mensagens_enviadas_hoje.keys())[0] != hoje:
-        print(f"🧹 Limpando controle de mensagens - novo dia: {hoje}")
-        mensagens_enviadas_hoje.clear()
-        mensagens_enviadas_hoje[hoje] = []
+    """Descarta os registros de todos os dias que não sejam hoje."""
+    global controle_mensagens_pendente
+    
+    hoje = hoje_local().isoformat()
+    antigos = [data for data in mensagens_enviadas_hoje if data != hoje]
+    
+    if antigos:
+        log_aniversarios.info(f"🧹 Limpando controle de mensagens - novo dia: {hoje}")
+        for data in antigos:
+            del mensagens_enviadas_hoje[data]
+        controle_mensagens_pendente = True
         salvar_controle_mensagens()
     
-    # Se não há registro para hoje, criar
-    if hoje not in mensagens_enviadas_hoje:
-        mensagens_enviadas_hoje[hoje] = []
+    mensagens_enviadas_hoje.setdefault(hoje, {})
 
-def verificar_aniversariantes():
-    """Verifica se há aniversariantes hoje."""
-    aniversarios = carregar_aniversarios()
-    hoje = date.today()
+def verificar_aniversariantes(indice=None):
+    """Verifica se há aniversariantes hoje (no índice já atualizado, se informado)."""
+    hoje = hoje_local()
     aniversariantes = []
     
-    print(f"🔍 Verificando aniversários para {hoje.strftime('%d/%m/%Y')} (dia {hoje.day}, mês {hoje.month})")
+    log_aniversarios.debug("Verificando aniversários para %s", hoje.isoformat())
+    
+    registros = indice["por_dia"].get((hoje.month, hoje.day), []) if indice else aniversariantes_do_dia(hoje.month, hoje.day)
+    for registro in registros:
+        aniversariante = {
+            "user_id": registro["user_id"],
+            "id": registro["id"],
+            "nome": registro["nome"],
+            "idade": hoje.year - registro["data_nascimento"].year,
+            "link_foto": registro["link_foto"]
+        }
+        aniversariantes.append(aniversariante)
+        log_aniversarios.debug("Aniversariante encontrado: %s (%s anos)", aniversariante["nome"], aniversariante["idade"],
+                               extra={"user_id": aniversariante["id"]})
+    
+    log_aniversarios.debug("Total de aniversariantes hoje: %d", len(aniversariantes))
+    return aniversariantes
+
+def ja_enviou_mensagem_hoje(guild_id, user_id):
+    """Verifica se já enviou mensagem para este usuário neste servidor hoje."""
+    envios = mensagens_enviadas_hoje.get(hoje_local().isoformat())
+    if not envios:
+        return False
+    return user_id in envios.get(str(guild_id), ()) or user_id in envios.get(TODOS_SERVIDORES, ())
+
+def marcar_mensagem_enviada(guild_id, user_id):
+    """Marca o envio em memória; a gravação acontece uma vez no fim do lote."""
+    global controle_mensagens_pendente
     
-    for user_id, dados in aniversarios.items():
+    hoje = hoje_local().isoformat()
+    envios = mensagens_enviadas_hoje.setdefault(hoje, {})
+    envios.setdefault(str(guild_id), set()).add(user_id)
+    envios_pendentes.append((hoje, str(guild_id), user_id))
+    controle_mensagens_pendente = True
+
+# ===== MEMBROS DOS SERVIDORES =====
+# IDs de membros por servidor, de um fetch em blocos no início e mantidos pelos eventos de entrada/saída.
+# Não depende do cache de membros do gateway, que pode estar incompleto.
+membros_por_servidor = {}
+tarefa_sincronizacao_membros = None
+
+class MembroForaDoCache(discord.Object):
+    """Membro confirmado na lista do servidor mas ausente do cache (basta para mencionar)."""
+
+    @property
+    def mention(self):
+        return f"<@{self.id}>"
+
+async def sincronizar_membros(guild):
+    """Monta o conjunto de IDs de membros com um único fetch em blocos pelo gateway."""
+    membros = guild.members if guild.chunked else await guild.chunk(cache=False)
+    ids = {m.id for m in membros}
+    membros_por_servidor[guild.id] = ids
+    # Mesmo fetch: quem entrou com o bot offline (ou esgotou as tentativas) volta para a fila
+    reconciliar_cargo_automatico(guild, membros)
+    return ids
+
+async def sincronizar_todos_membros():
+    inicio = time.perf_counter()
+    total = 0
+    for guild in list(bot.guilds):
         try:
-            # Converter string de data para objeto date
-            data_nascimento = datetime.strptime(dados["data_nascimento"], "%Y-%m-%d").date()
+            total += len(await sincronizar_membros(guild))
+        except Exception as e:
+            log_membros.warning(f"⚠️ Erro ao buscar membros de {guild.name}: {e}")
+    marcar_inicializacao("membros")
+    duracao = time.perf_counter() - inicio
+    log_membros.info(f"👥 {total} membro(s) sincronizado(s) em {len(bot.guilds)} servidor(es) ({duracao:.2f}s)",
+                     extra={"latencia_ms": round(duracao * 1000, 1)})
+
+async def aguardar_membros():
+    """Espera a sincronização inicial de membros (se estiver em andamento)."""
+    if tarefa_sincronizacao_membros and not tarefa_sincronizacao_membros.done():
+        await asyncio.shield(tarefa_sincronizacao_membros)
+
+def membros_do_servidor(guild):
+    """IDs dos membros do servidor (o cache do gateway enquanto a sincronização não terminou)."""
+    ids = membros_por_servidor.get(guild.id)
+    if ids is None:
+        return {m.id for m in guild.members}
+    return ids
+
+def aniversariantes_no_servidor(guild, registros):
+    """Registros cujos usuários estão no servidor (interseção dos conjuntos de IDs)."""
+    presentes = membros_do_servidor(guild).intersection(r["id"] for r in registros)
+    return [r for r in registros if r["id"] in presentes]
+
+def resolver_membro(guild, user_id):
+    """Member do cache, um MembroForaDoCache se estiver no servidor, ou None."""
+    member = guild.get_member(user_id)
+    if member is None and user_id in membros_do_servidor(guild):
+        return MembroForaDoCache(user_id)
+    return member
+
+# ===== ENVIO CONCORRENTE =====
+LIMITE_ENVIOS_SIMULTANEOS = 5  # Envios em paralelo somando todos os servidores
+LIMITE_ENVIOS_POR_CANAL = 1    # Envios em paralelo no mesmo canal (mantém a ordem)
+TENTATIVAS_RATE_LIMIT = 3
+
+semaforo_envios = asyncio.Semaphore(LIMITE_ENVIOS_SIMULTANEOS)
+semaforos_canais = {}
+
+# Resumo do último lote de aniversários (exibido no !debuganiversarios)
+ultimo_lote_aniversarios = {}
+
+def tempo_espera_rate_limit(erro):
+    """Extrai o tempo de espera (segundos) de um erro 429 do Discord."""
+    if isinstance(erro, discord.RateLimited):
+        return erro.retry_after
+    try:
+        return float(erro.response.headers.get("Retry-After", 1))
+    except Exception:
+        return 1.0
+
+async def enviar_com_limite(canal, anexos=(), **kwargs):
+    """Envia uma mensagem respeitando os limites global e por canal e os 429 do Discord.
+    
+    anexos: [(caminho, nome)] - os arquivos são reabertos a cada tentativa (o envio os fecha).
+    """
+    semaforo_canal = semaforos_canais.setdefault(canal.id, asyncio.Semaphore(LIMITE_ENVIOS_POR_CANAL))
+    
+    async with semaforo_envios, semaforo_canal:
+        for tentativa in range(1, TENTATIVAS_RATE_LIMIT + 1):
+            if anexos:
+                kwargs["files"] = [discord.File(caminho, filename=nome) for caminho, nome in anexos]
+            try:
+                return await canal.send(**kwargs)
+            except (discord.RateLimited, discord.HTTPException) as e:
+                if getattr(e, "status", 429) != 429 or tentativa == TENTATIVAS_RATE_LIMIT:
+                    raise
+                espera = tempo_espera_rate_limit(e)
+                metricas.incrementar("bot_rate_limit_total", ("envio",))
+                log_aniversarios.warning(f"⏳ Rate limit em #{canal} - aguardando {espera:.1f}s (tentativa {tentativa})")
+                # Segura os semáforos durante a espera para não estourar o mesmo bucket
+                await asyncio.sleep(espera)
+
+# ===== CARGO AUTOMÁTICO =====
+# Entradas vão para uma fila por servidor, consumida em ordem por uma task; em rajadas (turma nova,
+# importação, raid) as chamadas ficam sequenciais por servidor e os 429 são esperados, não perdidos.
+LIMITE_CARGOS_SIMULTANEOS = 3  # Servidores atribuindo cargos ao mesmo tempo
+TENTATIVAS_CARGO = 5
+ESPERA_BASE_CARGO = 1.0        # Segundos; dobra a cada tentativa, mais um jitter
+INTERVALO_RECONCILIACAO_CARGOS = 6  # Horas entre varreduras de quem ficou sem o cargo
+JANELA_RECONCILIACAO_CARGOS = timedelta(days=7)  # Só entradas recentes: quem teve o cargo removido por um admin não o recebe de novo
+
+semaforo_cargos = asyncio.Semaphore(LIMITE_CARGOS_SIMULTANEOS)
+filas_cargo_automatico = {}  # guild_id -> FilaCargoAutomatico
+
+def atualizar_metrica_fila_cargos():
+    metricas.definir("bot_cargo_automatico_fila", sum(len(f.pendentes) for f in filas_cargo_automatico.values()))
+
+class FilaCargoAutomatico:
+    """Membros de um servidor aguardando o cargo automático, sem repetidos."""
+
+    def __init__(self, guild_id):
+        self.guild_id = guild_id
+        self.fila = asyncio.Queue()
+        self.pendentes = set()  # IDs ainda a processar (sair do servidor remove; reentrar não duplica)
+        self.consumidor = None
+        self.atribuidos = 0
+        self.concluidos = set()  # Já receberam o cargo nesta execução (a varredura não repete)
+
+    def adicionar(self, user_id):
+        if user_id in self.pendentes:
+            return False
+        self.pendentes.add(user_id)
+        self.fila.put_nowait(user_id)
+        if self.consumidor is None or self.consumidor.done():
+            self.consumidor = asyncio.create_task(self.consumir())
+        return True
+
+    def remover(self, user_id):
+        self.pendentes.discard(user_id)
+
+    def descartar(self, resultado):
+        """Esvazia a fila contando os pendentes com o resultado informado."""
+        if self.pendentes:
+            metricas.incrementar("bot_cargo_automatico_total", (resultado,), len(self.pendentes))
+        self.pendentes.clear()
+        while not self.fila.empty():
+            self.fila.get_nowait()
+
+    async def consumir(self):
+        while not self.fila.empty():
+            user_id = self.fila.get_nowait()
+            if user_id not in self.pendentes:
+                continue  # Saiu do servidor (ou já processado numa entrada repetida)
             
-            # Verificar se o dia e mês são iguais ao de hoje
-            if data_nascimento.day == hoje.day and data_nascimento.month == hoje.month:
-                # Calcular idade
-                idade = hoje.year - data_nascimento.year
-                aniversariante = {
-                    "user_id": user_id,
-                    "nome": dados["nome"],
-                    "idade": idade,
-                    "link_foto": dados["link_foto"]
-                }
-                aniversariantes.append(aniversariante)
-                print(f"   ✅ ANIVERSARIANTE ENCONTRADO: {dados['nome']} ({idade} anos)")
-                
+            guild = bot.get_guild(self.guild_id)
+            if guild is None:
+                self.descartar("sem_servidor")
+                break
+            
+            try:
+                async with semaforo_cargos:
+                    resultado = await atribuir_cargo_automatico(guild, user_id)
+            except discord.Forbidden as e:
+                # Sem permissão (ou cargo acima do bot): todos os próximos falhariam igual
+                log_membros.error(f"❌ Sem permissão para dar o cargo automático em {guild.name}: {e}", extra={"guild_id": guild.id})
+                self.descartar("falha")
+                break
+            except Exception as e:
+                resultado = "falha"
+                log_membros.error(f"❌ Erro ao dar cargo: {e}", extra={"guild_id": guild.id, "user_id": user_id})
+            finally:
+                self.pendentes.discard(user_id)
+                atualizar_metrica_fila_cargos()
+            
+            metricas.incrementar("bot_cargo_automatico_total", (resultado,))
+            if resultado == "atribuido":
+                self.atribuidos += 1
+            if resultado in ("atribuido", "ja_tinha"):
+                self.concluidos.add(user_id)
+        
+        if self.atribuidos:
+            log_membros.info(f"✅ Cargo automático dado a {self.atribuidos} membro(s)", extra={"guild_id": self.guild_id})
+            self.atribuidos = 0
+        atualizar_metrica_fila_cargos()
+
+def enfileirar_cargo_automatico(guild, user_id):
+    """Coloca o membro na fila do cargo automático do servidor (se houver cargo configurado)."""
+    if not auto_roles.get(str(guild.id)):
+        return False
+    fila = filas_cargo_automatico.get(guild.id)
+    if fila is None:
+        fila = filas_cargo_automatico[guild.id] = FilaCargoAutomatico(guild.id)
+    adicionado = fila.adicionar(user_id)
+    atualizar_metrica_fila_cargos()
+    return adicionado
+
+async def atribuir_cargo_automatico(guild, user_id):
+    """Dá o cargo automático ao membro; repete 429, 5xx e erros de rede com espera e jitter."""
+    role = guild.get_role(auto_roles.get(str(guild.id)) or 0)
+    if role is None:
+        return "sem_cargo"
+    member = guild.get_member(user_id)
+    if member is not None and member.get_role(role.id):
+        return "ja_tinha"
+    if user_id not in membros_do_servidor(guild):
+        return "saiu"
+    
+    try:
+        await adicionar_cargo(guild, user_id, role, "Cargo automático", "cargo_automatico")
+    except discord.NotFound:
+        return "saiu"  # Saiu antes de chegar a vez dele
+    log_membros.debug("Cargo %s dado para %s", role.name, user_id, extra={"guild_id": guild.id, "user_id": user_id})
+    return "atribuido"
+
+async def adicionar_cargo(guild, user_id, role, motivo, origem):
+    """Dá o cargo pelo ID do membro; repete 429, 5xx e erros de rede com espera e jitter.
+    
+    Pelo ID porque, no perfil de baixa memória, o membro não fica no cache.
+    """
+    for tentativa in range(1, TENTATIVAS_CARGO + 1):
+        try:
+            await bot.http.add_role(guild.id, user_id, role.id, reason=motivo)
+            return
+        except (discord.RateLimited, discord.HTTPException, aiohttp.ClientError, asyncio.TimeoutError) as e:
+            status = getattr(e, "status", None)
+            limitado = isinstance(e, discord.RateLimited) or status == 429
+            if tentativa == TENTATIVAS_CARGO or (status is not None and not limitado and status < 500):
+                raise
+            espera = tempo_espera_rate_limit(e) if limitado else ESPERA_BASE_CARGO * 2 ** (tentativa - 1)
+            espera += random.uniform(0, ESPERA_BASE_CARGO)
+            if limitado:
+                metricas.incrementar("bot_rate_limit_total", (origem,))
+            log_membros.warning(f"⏳ Cargo {role.name} em {guild.name}: {e} - nova tentativa em {espera:.1f}s ({tentativa})",
+                                extra={"guild_id": guild.id, "user_id": user_id})
+            await asyncio.sleep(espera)
+
+def reconciliar_cargo_automatico(guild, membros):
+    """Enfileira os membros (de uma lista completa do servidor) que entraram recentemente e estão sem o cargo."""
+    role_id = auto_roles.get(str(guild.id))
+    if not role_id or guild.get_role(role_id) is None:
+        return 0
+    fila = filas_cargo_automatico.get(guild.id)
+    concluidos = fila.concluidos if fila else ()
+    desde = discord.utils.utcnow() - JANELA_RECONCILIACAO_CARGOS
+    faltando = sum(
+        enfileirar_cargo_automatico(guild, m.id) for m in membros
+        if m.joined_at and m.joined_at >= desde and m.id not in concluidos and not m.get_role(role_id)
+    )
+    if faltando:
+        log_membros.info(f"🔁 {faltando} membro(s) sem o cargo automático em {guild.name} - enfileirados",
+                         extra={"guild_id": guild.id})
+    return faltando
+
+@tasks.loop(hours=INTERVALO_RECONCILIACAO_CARGOS)
+@medido_task("reconciliar_cargos")
+async def reconciliar_cargos_task():
+    """Varredura periódica: refaz a lista de membros dos servidores com cargo automático."""
+    for guild in list(bot.guilds):
+        if not auto_roles.get(str(guild.id)):
+            continue
+        try:
+            await sincronizar_membros(guild)
         except Exception as e:
-            print(f"   ⚠️ Erro ao processar aniversário de {user_id}: {e}")
+            log_membros.warning(f"⚠️ Erro na varredura do cargo automático em {guild.name}: {e}")
+
+@reconciliar_cargos_task.before_loop
+async def before_reconciliar_cargos():
+    # A sincronização inicial de membros já faz a primeira varredura
+    await bot.wait_until_ready()
+    await asyncio.sleep(INTERVALO_RECONCILIACAO_CARGOS * 3600)
+
+# ===== MODELOS DE ANIVERSÁRIO =====
+LINK_FOTO_EXEMPLO = "https://drive.google.com/exemplo"
+VARIAVEIS_MODELO = frozenset({"nome", "idade", "mencao", "servidor", "quantidade"})
+CAMPOS_TEXTO_MODELO = ("titulo", "descricao", "desejo", "rodape", "titulo_consolidado")
+MAX_POR_MENSAGEM_CONSOLIDADA = 20  # Aniversariantes por mensagem no modo consolidado
+
+MODELO_ANIVERSARIO_PADRAO = {
+    "titulo": "🎉 FELIZ ANIVERSÁRIO! 🎂",
+    "descricao": "**{nome}** ! 🎈",
+    "desejo": "Muitas felicidades, saúde e prosperidade!",
+    "mensagens": [
+        "🎉 Todo mundo, vamos comemorar! Hoje é aniversário do(a) **{nome}**! 🎂",
+        "🎈 Um feliz aniversário para nosso(a) querido(a) **{nome}**! 🎁",
+        "🎊 Parabéns, **{nome}**! Que este novo ano seja incrível! 🌟",
+    ],
+    "cor": 0xFFD700,  # Cor dourada
+    "rodape": "Desejamos a você um feliz aniversário {nome}!",
+    "foto": True,
+    "consolidado": False,
+    "titulo_consolidado": "🎉 Aniversariantes de hoje 🎂",
+}
+
+# Modelos compilados por servidor (invalidados quando a configuração muda)
+cache_modelos_aniversario = {}
+
+def validar_texto_modelo(texto):
+    """Confere se o texto só usa as variáveis permitidas; lança ValueError se não."""
+    try:
+        campos = [campo for _, campo, _, _ in string.Formatter().parse(texto) if campo is not None]
+    except ValueError as e:
+        raise ValueError(f"chaves desbalanceadas em '{texto}'") from e
+    for campo in campos:
+        if campo not in VARIAVEIS_MODELO:
+            variaveis = ", ".join(f"{{{v}}}" for v in sorted(VARIAVEIS_MODELO))
+            raise ValueError(f"variável '{{{campo}}}' inválida (use {variaveis})")
+    return texto
+
+def compilar_modelo_aniversario(personalizado):
+    """Mescla a personalização com o padrão e valida os textos uma única vez."""
+    modelo = {**MODELO_ANIVERSARIO_PADRAO, **(personalizado or {})}
+    for campo in CAMPOS_TEXTO_MODELO:
+        validar_texto_modelo(modelo[campo])
+    mensagens = tuple(validar_texto_modelo(m) for m in modelo["mensagens"]) or ("",)
+    return {
+        **{campo: modelo[campo] for campo in CAMPOS_TEXTO_MODELO},
+        "mensagens": mensagens,
+        "cor": discord.Color(modelo["cor"]),
+        "foto": bool(modelo["foto"]),
+        "consolidado": bool(modelo["consolidado"]),
+    }
+
+def modelo_aniversario(guild_id):
+    """Modelo compilado do servidor (o padrão se a personalização estiver inválida)."""
+    guild_id = str(guild_id)
+    modelo = cache_modelos_aniversario.get(guild_id)
+    if modelo is not None:
+        return modelo
     
-    print(f"📊 Total de aniversariantes hoje: {len(aniversariantes)}")
-    return aniversariantes
+    try:
+        modelo = compilar_modelo_aniversario(aniversario_modelos.get(guild_id))
+    except (ValueError, TypeError, KeyError) as e:
+        log_aniversarios.warning(f"⚠️ Modelo de aniversário inválido no servidor {guild_id}: {e} - usando o padrão")
+        modelo = compilar_modelo_aniversario(None)
+    cache_modelos_aniversario[guild_id] = modelo
+    return modelo
+
+def compilar_modelos_aniversario():
+    """Compila os modelos de todos os servidores configurados (na carga da configuração)."""
+    cache_modelos_aniversario.clear()
+    for guild_id in aniversario_modelos:
+        modelo_aniversario(guild_id)
+
+def definir_modelo_aniversario(guild_id, campo, valor):
+    """Altera um campo do modelo (valor None volta ao padrão); valida antes de gravar."""
+    guild_id = str(guild_id)
+    personalizado = dict(aniversario_modelos.get(guild_id, {}))
+    if valor is None:
+        personalizado.pop(campo, None)
+    else:
+        personalizado[campo] = valor
+    compilar_modelo_aniversario(personalizado)
+    definir_config("aniversario_modelos", guild_id, personalizado or None)
+    cache_modelos_aniversario.pop(guild_id, None)
 
-def ja_enviou_mensagem_hoje(user_id):
-    """Verifica se já enviou mensagem para este usuário hoje."""
-    hoje = date.today().isoformat()
-    return user_id in mensagens_enviadas_hoje.get(hoje, [])
+def variaveis_aniversario(aniversariante, member, guild):
+    return {
+        "nome": aniversariante["nome"],
+        "idade": aniversariante["idade"],
+        "mencao": member.mention if member else aniversariante["nome"],
+        "servidor": guild.name,
+        "quantidade": 1,
+    }
+
+def variaveis_consolidado(itens, guild):
+    """Variáveis do grupo todo (nomes, menções e idades juntos), para a mensagem consolidada."""
+    def juntar(valores):
+        valores = [str(v) for v in valores]
+        return " e ".join(filter(None, [", ".join(valores[:-1]), valores[-1]]))
+    return {
+        "nome": juntar(a["nome"] for a, _ in itens),
+        "idade": juntar(a["idade"] for a, _ in itens),
+        "mencao": juntar(m.mention if m else a["nome"] for a, m in itens),
+        "servidor": guild.name,
+        "quantidade": len(itens),
+    }
+
+def foto_aniversario(modelo, aniversariante):
+    link_foto = aniversariante.get("link_foto")
+    if modelo["foto"] and link_foto and link_foto != LINK_FOTO_EXEMPLO:
+        return link_foto
+    return None
 
-def marcar_mensagem_enviada(user_id):
-    """Marca que a mensagem foi enviada para este usuário hoje."""
-    hoje = date.today().isoformat()
-    if hoje not in mensagens_enviadas_hoje:
-        mensagens_enviadas_hoje[hoje] = []
+def aplicar_foto(embed, link_foto):
+    """Usa a cópia local da foto como anexo; sem cópia, o link (se ainda válido). Retorna os anexos."""
+    if not link_foto:
+        return []
     
-    if user_id not in mensagens_enviadas_hoje[hoje]:
-        mensagens_enviadas_hoje[hoje].append(user_id)
-        salvar_controle_mensagens()
+    anexo = cache_fotos.anexo(link_foto)
+    if anexo:
+        embed.set_image(url=f"attachment://{anexo[1]}")
+        return [anexo]
+    
+    # Não espera o download: baixa em segundo plano para os próximos envios
+    cache_fotos.agendar(link_foto)
+    if not link_expirado(link_foto):
+        embed.set_image(url=link_foto)
+    return []
 
-async def enviar_mensagem_aniversario(guild, aniversariante):
-    """Envia mensagem de aniversário personalizada."""
-    guild_id = str(guild.id)
-    canal_id = aniversario_channels.get(guild_id)
+def renderizar_aniversario(modelo, aniversariante, member, guild):
+    """Monta (conteúdo, embed, anexos) de um aniversariante a partir do modelo compilado."""
+    variaveis = variaveis_aniversario(aniversariante, member, guild)
     
+    embed = discord.Embed(
+        title=modelo["titulo"].format_map(variaveis),
+        description=modelo["descricao"].format_map(variaveis),
+        color=modelo["cor"],
+        timestamp=agora_local()
+    )
+    embed.add_field(name="🎁 Desejamos", value=modelo["desejo"].format_map(variaveis), inline=False)
+    embed.add_field(name="🎊 Idade", value=f"{aniversariante['idade']} anos", inline=True)
+    if member:
+        embed.add_field(name="👤 Membro", value=member.mention, inline=True)
+    
+    anexos = aplicar_foto(embed, foto_aniversario(modelo, aniversariante))
+    embed.set_footer(text=modelo["rodape"].format_map(variaveis))
+    
+    mensagem = random.choice(modelo["mensagens"]).format_map(variaveis)
+    # Mencionar a pessoa se ela estiver no servidor
+    if member:
+        mensagem = f"{member.mention} {mensagem}"
+    return mensagem, embed, anexos
+
+def renderizar_aniversarios_consolidado(modelo, itens, guild):
+    """Monta (conteúdo, embed, anexos) de uma única mensagem com vários aniversariantes."""
+    variaveis = variaveis_consolidado(itens, guild)
+    linhas = []
+    mencoes = []
+    for aniversariante, member in itens:
+        linhas.append(f"🎂 **{aniversariante['nome']}** - {aniversariante['idade']} anos")
+        if member:
+            mencoes.append(member.mention)
+    
+    embed = discord.Embed(
+        title=modelo["titulo_consolidado"].format_map(variaveis),
+        description="\n".join(linhas),
+        color=modelo["cor"],
+        timestamp=agora_local()
+    )
+    embed.add_field(name="🎁 Desejamos", value=modelo["desejo"].format_map(variaveis), inline=False)
+    anexos = aplicar_foto(embed, foto_aniversario(modelo, itens[0][0])) if len(itens) == 1 else []
+    return " ".join(mencoes), embed, anexos
+
+def canal_aniversario(guild):
+    """Canal de aniversários configurado no servidor (ou None, com aviso)."""
+    canal_id = aniversario_channels.get(str(guild.id))
     if not canal_id:
-        print(f"⚠️ Canal de aniversário não configurado para {guild.name}")
-        return False
+        log_aniversarios.warning(f"⚠️ Canal de aniversário não configurado para {guild.name}")
+        return None
     
     canal = guild.get_channel(canal_id)
     if not canal:
-        print(f"⚠️ Canal ID {canal_id} não encontrado em {guild.name}")
+        log_aniversarios.warning(f"⚠️ Canal ID {canal_id} não encontrado em {guild.name}")
+    return canal
+
+async def enviar_mensagem_aniversario(guild, aniversariante):
+    """Envia mensagem de aniversário personalizada."""
+    canal = canal_aniversario(guild)
+    if not canal:
         return False
     
     # Verificar se já enviou para este usuário hoje
-    if ja_enviou_mensagem_hoje(aniversariante["user_id"]):
-        print(f"⚠️ Mensagem já enviada hoje para {aniversariante['nome']}")
+    if ja_enviou_mensagem_hoje(guild.id, aniversariante["user_id"]):
+        log_aniversarios.debug("Mensagem já enviada hoje para %s", aniversariante["nome"],
+                               extra={"guild_id": guild.id, "user_id": aniversariante["id"]})
         return False
     
     try:
         # Tentar pegar o membro do servidor
-        member = guild.get_member(int(aniversariante["user_id"]))
-        
-        # Criar embed bonito
-        embed = discord.Embed(
-            title="🎉 FELIZ ANIVERSÁRIO! 🎂",
-            description=f"**{aniversariante['nome']}** ! 🎈",
-            color=0xFFD700  # Cor dourada
-        )
-        
-        # Adicionar campos
-        embed.add_field(
-            name="🎁 Desejamos", 
-            value="Muitas felicidades, saúde e prosperidade!", 
-            inline=False
-        )
-        embed.add_field(
-            name="🎊 Idade", 
-            value=f"{aniversariante['idade']} anos", 
-            inline=True
-        )
-
-        if member:
-            embed.add_field(
-                name="👤 Membro", 
-                value=member.mention, 
-                inline=True
-            )
-        
-        # Adicionar foto se disponível
-        if aniversariante["link_foto"] and aniversariante["link_foto"] != "https://drive.google.com/exemplo":
-            embed.set_image(url=aniversariante["link_foto"])
-        
-        embed.set_footer(text=f"Desejamos a você um feliz aniversário {aniversariante['nome']}!")
-        embed.timestamp = datetime.now()
-        
-        # Mensagem especial
-        mensagens_especiais = [
-            f"🎉 Todo mundo, vamos comemorar! Hoje é aniversário do(a) **{aniversariante['nome']}**! 🎂",
-            f"🎈 Um feliz aniversário para nosso(a) querido(a) **{aniversariante['nome']}**! 🎁",
-            f"🎊 Parabéns, **{aniversariante['nome']}**! Que este novo ano seja incrível! 🌟"
-        ]
-        
-        import random
-        mensagem = random.choice(mensagens_especiais)
-        
-        # Mencionar a pessoa se ela estiver no servidor
-        if member:
-            mensagem = f"{member.mention} {mensagem}"
+        member = resolver_membro(guild, aniversariante["id"])
+        mensagem, embed, anexos = renderizar_aniversario(modelo_aniversario(guild.id), aniversariante, member, guild)
         
-        await canal.send(content=mensagem, embed=embed)
+        await enviar_com_limite(canal, anexos, content=mensagem, embed=embed)
         
         # Marcar como enviado
-        marcar_mensagem_enviada(aniversariante["user_id"])
+        marcar_mensagem_enviada(guild.id, aniversariante["user_id"])
         
-        print(f"✅ Mensagem de aniversário enviada para {aniversariante['nome']} em {guild.name}")
+        log_aniversarios.info(f"✅ Mensagem de aniversário enviada para {aniversariante['nome']} em {guild.name}",
+                              extra={"guild_id": guild.id, "user_id": aniversariante["id"]})
         return True
         
     except Exception as e:
-        print(f"❌ Erro ao enviar mensagem de aniversário: {e}")
+        log_aniversarios.error(f"❌ Erro ao enviar mensagem de aniversário: {e}",
+                               extra={"guild_id": guild.id, "user_id": aniversariante["id"]})
         return False
 
-@tasks.loop(minutes=30)  # Verificar a cada 30 minutos
-async def verificar_aniversarios_task():
-    """Task que verifica aniversários apenas às 7h da manhã."""
-    try:
-        agora = datetime.now()
-        
-        # CORREÇÃO: Remover a restrição de horário para testar
-        # Verificar se são 7h da manhã (entre 7:00 e 7:29)
-        # if agora.hour != 7:
-        #     return
-        
-        print(f"🕰️ São {agora.strftime('%H:%M')} - Verificando aniversários...")
-        
-        # Limpar controle diário se necessário
-        limpar_controle_diario()
-        
-        aniversariantes = verificar_aniversariantes()
-        
-        if not aniversariantes:
-            print("ℹ️ Nenhum aniversariante hoje")
-            return
-        
-        print(f"🎉 {len(aniversariantes)} aniversariante(s) encontrado(s)!")
-        
-        # Enviar mensagem para todos os servidores configurados
-        for guild in bot.guilds:
-            for aniversariante in aniversariantes:
-                # Verificar se a pessoa está neste servidor
-                member = guild.get_member(int(aniversariante["user_id"]))
-                if member:  # Só enviar se a pessoa estiver no servidor
-                    sucesso = await enviar_mensagem_aniversario(guild, aniversariante)
-                    if sucesso:
-                        print(f"✅ Mensagem de aniversário enviada para {aniversariante['nome']} em {guild.name}")
-                    else:
-                        print(f"❌ Falha ao enviar mensagem para {aniversariante['nome']} em {guild.name}")
-    except Exception as e:
-        print(f"❌ Erro na task de aniversários: {e}")
+async def enviar_aniversarios_consolidado(guild, itens):
+    """Envia os aniversariantes do dia em poucas mensagens; retorna quantos foram enviados."""
+    canal = canal_aniversario(guild)
+    if not canal:
+        return 0
+    
+    modelo = modelo_aniversario(guild.id)
+    enviados = 0
+    for inicio in range(0, len(itens), MAX_POR_MENSAGEM_CONSOLIDADA):
+        grupo = itens[inicio:inicio + MAX_POR_MENSAGEM_CONSOLIDADA]
+        try:
+            mensagem, embed, anexos = renderizar_aniversarios_consolidado(modelo, grupo, guild)
+            await enviar_com_limite(canal, anexos, content=mensagem or None, embed=embed)
+        except Exception as e:
+            log_aniversarios.error(f"❌ Erro ao enviar aniversários consolidados em {guild.name}: {e}")
+            continue
+        for aniversariante, _ in grupo:
+            marcar_mensagem_enviada(guild.id, aniversariante["user_id"])
+        enviados += len(grupo)
+    
+    log_aniversarios.info(f"✅ {enviados} aniversariante(s) em mensagem consolidada em {guild.name}")
+    return enviados
 
-@verificar_aniversarios_task.before_loop
-async def before_verificar_aniversarios():
-    """Espera o bot estar pronto antes de começar a task."""
-    await bot.wait_until_ready()
-    print("🤖 Bot pronto - Iniciando verificação de aniversários")
+# Sem horário configurado, o envio acontece na virada do dia
+HORA_PADRAO_ANIVERSARIO = 0
+HORA_VIRADA_DIA = 0  # Disparo fixo da task: descarta o controle de envios do dia anterior
 
-# ===== CONFIGURAÇÕES DOS TIPOS DE SUPORTE =====
-SUPPORT_TYPES = {
-    "tecnico": {
-        "name": "Suporte Técnico",
-        "emoji": "🖥️",
-        "role_id": 1359194954756264120,
-        "description": "Para problemas técnicos e TI"
-    },
-    "kommo": {
-        "name": "Suporte Kommo",
-        "emoji": "📱",
-        "role_id": 1373012855271719003,
-        "description": "Para questões do sistema Kommo"
-    },
+def horario_aniversario(guild_id):
+    """Hora local (0-23) em que o servidor recebe as mensagens de aniversário."""
+    return aniversario_horarios.get(str(guild_id), HORA_PADRAO_ANIVERSARIO)
+
+def horarios_agendados():
+    """Horários de disparo da task: a hora de cada servidor e a virada do dia.
+    
+    O disparo da virada roda mesmo sem servidor nesse horário: o lote começa limpando o controle diário.
+    """
+    horas = {HORA_VIRADA_DIA}
+    horas.update(horario_aniversario(guild_id) for guild_id in aniversario_channels)
+    return [dt_time(hour=hora, tzinfo=FUSO_HORARIO) for hora in sorted(horas)]
+
+lotes_aniversario_ativos = 0            # Lotes de envio em andamento (a task não é reiniciada no meio de um)
+reinicio_aniversarios_pendente = False  # Reinício adiado até o fim do lote atual
+recuperacao_aniversarios_feita = False  # O before_loop só recupera envios perdidos uma vez por processo
+
+def atualizar_horarios_aniversario():
+    """Reagenda a task de aniversários após mudança de horário ou de canal, sem interromper um envio."""
+    global reinicio_aniversarios_pendente
+    verificar_aniversarios_task.change_interval(time=horarios_agendados())
+    
+    # Depois da primeira execução a biblioteca já recalcula a próxima espera; antes dela, só reiniciando
+    if not verificar_aniversarios_task.is_running() or verificar_aniversarios_task.current_loop > 0:
+        return
+    if lotes_aniversario_ativos:
+        reinicio_aniversarios_pendente = True
+    else:
+        verificar_aniversarios_task.restart()
+
+async def executar_lote_aniversarios(guilds):
+    """Envia as mensagens de aniversário de hoje para os servidores informados."""
+    global lotes_aniversario_ativos, reinicio_aniversarios_pendente
+    lotes_aniversario_ativos += 1
+    try:
+        await processar_lote_aniversarios(guilds)
+    finally:
+        lotes_aniversario_ativos -= 1
+        if reinicio_aniversarios_pendente and not lotes_aniversario_ativos:
+            reinicio_aniversarios_pendente = False
+            atualizar_horarios_aniversario()
+
+async def processar_lote_aniversarios(guilds):
+    # Limpar controle diário se necessário
+    limpar_controle_diario()
+    
+    guilds = [g for g in guilds if str(g.id) in aniversario_channels]
+    if not guilds:
+        return
+    
+    # Se a origem mudou, o índice é remontado em uma thread, fora do caminho de envio
+    aniversariantes = verificar_aniversariantes(await atualizar_indice_aniversarios_async())
+    
+    if not aniversariantes:
+        log_aniversarios.info("ℹ️ Nenhum aniversariante hoje")
+        return
+    
+    log_aniversarios.info(f"🎉 {len(aniversariantes)} aniversariante(s) encontrado(s)!")
+    await aguardar_membros()
+    
+    # Servidores em paralelo; dentro de cada servidor a ordem é mantida
+    inicio = time.perf_counter()
+    try:
+        resultados = await asyncio.gather(
+            *(enviar_aniversarios_servidor(guild, aniversariantes) for guild in guilds),
+            return_exceptions=True
+        )
+    except BaseException:
+        # Interrompido: grava o que já foi enviado para não repetir as mensagens
+        salvar_controle_mensagens()
+        raise
+    
+    resumo = {"enviadas": 0, "falhas": 0, "ignoradas": 0}
+    for guild, resultado in zip(guilds, resultados):
+        if isinstance(resultado, Exception):
+            log_aniversarios.error(f"❌ Erro ao enviar aniversários em {guild.name}: {resultado}")
+            resumo["falhas"] += 1
+            continue
+        for chave in resumo:
+            resumo[chave] += resultado[chave]
+    
+    # Uma única gravação do controle para o lote inteiro
+    salvar_controle_mensagens()
+    
+    resumo["servidores"] = len(guilds)
+    resumo["duracao"] = time.perf_counter() - inicio
+    resumo["horario"] = agora_local()
+    ultimo_lote_aniversarios.clear()
+    ultimo_lote_aniversarios.update(resumo)
+    
+    log_aniversarios.info(f"📊 Lote de aniversários: {resumo['enviadas']} enviada(s), {resumo['falhas']} falha(s), "
+                          f"{resumo['ignoradas']} já enviada(s) em {resumo['servidores']} servidor(es) - {resumo['duracao']:.2f}s",
+                          extra={"latencia_ms": round(resumo["duracao"] * 1000, 1)})
+
+async def enviar_aniversarios_servidor(guild, aniversariantes):
+    """Envia, em ordem, as mensagens de aniversário de um servidor."""
+    resultado = {"enviadas": 0, "falhas": 0, "ignoradas": 0}
+    consolidado = modelo_aniversario(guild.id)["consolidado"]
+    pendentes = []
+    
+    # Só enviar para quem está no servidor
+    for aniversariante in aniversariantes_no_servidor(guild, aniversariantes):
+        if ja_enviou_mensagem_hoje(guild.id, aniversariante["user_id"]):
+            resultado["ignoradas"] += 1
+            continue
+        
+        if consolidado:
+            pendentes.append((aniversariante, resolver_membro(guild, aniversariante["id"])))
+            continue
+        
+        sucesso = await enviar_mensagem_aniversario(guild, aniversariante)
+        if sucesso:
+            resultado["enviadas"] += 1
+        else:
+            resultado["falhas"] += 1
+            log_aniversarios.error(f"❌ Falha ao enviar mensagem para {aniversariante['nome']} em {guild.name}")
+    
+    if pendentes:
+        enviados = await enviar_aniversarios_consolidado(guild, pendentes)
+        resultado["enviadas"] += enviados
+        resultado["falhas"] += len(pendentes) - enviados
+    
+    return resultado
+
+@tasks.loop(time=horarios_agendados())
+@medido_task("aniversarios")
+async def verificar_aniversarios_task():
+    """Task disparada na virada do dia e no horário de envio de cada servidor."""
+    try:
+        agora = agora_local()
+        log_aniversarios.info(f"🕰️ São {agora.strftime('%H:%M')} - Verificando aniversários...")
+        
+        # Só os servidores cujo horário de envio é agora
+        guilds = [g for g in bot.guilds if horario_aniversario(g.id) == agora.hour]
+        await executar_lote_aniversarios(guilds)
+    except Exception as e:
+        log_aniversarios.error(f"❌ Erro na task de aniversários: {e}")
+
+@verificar_aniversarios_task.before_loop
+async def before_verificar_aniversarios():
+    """Espera o bot estar pronto e recupera envios perdidos enquanto estava offline."""
+    global recuperacao_aniversarios_feita
+    await bot.wait_until_ready()
+    log_aniversarios.info("🤖 Bot pronto - Iniciando verificação de aniversários")
+    if recuperacao_aniversarios_feita:
+        return
+    recuperacao_aniversarios_feita = True
+    
+    try:
+        await preparar_indice_aniversarios()
+        agora = agora_local()
+        atrasados = [g for g in bot.guilds if horario_aniversario(g.id) <= agora.hour]
+        if atrasados:
+            log_aniversarios.info(f"⏪ Recuperando envios de hoje para {len(atrasados)} servidor(es)")
+            await executar_lote_aniversarios(atrasados)
+    except Exception as e:
+        log_aniversarios.error(f"❌ Erro ao recuperar aniversários pendentes: {e}")
+
+# ===== CONFIGURAÇÕES DOS TIPOS DE SUPORTE =====
+# Tipos padrão, usados enquanto o servidor não personaliza os seus com !tiposuporte
+SUPPORT_TYPES = {
+    "tecnico": {
+        "name": "Suporte Técnico",
+        "emoji": "🖥️",
+        "role_id": 1359194954756264120,
+        "description": "Para problemas técnicos e TI"
+    },
+    "kommo": {
+        "name": "Suporte Kommo",
+        "emoji": "📱",
+        "role_id": 1373012855271719003,
+        "description": "Para questões do sistema Kommo"
+    },
     "rh": {
         "name": "Suporte RH",
         "emoji": "👥",
@@ -341,52 +1367,1186 @@ SUPPORT_TYPES = {
     }
 }
 
+MAX_TIPOS_SUPORTE = 25  # Limite de opções de um Select do Discord
+
+# Estruturas pré-calculadas por servidor (invalidadas quando os tipos mudam)
+cache_tipos_suporte = {}
+
+def registro_suporte(guild_id):
+    """Tipos de suporte do servidor com conjuntos de cargos e textos pré-calculados."""
+    guild_id = str(guild_id)
+    registro = cache_tipos_suporte.get(guild_id)
+    if registro is not None:
+        return registro
+    
+    tipos = tipos_suporte.get(guild_id) or SUPPORT_TYPES
+    registro = {
+        "tipos": tipos,
+        # IDs de todos os cargos de suporte (checagem de permissão em O(1) por cargo)
+        "cargos": frozenset(info["role_id"] for info in tipos.values()),
+        # Cargo -> tipo de suporte
+        "tipo_por_cargo": {info["role_id"]: chave for chave, info in tipos.items()},
+        "mencoes": {chave: f"<@&{info['role_id']}>" for chave, info in tipos.items()},
+        "linhas_painel": "\n".join(
+            f"{info['emoji']} **{info['name']}** - {info['description']}" for info in tipos.values()
+        ),
+        "opcoes": [(chave, info["name"], info["description"], info["emoji"]) for chave, info in tipos.items()],
+    }
+    cache_tipos_suporte[guild_id] = registro
+    return registro
+
+def tem_cargo_suporte(member):
+    """Verifica se o membro tem algum cargo de suporte do servidor."""
+    cargos = registro_suporte(member.guild.id)["cargos"]
+    return any(role.id in cargos for role in member.roles)
+
+def definir_tipo_suporte(guild_id, chave, info):
+    """Adiciona ou edita um tipo de suporte do servidor (ou remove, com info None)."""
+    guild_id = str(guild_id)
+    # Copia os tipos atuais (ou os padrão) para não alterar o dicionário em uso
+    tipos = {k: dict(v) for k, v in registro_suporte(guild_id)["tipos"].items()}
+    if info is None:
+        tipos.pop(chave, None)
+    else:
+        tipos[chave] = info
+    definir_config("tipos_suporte", guild_id, tipos)
+    cache_tipos_suporte.pop(guild_id, None)
+
 # ===== DATA MANAGEMENT =====
-def salvar_dados():
-    dados = {
-        "auto_roles": auto_roles,
-        "ticket_response_channels": ticket_response_channels,
-        "mention_roles": mention_roles,
-        "sugestao_channels": sugestao_channels,
-        "ticket_categories": ticket_categories,
-        "ticket_support_roles": ticket_support_roles,
-        "aniversario_channels": aniversario_channels,
+ARQUIVO_DADOS = "dados_servidor.json"
+ARQUIVO_TICKETS = "tickets.json"
+ARQUIVO_PEDIDOS = "pedidos_cargo.json"
+JANELA_SALVAMENTO = 2.0  # Segundos para agrupar alterações antes de gravar
+
+class GravadorJSON:
+    """Agrupa alterações de um arquivo JSON e grava de forma atômica fora do event loop."""
+
+    def __init__(self, caminho, montar, indent=None):
+        self.caminho = caminho
+        self.montar = montar            # Função que copia os dados a gravar
+        self.indent = indent
+        self.agendado = None            # Task que grava após a janela
+        self.ultimo_conteudo = None     # Conteúdo gravado por último (evita regravar o mesmo)
+        self.trava = threading.Lock()
+
+    def serializar(self, dados):
+        return json.dumps(dados, indent=self.indent, ensure_ascii=False)
+
+    def gravar(self, dados):
+        """Serializa e grava de forma atômica, pulando se nada mudou."""
+        with self.trava:
+            conteudo = self.serializar(dados)
+            if conteudo == self.ultimo_conteudo:
+                return False
+            
+            temporario = f"{self.caminho}.tmp"
+            with open(temporario, "w", encoding="utf-8") as f:
+                f.write(conteudo)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporario, self.caminho)
+            self.ultimo_conteudo = conteudo
+            return True
+
+    def gravar_agora(self):
+        """Grava imediatamente (usado fora do event loop, ex.: ao encerrar)."""
+        try:
+            if self.gravar(self.montar()):
+                log_dados.debug(f"✅ {self.caminho} salvo com sucesso")
+        except Exception as e:
+            log_dados.warning(f"⚠️ Erro ao salvar {self.caminho}: {e}")
+
+    async def gravar_apos_janela(self):
+        """Espera a janela de agrupamento e grava em uma thread separada."""
+        await asyncio.sleep(JANELA_SALVAMENTO)
+        # Cópia feita no event loop; alterações a partir daqui agendam nova gravação
+        dados = self.montar()
+        self.agendado = None
+        
+        try:
+            if await asyncio.to_thread(self.gravar, dados):
+                log_dados.debug(f"✅ {self.caminho} salvo com sucesso")
+        except Exception as e:
+            log_dados.warning(f"⚠️ Erro ao salvar {self.caminho}: {e}")
+
+    def agendar(self):
+        """Marca os dados como alterados; a gravação é agrupada e feita fora do event loop."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.gravar_agora()
+            return
+        
+        if self.agendado is None:
+            self.agendado = loop.create_task(self.gravar_apos_janela())
+
+    def pendente(self):
+        return self.agendado is not None
+
+def montar_dados():
+    """Cópia dos dados de configuração para serializar fora do event loop."""
+    return {secao: dict(valores) for secao, valores in CONFIGS.items()}
+
+gravador_dados = GravadorJSON(ARQUIVO_DADOS, montar_dados, indent=4)
+
+def montar_tickets():
+    """Cópia do registro de tickets para serializar fora do event loop."""
+    return {channel_id: dict(ticket) for channel_id, ticket in tickets.items()}
+
+gravador_tickets = GravadorJSON(ARQUIVO_TICKETS, montar_tickets)
+
+def montar_pedidos():
+    """Cópia dos pedidos de cargo para serializar fora do event loop."""
+    return {pedido_id: dict(pedido) for pedido_id, pedido in pedidos_cargo.items()}
+
+gravador_pedidos = GravadorJSON(ARQUIVO_PEDIDOS, montar_pedidos)
+
+def montar_envios():
+    """Cópia do controle de mensagens enviadas para serializar fora do event loop."""
+    return {
+        data: {guild_id: sorted(user_ids) for guild_id, user_ids in por_servidor.items()}
+        for data, por_servidor in mensagens_enviadas_hoje.items()
     }
-    
-    try:
-        with open("dados_servidor.json", "w", encoding="utf-8") as f:
-            json.dump(dados, f, indent=4, ensure_ascii=False)
-        print("✅ Dados salvos com sucesso")
-    except Exception as e:
-        print(f"⚠️ Erro ao salvar dados: {e}")
+
+gravador_envios = GravadorJSON(ARQUIVO_CONTROLE_MENSAGENS, montar_envios)
+
+def salvar_dados():
+    """Agenda a gravação do dados_servidor.json."""
+    gravador_dados.agendar()
 
 def carregar_dados():
     try:
-        if os.path.exists("dados_servidor.json"):
-            with open("dados_servidor.json", "r", encoding="utf-8") as f:
+        armazenamento.abrir()
+        dados = armazenamento.carregar_config()
+        for secao, valores in CONFIGS.items():
+            valores.update(dados.get(secao, {}))
+        tickets.update(armazenamento.carregar_tickets())
+        reindexar_tickets_abertos()
+        pedidos_cargo.update(armazenamento.carregar_pedidos())
+        reindexar_pedidos_pendentes()
+        compilar_modelos_aniversario()
+        log_dados.info(f"✅ Dados carregados com sucesso ({armazenamento.nome})")
+    except Exception as e:
+        log_dados.warning(f"⚠️ Erro ao carregar dados: {e}")
+    carregar_controle_mensagens()
+    carregar_limpezas()
+
+async def carregar_dados_async():
+    """Carrega os dados em uma thread (em paralelo com o login)."""
+    await asyncio.to_thread(carregar_dados)
+    marcar_inicializacao("dados")
+
+def recarregar_config():
+    """Relê as configurações do armazenamento e aplica sem reconectar; retorna quantos servidores têm configuração."""
+    dados = armazenamento.carregar_config()
+    for secao, valores in CONFIGS.items():
+        valores.clear()
+        valores.update(dados.get(secao, {}))
+    cache_tipos_suporte.clear()
+    compilar_modelos_aniversario()
+    atualizar_horarios_aniversario()
+    servidores = {guild_id for valores in CONFIGS.values() for guild_id in valores}
+    log_dados.info(f"🔄 Configurações recarregadas ({len(servidores)} servidor(es))")
+    return len(servidores)
+
+def definir_config(secao, guild_id, valor):
+    """Altera (ou remove, com valor None) uma configuração do servidor e persiste só essa entrada."""
+    guild_id = str(guild_id)
+    if valor is None:
+        CONFIGS[secao].pop(guild_id, None)
+    else:
+        CONFIGS[secao][guild_id] = valor
+    armazenamento.salvar_config(secao, guild_id, valor)
+
+def remover_config_servidor(guild_id):
+    """Remove todas as configurações de um servidor."""
+    guild_id = str(guild_id)
+    for valores in CONFIGS.values():
+        valores.pop(guild_id, None)
+    cache_tipos_suporte.pop(guild_id, None)
+    cache_modelos_aniversario.pop(guild_id, None)
+    armazenamento.remover_servidor(guild_id)
+
+# ===== ARMAZENAMENTO =====
+trava_arquivo_aniversarios = threading.Lock()
+
+class ArmazenamentoJSON:
+    """Guarda configurações, aniversários e controle de envios em arquivos JSON."""
+    nome = "json"
+    grava_em_lotes = False  # Cada gravação reescreve o arquivo inteiro: a importação grava uma vez só
+
+    def __init__(self):
+        self.caminho_aniversarios = None
+
+    def abrir(self):
+        pass
+
+    def fechar(self):
+        # Gravar alterações que ainda estavam na janela de agrupamento
+        for gravador in (gravador_dados, gravador_tickets, gravador_pedidos, gravador_envios):
+            if gravador.pendente():
+                gravador.gravar_agora()
+
+    def carregar_config(self):
+        if not os.path.exists(ARQUIVO_DADOS):
+            return {}
+        with open(ARQUIVO_DADOS, "r", encoding="utf-8") as f:
+            dados = json.load(f)
+        dados = {secao: dados.get(secao, {}) for secao in CONFIGS}
+        gravador_dados.ultimo_conteudo = gravador_dados.serializar(dados)
+        return dados
+
+    def salvar_config(self, secao, guild_id, valor):
+        salvar_dados()
+
+    def remover_servidor(self, guild_id):
+        salvar_dados()
+
+    def assinatura_aniversarios(self):
+        caminho, assinatura = localizar_arquivo_aniversarios(self.caminho_aniversarios)
+        self.caminho_aniversarios = caminho
+        return (caminho, assinatura) if caminho else None
+
+    def origem_aniversarios(self):
+        return f"Arquivo {self.caminho_aniversarios}"
+
+    def ler_aniversarios(self):
+        with open(self.caminho_aniversarios, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def salvar_aniversarios(self, registros):
+        """Mescla os registros no arquivo de aniversários (gravação atômica)."""
+        with trava_arquivo_aniversarios:
+            caminho = self.caminho_aniversarios or localizar_arquivo_aniversarios()[0] or CAMINHOS_ANIVERSARIOS[0]
+            dados = {}
+            if os.path.exists(caminho):
+                with open(caminho, "r", encoding="utf-8") as f:
+                    dados = json.load(f)
+            dados.update(registros)
+            escrever_json_atomico(caminho, dados, indent=2)
+        return None
+
+    def remover_aniversarios(self, user_ids):
+        """Remove os registros; retorna os IDs que existiam e foram removidos."""
+        with trava_arquivo_aniversarios:
+            caminho = self.caminho_aniversarios or localizar_arquivo_aniversarios()[0]
+            if not caminho:
+                return []
+            with open(caminho, "r", encoding="utf-8") as f:
                 dados = json.load(f)
-                auto_roles.update(dados.get("auto_roles", {}))
-                ticket_response_channels.update(dados.get("ticket_response_channels", {}))
-                mention_roles.update(dados.get("mention_roles", {}))
-                sugestao_channels.update(dados.get("sugestao_channels", {}))
-                ticket_categories.update(dados.get("ticket_categories", {}))
-                ticket_support_roles.update(dados.get("ticket_support_roles", {}))
-                aniversario_channels.update(dados.get("aniversario_channels", {}))
-                print("✅ Dados carregados com sucesso")
+            removidos = [user_id for user_id in user_ids if dados.pop(user_id, None) is not None]
+            if removidos:
+                escrever_json_atomico(caminho, dados, indent=2)
+        return removidos
+
+    def iterar_aniversarios(self):
+        caminho = self.caminho_aniversarios or localizar_arquivo_aniversarios()[0]
+        if not caminho:
+            return
+        with open(caminho, "r", encoding="utf-8") as f:
+            dados = json.load(f)
+        for user_id, info in dados.items():
+            yield user_id, info.get("nome", ""), info.get("data_nascimento", ""), info.get("link_foto", "")
+
+    def carregar_envios(self):
+        if not os.path.exists(ARQUIVO_CONTROLE_MENSAGENS):
+            return {}
+        with open(ARQUIVO_CONTROLE_MENSAGENS, "r", encoding="utf-8") as f:
+            dados = json.load(f)
+        # Formato antigo: {data: [user_ids]}
+        return {
+            data: {TODOS_SERVIDORES: envios} if isinstance(envios, list) else envios
+            for data, envios in dados.items()
+        }
+
+    def carregar_tickets(self):
+        if not os.path.exists(ARQUIVO_TICKETS):
+            return {}
+        with open(ARQUIVO_TICKETS, "r", encoding="utf-8") as f:
+            dados = json.load(f)
+        gravador_tickets.ultimo_conteudo = gravador_tickets.serializar(dados)
+        return dados
+
+    def salvar_ticket(self, channel_id, ticket):
+        gravador_tickets.agendar()
+
+    def carregar_pedidos(self):
+        if not os.path.exists(ARQUIVO_PEDIDOS):
+            return {}
+        with open(ARQUIVO_PEDIDOS, "r", encoding="utf-8") as f:
+            dados = json.load(f)
+        gravador_pedidos.ultimo_conteudo = gravador_pedidos.serializar(dados)
+        return dados
+
+    def salvar_pedido(self, pedido_id, pedido):
+        gravador_pedidos.agendar()
+
+    def salvar_envios(self, envios, novos):
+        gravador_envios.agendar()
+
+ESQUEMA_SQLITE = """
+CREATE TABLE IF NOT EXISTS config (
+    secao TEXT NOT NULL,
+    guild_id TEXT NOT NULL,
+    valor TEXT NOT NULL,
+    PRIMARY KEY (secao, guild_id)
+);
+CREATE TABLE IF NOT EXISTS aniversarios (
+    user_id TEXT PRIMARY KEY,
+    nome TEXT NOT NULL,
+    data_nascimento TEXT NOT NULL,
+    mes INTEGER,
+    dia INTEGER,
+    link_foto TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_aniversarios_mes_dia ON aniversarios (mes, dia);
+CREATE TABLE IF NOT EXISTS envios (
+    data TEXT NOT NULL,
+    guild_id TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    PRIMARY KEY (data, guild_id, user_id)
+);
+CREATE TABLE IF NOT EXISTS tickets (
+    channel_id TEXT PRIMARY KEY,
+    guild_id TEXT NOT NULL,
+    owner_id TEXT,
+    tipo TEXT,
+    status TEXT NOT NULL,
+    dados TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tickets_dono ON tickets (guild_id, owner_id, status);
+CREATE TABLE IF NOT EXISTS pedidos_cargo (
+    pedido_id TEXT PRIMARY KEY,
+    guild_id TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    dados TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_pedidos_status ON pedidos_cargo (guild_id, status);
+CREATE TABLE IF NOT EXISTS meta (
+    chave TEXT PRIMARY KEY,
+    valor INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (chave, valor) VALUES ('versao_aniversarios', 0);
+CREATE TRIGGER IF NOT EXISTS aniversarios_insert AFTER INSERT ON aniversarios BEGIN
+    UPDATE meta SET valor = valor + 1 WHERE chave = 'versao_aniversarios';
+END;
+CREATE TRIGGER IF NOT EXISTS aniversarios_update AFTER UPDATE ON aniversarios BEGIN
+    UPDATE meta SET valor = valor + 1 WHERE chave = 'versao_aniversarios';
+END;
+CREATE TRIGGER IF NOT EXISTS aniversarios_delete AFTER DELETE ON aniversarios BEGIN
+    UPDATE meta SET valor = valor + 1 WHERE chave = 'versao_aniversarios';
+END;
+"""
+
+def linha_aniversario(user_id, dados):
+    """Converte um registro de aniversário em linha da tabela (mês/dia vazios se a data for inválida)."""
+    data_nascimento = str(dados.get("data_nascimento", ""))
+    try:
+        nascimento = datetime.strptime(data_nascimento, "%Y-%m-%d")
+        mes, dia = nascimento.month, nascimento.day
+    except ValueError:
+        mes, dia = None, None
+    return (str(user_id), dados.get("nome", ""), data_nascimento, mes, dia, dados.get("link_foto") or "")
+
+def linha_pedido(pedido_id, pedido):
+    """Converte um pedido de cargo em linha da tabela (colunas indexadas + JSON completo)."""
+    return (str(pedido_id), str(pedido["guild_id"]), str(pedido["user_id"]), pedido["status"],
+            json.dumps(pedido, ensure_ascii=False))
+
+def linha_ticket(channel_id, ticket):
+    """Converte um ticket do registro em linha da tabela (colunas indexadas + JSON completo)."""
+    owner_id = ticket.get("owner_id")
+    return (
+        str(channel_id),
+        str(ticket["guild_id"]),
+        str(owner_id) if owner_id is not None else None,
+        ticket.get("tipo"),
+        ticket["status"],
+        json.dumps(ticket, ensure_ascii=False),
+    )
+
+class ArmazenamentoSQLite:
+    """Guarda tudo em SQLite (WAL); todas as escritas passam por uma única thread."""
+    nome = "sqlite"
+    grava_em_lotes = True
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+        self.conexao_escrita = None  # Usada só pela thread de escrita
+        self.leitura = threading.local()  # Uma conexão de leitura por thread (event loop e workers do to_thread)
+        self.conexoes_leitura = []
+        self.trava_conexoes = threading.Lock()
+
+    @property
+    def conexao_leitura(self):
+        """Conexão de leitura da thread atual (uma conexão sqlite3 não pode ser usada por duas threads ao mesmo tempo)."""
+        conexao = getattr(self.leitura, "conexao", None)
+        if conexao is None:
+            # check_same_thread=False só para o fechar(), que roda em outra thread
+            conexao = self.leitura.conexao = sqlite3.connect(self.caminho, check_same_thread=False)
+            with self.trava_conexoes:
+                self.conexoes_leitura.append(conexao)
+        return conexao
+
+    def abrir(self):
+        if self.conexao_escrita:
+            return
+        self.executor.submit(self._abrir_escrita).result()
+        self.executor.submit(self._transacao, self._importar_json).result()
+
+    def fechar(self):
+        self.executor.shutdown(wait=True)
+        with self.trava_conexoes:
+            conexoes = [self.conexao_escrita, *self.conexoes_leitura]
+            self.conexoes_leitura.clear()
+        for conexao in conexoes:
+            if conexao:
+                conexao.close()
+
+    def _abrir_escrita(self):
+        conexao = sqlite3.connect(self.caminho, check_same_thread=False)
+        conexao.execute("PRAGMA journal_mode=WAL")
+        conexao.execute("PRAGMA synchronous=NORMAL")
+        conexao.executescript(ESQUEMA_SQLITE)
+        self.conexao_escrita = conexao
+
+    def _transacao(self, funcao, *args):
+        with self.conexao_escrita:
+            return funcao(self.conexao_escrita, *args)
+
+    def executar(self, funcao, *args):
+        """Agenda uma escrita na thread do banco e retorna o Future (use asyncio.wrap_future para aguardar)."""
+        futuro = self.executor.submit(self._transacao, funcao, *args)
+        futuro.add_done_callback(self._verificar_erro)
+        return futuro
+
+    @staticmethod
+    def _verificar_erro(futuro):
+        if not futuro.cancelled() and futuro.exception():
+            log_dados.warning(f"⚠️ Erro ao gravar no banco: {futuro.exception()}")
+
+    def _importar_json(self, conexao):
+        """Importa os arquivos JSON existentes na primeira vez que o banco é aberto."""
+        importados = {chave for (chave,) in conexao.execute("SELECT chave FROM meta WHERE chave LIKE 'importado_%'")}
+
+        if "importado_config" not in importados:
+            if os.path.exists(ARQUIVO_DADOS):
+                with open(ARQUIVO_DADOS, "r", encoding="utf-8") as f:
+                    dados = json.load(f)
+                conexao.executemany(
+                    "INSERT OR REPLACE INTO config (secao, guild_id, valor) VALUES (?, ?, ?)",
+                    [(secao, guild_id, json.dumps(valor))
+                     for secao in CONFIGS for guild_id, valor in dados.get(secao, {}).items()]
+                )
+                log_dados.info(f"📥 Configurações importadas de {ARQUIVO_DADOS}")
+            conexao.execute("INSERT INTO meta (chave, valor) VALUES ('importado_config', 1)")
+
+        if "importado_aniversarios" not in importados:
+            caminho, _ = localizar_arquivo_aniversarios()
+            if caminho:
+                with open(caminho, "r", encoding="utf-8") as f:
+                    dados = json.load(f)
+                conexao.executemany(
+                    "INSERT OR REPLACE INTO aniversarios (user_id, nome, data_nascimento, mes, dia, link_foto) VALUES (?, ?, ?, ?, ?, ?)",
+                    [linha_aniversario(user_id, info) for user_id, info in dados.items()]
+                )
+                log_dados.info(f"📥 {len(dados)} aniversários importados de {caminho}")
+            conexao.execute("INSERT INTO meta (chave, valor) VALUES ('importado_aniversarios', 1)")
+
+        if "importado_envios" not in importados:
+            envios = ArmazenamentoJSON().carregar_envios()
+            conexao.executemany(
+                "INSERT OR IGNORE INTO envios (data, guild_id, user_id) VALUES (?, ?, ?)",
+                [(data, guild_id, user_id)
+                 for data, por_servidor in envios.items()
+                 for guild_id, user_ids in por_servidor.items()
+                 for user_id in user_ids]
+            )
+            conexao.execute("INSERT INTO meta (chave, valor) VALUES ('importado_envios', 1)")
+
+        if "importado_tickets" not in importados:
+            if os.path.exists(ARQUIVO_TICKETS):
+                with open(ARQUIVO_TICKETS, "r", encoding="utf-8") as f:
+                    dados = json.load(f)
+                conexao.executemany(
+                    "INSERT OR REPLACE INTO tickets (channel_id, guild_id, owner_id, tipo, status, dados) VALUES (?, ?, ?, ?, ?, ?)",
+                    [linha_ticket(channel_id, ticket) for channel_id, ticket in dados.items()]
+                )
+            conexao.execute("INSERT INTO meta (chave, valor) VALUES ('importado_tickets', 1)")
+
+        if "importado_pedidos" not in importados:
+            if os.path.exists(ARQUIVO_PEDIDOS):
+                with open(ARQUIVO_PEDIDOS, "r", encoding="utf-8") as f:
+                    dados = json.load(f)
+                conexao.executemany(
+                    "INSERT OR REPLACE INTO pedidos_cargo (pedido_id, guild_id, user_id, status, dados) VALUES (?, ?, ?, ?, ?)",
+                    [linha_pedido(pedido_id, pedido) for pedido_id, pedido in dados.items()]
+                )
+            conexao.execute("INSERT INTO meta (chave, valor) VALUES ('importado_pedidos', 1)")
+
+    def carregar_config(self):
+        dados = {}
+        for secao, guild_id, valor in self.conexao_leitura.execute("SELECT secao, guild_id, valor FROM config"):
+            dados.setdefault(secao, {})[guild_id] = json.loads(valor)
+        return dados
+
+    def salvar_config(self, secao, guild_id, valor):
+        if valor is None:
+            self.executar(lambda c: c.execute("DELETE FROM config WHERE secao = ? AND guild_id = ?", (secao, guild_id)))
+        else:
+            self.executar(lambda c: c.execute(
+                "INSERT OR REPLACE INTO config (secao, guild_id, valor) VALUES (?, ?, ?)",
+                (secao, guild_id, json.dumps(valor))
+            ))
+
+    def remover_servidor(self, guild_id):
+        self.executar(lambda c: c.execute("DELETE FROM config WHERE guild_id = ?", (guild_id,)))
+
+    def assinatura_aniversarios(self):
+        (versao,) = self.conexao_leitura.execute(
+            "SELECT valor FROM meta WHERE chave = 'versao_aniversarios'"
+        ).fetchone()
+        return versao
+
+    def origem_aniversarios(self):
+        return f"Banco {self.caminho}"
+
+    def ler_aniversarios(self):
+        return {
+            user_id: {"nome": nome, "data_nascimento": data_nascimento, "link_foto": link_foto}
+            for user_id, nome, data_nascimento, link_foto in self.conexao_leitura.execute(
+                "SELECT user_id, nome, data_nascimento, link_foto FROM aniversarios"
+            )
+        }
+
+    def carregar_tickets(self):
+        return {
+            channel_id: json.loads(dados)
+            for channel_id, dados in self.conexao_leitura.execute("SELECT channel_id, dados FROM tickets")
+        }
+
+    def salvar_ticket(self, channel_id, ticket):
+        linha = linha_ticket(channel_id, ticket)
+        self.executar(lambda c: c.execute(
+            "INSERT OR REPLACE INTO tickets (channel_id, guild_id, owner_id, tipo, status, dados) VALUES (?, ?, ?, ?, ?, ?)",
+            linha
+        ))
+
+    def carregar_pedidos(self):
+        return {
+            pedido_id: json.loads(dados)
+            for pedido_id, dados in self.conexao_leitura.execute("SELECT pedido_id, dados FROM pedidos_cargo")
+        }
+
+    def salvar_pedido(self, pedido_id, pedido):
+        linha = linha_pedido(pedido_id, pedido)
+        self.executar(lambda c: c.execute(
+            "INSERT OR REPLACE INTO pedidos_cargo (pedido_id, guild_id, user_id, status, dados) VALUES (?, ?, ?, ?, ?)",
+            linha
+        ))
+
+    def salvar_aniversarios(self, registros):
+        """Insere/atualiza os registros; retorna o Future da gravação."""
+        linhas = [linha_aniversario(user_id, info) for user_id, info in registros.items()]
+        return self.executar(lambda c: c.executemany(
+            "INSERT OR REPLACE INTO aniversarios (user_id, nome, data_nascimento, mes, dia, link_foto) VALUES (?, ?, ?, ?, ?, ?)",
+            linhas
+        ))
+
+    def remover_aniversarios(self, user_ids):
+        """Remove os registros; retorna o Future com quantos existiam e foram removidos."""
+        linhas = [(str(user_id),) for user_id in user_ids]
+        return self.executar(lambda c: c.executemany("DELETE FROM aniversarios WHERE user_id = ?", linhas).rowcount)
+
+    def iterar_aniversarios(self):
+        # Conexão própria: a exportação roda em outra thread
+        conexao = sqlite3.connect(self.caminho)
+        try:
+            yield from conexao.execute(
+                "SELECT user_id, nome, data_nascimento, link_foto FROM aniversarios ORDER BY mes, dia, nome"
+            )
+        finally:
+            conexao.close()
+
+    def carregar_envios(self):
+        envios = {}
+        for data, guild_id, user_id in self.conexao_leitura.execute("SELECT data, guild_id, user_id FROM envios"):
+            envios.setdefault(data, {}).setdefault(guild_id, set()).add(user_id)
+        return envios
+
+    def salvar_envios(self, envios, novos):
+        datas = list(envios)
+
+        def gravar(conexao):
+            marcadores = ", ".join("?" * len(datas))
+            conexao.execute(f"DELETE FROM envios WHERE data NOT IN ({marcadores})", datas)
+            conexao.executemany("INSERT OR IGNORE INTO envios (data, guild_id, user_id) VALUES (?, ?, ?)", novos)
+
+        self.executar(gravar)
+
+def criar_armazenamento():
+    """Escolhe o backend de armazenamento pela variável BOT_ARMAZENAMENTO (json ou sqlite)."""
+    tipo = os.getenv("BOT_ARMAZENAMENTO", "json").lower()
+    if tipo == "sqlite":
+        return ArmazenamentoSQLite(os.getenv("BOT_SQLITE", "bot.db"))
+    return ArmazenamentoJSON()
+
+armazenamento = criar_armazenamento()
+
+# ===== IMPORTAÇÃO / EXPORTAÇÃO DE ANIVERSÁRIOS =====
+CAMPOS_ANIVERSARIO = ("user_id", "nome", "data_nascimento", "link_foto")
+TAMANHO_LOTE_IMPORTACAO = 500
+TAMANHO_PEDACO_DOWNLOAD = 1024 * 1024
+COMANDOS_CLI = ("importar-aniversarios", "exportar-aniversarios")
+
+def formato_do_arquivo(nome):
+    """Formato (csv ou jsonl) pela extensão do arquivo."""
+    nome = nome.lower()
+    if nome.endswith(".csv"):
+        return "csv"
+    if nome.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    return None
+
+def ler_linhas_aniversario(linhas, formato):
+    """Gera (número da linha, registro ou exceção) a partir de linhas CSV ou JSONL."""
+    if formato == "csv":
+        leitor = csv.DictReader(linhas)
+        for registro in leitor:
+            yield leitor.line_num, registro
+        return
+    
+    for numero, linha in enumerate(linhas, 1):
+        if not linha.strip():
+            continue
+        try:
+            yield numero, json.loads(linha)
+        except json.JSONDecodeError as e:
+            yield numero, e
+
+def validar_aniversario(registro, membros=None):
+    """Valida e normaliza uma linha; retorna (user_id, dados) ou lança ValueError."""
+    if not isinstance(registro, dict):
+        raise ValueError("linha não é um objeto")
+    
+    user_id = str(registro.get("user_id") or "").strip()
+    if not user_id.isdigit():
+        raise ValueError("user_id inválido")
+    if membros is not None and int(user_id) not in membros:
+        raise ValueError("usuário não está no servidor")
+    
+    nome = str(registro.get("nome") or "").strip()
+    if not nome:
+        raise ValueError("nome vazio")
+    
+    texto_data = str(registro.get("data_nascimento") or "").strip()
+    for formato in ("%Y-%m-%d", "%d/%m/%Y"):
+        try:
+            nascimento = datetime.strptime(texto_data, formato).date()
+            break
+        except ValueError:
+            continue
+    else:
+        raise ValueError(f"data inválida '{texto_data}' (use AAAA-MM-DD ou DD/MM/AAAA)")
+    if nascimento > hoje_local():
+        raise ValueError("data de nascimento no futuro")
+    
+    link_foto = str(registro.get("link_foto") or "").strip()
+    if link_foto:
+        url = urlparse(link_foto)
+        if url.scheme not in ("http", "https") or not url.netloc:
+            raise ValueError("link_foto não é uma URL http(s)")
+    
+    return user_id, {"nome": nome, "data_nascimento": nascimento.isoformat(), "link_foto": link_foto}
+
+def importar_aniversarios(linhas, formato, membros=None):
+    """Valida as linhas em fluxo e grava em lotes; retorna (importados, erros). Roda fora do event loop."""
+    importados = 0
+    erros = []
+    lote = {}
+    gravacoes = []
+    
+    def gravar_lote():
+        nonlocal importados
+        if lote:
+            futuro = armazenamento.salvar_aniversarios(dict(lote))
+            if futuro is not None:
+                gravacoes.append(futuro)
+            importados += len(lote)
+            lote.clear()
+    
+    for numero, registro in ler_linhas_aniversario(linhas, formato):
+        try:
+            if isinstance(registro, Exception):
+                raise ValueError(f"JSON inválido: {registro}")
+            user_id, dados = validar_aniversario(registro, membros)
+        except ValueError as e:
+            user_id = registro.get("user_id", "") if isinstance(registro, dict) else ""
+            erros.append((numero, user_id, str(e)))
+            continue
+        
+        lote[user_id] = dados
+        if armazenamento.grava_em_lotes and len(lote) >= TAMANHO_LOTE_IMPORTACAO:
+            gravar_lote()
+    gravar_lote()
+    
+    # Só reporta depois que tudo foi gravado
+    for futuro in gravacoes:
+        futuro.result()
+    return importados, erros
+
+async def baixar_anexo(anexo):
+    """Baixa o anexo em pedaços para um arquivo temporário (sem montar o conteúdo inteiro na memória)."""
+    temporario = tempfile.TemporaryFile("w+b")
+    try:
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=120)) as sessao:
+            async with sessao.get(anexo.url) as resposta:
+                resposta.raise_for_status()
+                async for pedaco in resposta.content.iter_chunked(TAMANHO_PEDACO_DOWNLOAD):
+                    await asyncio.to_thread(temporario.write, pedaco)
+        temporario.seek(0)
+    except BaseException:
+        temporario.close()
+        raise
+    return temporario
+
+def relatorio_erros_csv(erros):
+    """Relatório de erros da importação em CSV."""
+    saida = io.StringIO()
+    escritor = csv.writer(saida)
+    escritor.writerow(("linha", "user_id", "erro"))
+    escritor.writerows(erros)
+    return saida.getvalue().encode("utf-8")
+
+def exportar_aniversarios(saida, formato):
+    """Grava os aniversários no arquivo de saída, registro a registro; retorna o total."""
+    total = 0
+    if formato == "csv":
+        escritor = csv.writer(saida)
+        escritor.writerow(CAMPOS_ANIVERSARIO)
+    for linha in armazenamento.iterar_aniversarios():
+        if formato == "csv":
+            escritor.writerow(linha)
+        else:
+            saida.write(json.dumps(dict(zip(CAMPOS_ANIVERSARIO, linha)), ensure_ascii=False) + "\n")
+        total += 1
+    return total
+
+def executar_cli(argumentos):
+    """Linha de comando: importar-aniversarios <arquivo> | exportar-aniversarios <arquivo>."""
+    import argparse
+    
+    parser = argparse.ArgumentParser(prog="bot.py", description="Importação/exportação de aniversários")
+    parser.add_argument("comando", choices=COMANDOS_CLI)
+    parser.add_argument("arquivo", help="Arquivo .csv ou .jsonl")
+    args = parser.parse_args(argumentos)
+    
+    formato = formato_do_arquivo(args.arquivo)
+    if not formato:
+        print("❌ Use um arquivo .csv ou .jsonl")
+        return 1
+    
+    armazenamento.abrir()
+    inicio = time.perf_counter()
+    
+    if args.comando == "exportar-aniversarios":
+        with open(args.arquivo, "w", encoding="utf-8", newline="") as saida:
+            total = exportar_aniversarios(saida, formato)
+        print(f"📤 {total} aniversário(s) exportado(s) para {args.arquivo} em {time.perf_counter() - inicio:.2f}s")
+        return 0
+    
+    with open(args.arquivo, "r", encoding="utf-8-sig", newline="") as entrada:
+        importados, erros = importar_aniversarios(entrada, formato)
+    print(f"📥 {importados} aniversário(s) importado(s) em {time.perf_counter() - inicio:.2f}s")
+    for numero, user_id, erro in erros:
+        print(f"   ⚠️ Linha {numero} ({user_id or '-'}): {erro}")
+    return 0 if not erros else 2
+
+# ===== CACHE DE FOTOS =====
+PASTA_FOTOS = os.getenv("BOT_PASTA_FOTOS", "fotos_aniversario")
+LIMITE_CACHE_FOTOS = int(os.getenv("BOT_LIMITE_FOTOS_MB", "200")) * 1024 * 1024
+TAMANHO_MAXIMO_FOTO = 8 * 1024 * 1024  # Limite de anexo do Discord
+DIAS_PREFETCH_FOTOS = 3                # Baixa com antecedência, enquanto as URLs assinadas valem
+DOWNLOADS_SIMULTANEOS = 4
+ATRASO_PREFETCH_FOTOS = 60.0           # Primeiro prefetch só depois que a inicialização assentar
+PARAMETROS_ASSINATURA = ("ex", "is", "hm")
+HOSTS_CDN_DISCORD = ("cdn.discordapp.com", "media.discordapp.net")
+EXTENSOES_FOTO = {"image/png": ".png", "image/jpeg": ".jpg", "image/gif": ".gif", "image/webp": ".webp"}
+
+def chave_foto(link):
+    """Link sem os parâmetros de assinatura: a mesma foto com URL renovada cai na mesma entrada."""
+    url = urlparse(link)
+    consulta = [(k, v) for k, v in parse_qsl(url.query) if k not in PARAMETROS_ASSINATURA]
+    return url._replace(query=urlencode(consulta), fragment="").geturl()
+
+def expiracao_link(link):
+    """Timestamp (segundos) do parâmetro ex= de uma URL assinada do Discord, ou None."""
+    valor = parse_qs(urlparse(link).query).get("ex")
+    if not valor:
+        return None
+    try:
+        return int(valor[0], 16)
+    except ValueError:
+        return None
+
+def link_expirado(link, margem=0):
+    expira = expiracao_link(link)
+    return expira is not None and expira - time.time() <= margem
+
+def link_download(link):
+    """Converte links de visualização do Google Drive em download direto."""
+    url = urlparse(link)
+    partes = url.path.split("/")
+    if url.netloc == "drive.google.com" and "d" in partes[:-1]:
+        return f"https://drive.google.com/uc?export=download&id={partes[partes.index('d') + 1]}"
+    return link
+
+async def renovar_link(link):
+    """Pede ao Discord uma nova URL assinada para um anexo (ex=/is=/hm=) expirado."""
+    if urlparse(link).netloc not in HOSTS_CDN_DISCORD:
+        return None
+    try:
+        dados = await bot.http.request(Route("POST", "/attachments/refresh-urls"), json={"attachment_urls": [link]})
+        return dados["refreshed_urls"][0]["refreshed"]
     except Exception as e:
-        print(f"⚠️ Erro ao carregar dados: {e}")
+        log_fotos.warning(f"⚠️ Não foi possível renovar o link da foto: {e}")
+        return None
+
+class CacheFotos:
+    """Fotos de aniversário baixadas uma vez, guardadas pelo hash do conteúdo, com despejo LRU por tamanho."""
+
+    def __init__(self, pasta, limite):
+        self.pasta = pasta
+        self.limite = limite
+        self.entradas = OrderedDict()   # chave -> {arquivo, tamanho, expira}; a ordem é a de uso (LRU)
+        self.baixando = {}              # chave -> Task (um download por foto)
+        self.semaforo = None
+        self.carregado = False
+        self.carga = None               # Task que lê o índice do disco (uma vez, em uma thread)
+        self.gravador = GravadorJSON(os.path.join(pasta, "indice.json"), self.montar_indice)
+
+    def montar_indice(self):
+        return [[chave, dict(entrada)] for chave, entrada in self.entradas.items()]
+
+    def ler_indice(self):
+        """Lê o índice do disco, descartando entradas cujo arquivo sumiu (roda em uma thread)."""
+        os.makedirs(self.pasta, exist_ok=True)
+        try:
+            with open(self.gravador.caminho, "r", encoding="utf-8") as f:
+                indice = json.load(f)
+        except FileNotFoundError:
+            return []
+        except Exception as e:
+            log_fotos.warning(f"⚠️ Índice do cache de fotos ilegível, recomeçando: {e}")
+            return []
+        return [(chave, entrada) for chave, entrada in indice
+                if os.path.exists(os.path.join(self.pasta, entrada["arquivo"]))]
+
+    async def carregar(self):
+        self.entradas.update(await asyncio.to_thread(self.ler_indice))
+        self.carregado = True
+
+    def iniciar_carga(self):
+        """Começa a ler o índice em segundo plano (chamado no setup_hook)."""
+        if self.carga is None:
+            self.carga = asyncio.create_task(self.carregar())
+        return self.carga
+
+    async def preparar(self):
+        """Espera a carga do índice (iniciando-a se preciso)."""
+        await asyncio.shield(self.iniciar_carga())
+
+    def anexo(self, link):
+        """(caminho, nome do anexo) da cópia local, ou None se a foto ainda não foi baixada.
+        
+        Não lê o índice: antes da carga terminar, a foto é tratada como ainda não baixada.
+        """
+        chave = chave_foto(link)
+        entrada = self.entradas.get(chave)
+        if entrada is None:
+            return None
+        
+        caminho = os.path.join(self.pasta, entrada["arquivo"])
+        if not os.path.exists(caminho):
+            del self.entradas[chave]
+            return None
+        self.entradas.move_to_end(chave)
+        self.gravador.agendar()
+        return caminho, f"aniversario{os.path.splitext(entrada['arquivo'])[1]}"
+
+    def tamanho_total(self):
+        return sum({e["arquivo"]: e["tamanho"] for e in self.entradas.values()}.values())
+
+    def agendar(self, link):
+        """Inicia o download em segundo plano (sem duplicar downloads em andamento)."""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+        
+        chave = chave_foto(link)
+        tarefa = self.baixando.get(chave)
+        if tarefa is None:
+            tarefa = asyncio.create_task(self.baixar(link))
+            self.baixando[chave] = tarefa
+            tarefa.add_done_callback(lambda _: self.baixando.pop(chave, None))
+        return tarefa
+
+    async def baixar(self, link):
+        """Baixa a foto para o cache; retorna o nome do arquivo ou None."""
+        if self.semaforo is None:
+            self.semaforo = asyncio.Semaphore(DOWNLOADS_SIMULTANEOS)
+        
+        async with self.semaforo:
+            await self.preparar()
+            chave = chave_foto(link)
+            if chave in self.entradas:
+                return self.entradas[chave]["arquivo"]
+            
+            if link_expirado(link):
+                link = await renovar_link(link)
+                if not link:
+                    return None
+            
+            try:
+                async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=30)) as sessao:
+                    async with sessao.get(link_download(link)) as resposta:
+                        extensao = EXTENSOES_FOTO.get(resposta.content_type)
+                        if resposta.status != 200 or not extensao:
+                            log_fotos.warning(f"⚠️ Foto não baixada ({resposta.status}, {resposta.content_type}): {chave}")
+                            return None
+                        if (resposta.content_length or 0) > TAMANHO_MAXIMO_FOTO:
+                            log_fotos.warning(f"⚠️ Foto maior que {TAMANHO_MAXIMO_FOTO // (1024 * 1024)} MB: {chave}")
+                            return None
+                        conteudo = await resposta.read()
+            except Exception as e:
+                log_fotos.warning(f"⚠️ Erro ao baixar foto {chave}: {e}")
+                return None
+            
+            if len(conteudo) > TAMANHO_MAXIMO_FOTO:
+                return None
+            
+            arquivo = await asyncio.to_thread(self.gravar_arquivo, conteudo, extensao)
+            self.entradas[chave] = {"arquivo": arquivo, "tamanho": len(conteudo), "expira": expiracao_link(link)}
+            self.entradas.move_to_end(chave)
+            
+            removidos = self.despejar()
+            if removidos:
+                await asyncio.to_thread(self.remover_arquivos, removidos)
+            self.gravador.agendar()
+            return arquivo
+
+    def gravar_arquivo(self, conteudo, extensao):
+        """Grava o conteúdo com o hash como nome (fotos iguais ocupam um só arquivo)."""
+        arquivo = hashlib.sha256(conteudo).hexdigest() + extensao
+        caminho = os.path.join(self.pasta, arquivo)
+        if not os.path.exists(caminho):
+            temporario = f"{caminho}.tmp"
+            with open(temporario, "wb") as f:
+                f.write(conteudo)
+            os.replace(temporario, caminho)
+        return arquivo
+
+    def despejar(self):
+        """Remove as entradas usadas há mais tempo até caber no limite; retorna os arquivos órfãos."""
+        total = self.tamanho_total()
+        removidos = []
+        while total > self.limite and len(self.entradas) > 1:
+            _, entrada = self.entradas.popitem(last=False)
+            if all(e["arquivo"] != entrada["arquivo"] for e in self.entradas.values()):
+                removidos.append(entrada["arquivo"])
+                total -= entrada["tamanho"]
+        return removidos
+
+    def remover_arquivos(self, arquivos):
+        for arquivo in arquivos:
+            try:
+                os.remove(os.path.join(self.pasta, arquivo))
+            except OSError:
+                pass
+
+    async def prefetch(self, links):
+        """Baixa as fotos que ainda não estão no cache; retorna quantas foram baixadas."""
+        await self.preparar()
+        pendentes = {chave_foto(link): link for link in links if urlparse(link).scheme in ("http", "https")}
+        tarefas = [self.agendar(link) for chave, link in pendentes.items() if chave not in self.entradas]
+        resultados = await asyncio.gather(*tarefas, return_exceptions=True)
+        return sum(1 for r in resultados if isinstance(r, str))
+
+cache_fotos = CacheFotos(PASTA_FOTOS, LIMITE_CACHE_FOTOS)
+
+def links_fotos_proximos_dias(dias=DIAS_PREFETCH_FOTOS):
+    """Links de foto dos aniversariantes de hoje até daqui a `dias` dias."""
+    hoje = hoje_local()
+    links = []
+    for deslocamento in range(dias + 1):
+        dia = hoje + timedelta(days=deslocamento)
+        for registro in aniversariantes_do_dia(dia.month, dia.day):
+            if registro["link_foto"] and registro["link_foto"] != LINK_FOTO_EXEMPLO:
+                links.append(registro["link_foto"])
+    return links
+
+@tasks.loop(hours=6)
+@medido_task("prefetch_fotos")
+async def prefetch_fotos_task():
+    """Adianta o download das fotos dos próximos dias (antes de as URLs assinadas expirarem)."""
+    links = links_fotos_proximos_dias()
+    if not links:
+        return
+    baixadas = await cache_fotos.prefetch(links)
+    if baixadas:
+        log_fotos.info(f"🖼️ {baixadas} foto(s) de aniversário baixada(s) para o cache")
+
+@prefetch_fotos_task.before_loop
+async def before_prefetch_fotos():
+    """Deixa os downloads para depois que a inicialização assentar (e o índice estiver pronto)."""
+    await bot.wait_until_ready()
+    await preparar_indice_aniversarios()
+    await asyncio.sleep(ATRASO_PREFETCH_FOTOS)
+
+# ===== ÍNDICE DE BUSCA =====
+ESQUEMA_BUSCA = """
+CREATE TABLE IF NOT EXISTS chaves (
+    id INTEGER PRIMARY KEY,
+    chave TEXT NOT NULL UNIQUE
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS documentos USING fts5(
+    titulo,
+    conteudo,
+    tipo UNINDEXED,
+    guild_id UNINDEXED,
+    referencia UNINDEXED,
+    autor_id UNINDEXED,
+    data UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+def consulta_fts(termos):
+    """Converte o texto digitado em consulta FTS5 segura (todos os termos, com prefixo)."""
+    palavras = [p.replace('"', '""') for p in termos.split() if p.strip('"')]
+    return " ".join(f'"{p}"*' for p in palavras)
+
+class IndiceBusca:
+    """Índice de texto completo (SQLite FTS5) de tickets, transcrições e sugestões."""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="busca")
+        self.conexao = None  # Usada só pela thread do índice
+
+    def _conectar(self):
+        if self.conexao is None:
+            conexao = sqlite3.connect(self.caminho, check_same_thread=False)
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.executescript(ESQUEMA_BUSCA)
+            self.conexao = conexao
+        return self.conexao
+
+    def _transacao(self, funcao, *args):
+        conexao = self._conectar()
+        with conexao:
+            return funcao(conexao, *args)
+
+    def indexar(self, chave, tipo, guild_id, referencia, titulo, conteudo, autor_id=None, data=None):
+        """Adiciona ou substitui um documento (atualização incremental, sem reconstruir o índice)."""
+        documento = (
+            chave, titulo or "", conteudo or "", tipo, str(guild_id), str(referencia),
+            str(autor_id) if autor_id is not None else None, (data or agora_local()).isoformat(),
+        )
+        try:
+            futuro = self.executor.submit(self._transacao, self._gravar, documento)
+            futuro.add_done_callback(ArmazenamentoSQLite._verificar_erro)
+        except RuntimeError:
+            pass  # Índice já encerrado
+
+    def indexar_transcricao(self, caminho, guild_id, referencia, titulo):
+        """Indexa a transcrição gravada em disco, uma página por documento, lendo o arquivo em fluxo."""
+        try:
+            futuro = self.executor.submit(self._transacao, self._gravar_transcricao, caminho, guild_id, referencia, titulo)
+            futuro.add_done_callback(ArmazenamentoSQLite._verificar_erro)
+        except RuntimeError:
+            pass  # Índice já encerrado
+
+    @classmethod
+    def _gravar_transcricao(cls, conexao, caminho, guild_id, referencia, titulo):
+        data = agora_local().isoformat()
+        
+        def gravar_pagina(numero, linhas):
+            cls._gravar(conexao, (
+                f"transcricao:{referencia}:{numero}", titulo or "", texto_para_busca(linhas),
+                "transcricao", str(guild_id), str(referencia), None, data,
+            ))
+        
+        numero = 0
+        linhas = []
+        with gzip.open(caminho, "rt", encoding="utf-8") as arquivo:
+            for linha in arquivo:
+                linhas.append(json.loads(linha))
+                if len(linhas) >= TAMANHO_PAGINA_HISTORICO:
+                    gravar_pagina(numero, linhas)
+                    numero += 1
+                    linhas = []
+        if linhas:
+            gravar_pagina(numero, linhas)
+
+    @staticmethod
+    def _gravar(conexao, documento):
+        chave, *campos = documento
+        conexao.execute("INSERT INTO chaves (chave) VALUES (?) ON CONFLICT (chave) DO NOTHING", (chave,))
+        (rowid,) = conexao.execute("SELECT id FROM chaves WHERE chave = ?", (chave,)).fetchone()
+        conexao.execute("DELETE FROM documentos WHERE rowid = ?", (rowid,))
+        conexao.execute(
+            "INSERT INTO documentos (rowid, titulo, conteudo, tipo, guild_id, referencia, autor_id, data) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (rowid, *campos)
+        )
+
+    @staticmethod
+    def _consultar(conexao, guild_id, consulta, limite, deslocamento):
+        (total,) = conexao.execute(
+            "SELECT count(*) FROM documentos WHERE documentos MATCH ? AND guild_id = ?",
+            (consulta, guild_id)
+        ).fetchone()
+        resultados = conexao.execute(
+            "SELECT tipo, referencia, titulo, snippet(documentos, 1, '**', '**', '…', 16), autor_id, data "
+            "FROM documentos WHERE documentos MATCH ? AND guild_id = ? ORDER BY rank LIMIT ? OFFSET ?",
+            (consulta, guild_id, limite, deslocamento)
+        ).fetchall()
+        return total, resultados
+
+    async def buscar(self, guild_id, termos, pagina=0, por_pagina=5):
+        """Busca ranqueada (bm25) no servidor; retorna (total, resultados da página)."""
+        consulta = consulta_fts(termos)
+        if not consulta:
+            return 0, []
+        futuro = self.executor.submit(self._transacao, self._consultar, str(guild_id), consulta, por_pagina, pagina * por_pagina)
+        return await asyncio.wrap_future(futuro)
+
+    def fechar(self):
+        self.executor.shutdown(wait=True)
+        if self.conexao:
+            self.conexao.close()
+
+indice_busca = IndiceBusca(os.getenv("BOT_BUSCA_DB", "busca.db"))
 
 # ===== TICKET MODAL =====
 class TicketModal(Modal, title="Solicitar Cargo"):
     nome = TextInput(label="Nome", placeholder="Digite seu nome completo", style=TextStyle.short)
     cargo = TextInput(label="Setor / Cargo desejado", placeholder="Ex: Financeiro, RH...", style=TextStyle.paragraph)
 
+    @medido_interacao("ticket_cargo")
     async def on_submit(self, interaction: discord.Interaction):
         try:
             mod_channel_id = ticket_response_channels.get(str(interaction.guild.id))
             mod_channel = bot.get_channel(mod_channel_id) if mod_channel_id else None
             cargo_id = mention_roles.get(str(interaction.guild.id))
 
+            if pedido_pendente_do_usuario(interaction.guild.id, interaction.user.id):
+                await interaction.response.send_message("ℹ️ Você já tem um pedido de cargo aguardando aprovação", ephemeral=True)
+                return
+
             # Tentar alterar nickname
             try:
                 await interaction.user.edit(nick=self.nome.value)
@@ -394,55 +2554,425 @@ class TicketModal(Modal, title="Solicitar Cargo"):
                 await interaction.response.send_message("❌ Não consegui alterar seu apelido (sem permissão)", ephemeral=True)
                 return
             except Exception as e:
-                print(f"⚠️ Erro ao alterar nickname: {e}")
+                log_tickets.warning(f"⚠️ Erro ao alterar nickname: {e}")
+
+            if not mod_channel:
+                await interaction.response.send_message("❌ Canal de tickets não configurado. Contate um administrador.", ephemeral=True)
+                return
+
+            pedido = novo_pedido(interaction.guild, interaction.user.id, self.nome.value, self.cargo.value)
+            mention = f"<@&{cargo_id}>" if cargo_id else ""
+            message = await mod_channel.send(content=mention, embed=embed_pedido(pedido), view=PedidoCargoView())
+            registrar_pedido(message, pedido)
+            await interaction.response.send_message("✅ Pedido de cargo enviado com sucesso!", ephemeral=True)
+            
+        except Exception as e:
+            log_tickets.error(f"❌ Erro no TicketModal: {e}")
+            try:
+                await interaction.response.send_message("❌ Erro interno. Tente novamente.", ephemeral=True)
+            except:
+                pass
+
+class TicketButton(Button):
+    def __init__(self):
+        super().__init__(label="Solicitar cargo", emoji="📬", style=discord.ButtonStyle.secondary, custom_id="ticket_button")
+
+    @medido_interacao("botao_ticket_cargo")
+    async def callback(self, interaction: discord.Interaction):
+        try:
+            await interaction.response.send_modal(TicketModal())
+        except Exception as e:
+            log_tickets.error(f"❌ Erro no TicketButton: {e}")
+
+class TicketButtonView(View):
+    def __init__(self):
+        super().__init__(timeout=None)
+        self.add_item(TicketButton())
+
+# ===== PEDIDOS DE CARGO =====
+# Fila persistente dos pedidos do painel; a mensagem no canal da moderação identifica o pedido,
+# então a view é persistente com custom_ids fixos e sobrevive a reinícios.
+MAX_PEDIDOS_LISTADOS = 20  # Pedidos por página do !pedidos
+TODOS_PEDIDOS = "*"        # Filtro do !aprovarpedidos que seleciona todos os pendentes
+
+# Índices dos pedidos pendentes (reconstruídos a partir do registro ao carregar)
+pedidos_pendentes_por_servidor = {}  # guild_id -> {pedido_id: pedido}, em ordem de chegada
+pedidos_pendentes_por_usuario = {}   # (guild_id, user_id) -> pedido_id
+
+CORES_PEDIDO = {
+    "pendente": discord.Color.blurple(),
+    "aprovado": discord.Color.green(),
+    "negado": discord.Color.red(),
+    "cancelado": discord.Color.greyple(),
+}
+ROTULOS_PEDIDO = {
+    "aprovado": "✅ Aprovado",
+    "negado": "❌ Negado",
+    "cancelado": "🚪 Cancelado (membro saiu do servidor)",
+}
+
+def indexar_pedido(pedido_id, pedido):
+    if pedido["status"] != "pendente":
+        return
+    pedidos_pendentes_por_servidor.setdefault(pedido["guild_id"], {})[pedido_id] = pedido
+    pedidos_pendentes_por_usuario[(pedido["guild_id"], pedido["user_id"])] = pedido_id
+
+def desindexar_pedido(pedido_id, pedido):
+    pendentes = pedidos_pendentes_por_servidor.get(pedido["guild_id"])
+    if pendentes is not None:
+        pendentes.pop(pedido_id, None)
+        if not pendentes:
+            del pedidos_pendentes_por_servidor[pedido["guild_id"]]
+    chave = (pedido["guild_id"], pedido["user_id"])
+    if pedidos_pendentes_por_usuario.get(chave) == pedido_id:
+        del pedidos_pendentes_por_usuario[chave]
+
+def reindexar_pedidos_pendentes():
+    """Reconstrói os índices de pedidos pendentes a partir do registro."""
+    pedidos_pendentes_por_servidor.clear()
+    pedidos_pendentes_por_usuario.clear()
+    for pedido_id, pedido in sorted(pedidos_cargo.items(), key=lambda item: item[1]["criado_em"]):
+        indexar_pedido(pedido_id, pedido)
+
+def pedido_pendente_do_usuario(guild_id, user_id):
+    return pedidos_pendentes_por_usuario.get((str(guild_id), user_id))
+
+def novo_pedido(guild, user_id, nome, cargo_desejado):
+    """Pedido ainda não registrado; já sugere o cargo cujo nome é o texto pedido (ex.: "Financeiro")."""
+    sugerido = guild.get_role(indices_servidor(guild)["cargos"].exato(cargo_desejado.strip()) or 0)
+    return {
+        "guild_id": str(guild.id),
+        "user_id": user_id,
+        "nome": nome,
+        "cargo_desejado": cargo_desejado,
+        "cargo_id": sugerido.id if sugerido and cargo_configuravel(sugerido) else None,
+        "status": "pendente",
+        "criado_em": agora_local().isoformat(),
+    }
+
+def registrar_pedido(message, pedido):
+    pedido["canal_id"] = message.channel.id
+    pedidos_cargo[str(message.id)] = pedido
+    indexar_pedido(str(message.id), pedido)
+    armazenamento.salvar_pedido(str(message.id), pedido)
+
+def atualizar_pedido(pedido_id, **campos):
+    """Altera o pedido mantendo os índices de pendentes e persiste só essa entrada."""
+    pedido = pedidos_cargo[pedido_id]
+    desindexar_pedido(pedido_id, pedido)
+    pedido.update(campos)
+    indexar_pedido(pedido_id, pedido)
+    armazenamento.salvar_pedido(pedido_id, pedido)
+    return pedido
+
+def resolver_pedido(pedido_id, status, moderador_id):
+    return atualizar_pedido(pedido_id, status=status, resolvido_por=moderador_id, resolvido_em=agora_local().isoformat())
+
+def link_pedido(pedido_id, pedido):
+    return f"https://discord.com/channels/{pedido['guild_id']}/{pedido['canal_id']}/{pedido_id}"
+
+def embed_pedido(pedido):
+    embed = discord.Embed(title="📋 Novo Pedido de Cargo", color=CORES_PEDIDO[pedido["status"]])
+    embed.add_field(name="👤 Usuário", value=f"<@{pedido['user_id']}>", inline=False)
+    embed.add_field(name="📝 Nome", value=pedido["nome"], inline=True)
+    embed.add_field(name="💼 Cargo desejado", value=pedido["cargo_desejado"], inline=False)
+    cargo = f"<@&{pedido['cargo_id']}>" if pedido.get("cargo_id") else "Escolha no seletor abaixo"
+    embed.add_field(name="🎯 Cargo a conceder", value=cargo, inline=False)
+    if pedido["status"] != "pendente":
+        embed.add_field(name="📌 Status", value=f"{ROTULOS_PEDIDO[pedido['status']]} por <@{pedido['resolvido_por']}>", inline=False)
+    embed.set_footer(text=f"ID: {pedido['user_id']}")
+    embed.timestamp = datetime.fromisoformat(pedido["criado_em"])
+    return embed
+
+def erro_cargo_pedido(guild, role):
+    """Motivo pelo qual o bot não pode conceder o cargo (ou None)."""
+    if not cargo_configuravel(role):
+        return "❌ Escolha um cargo comum (não gerenciado por bot)"
+    if role >= guild.me.top_role:
+        return f"❌ O cargo {role.mention} está acima do cargo do bot"
+    return None
+
+class PedidoCargoView(View):
+    """Seletor de cargo e botões Aprovar/Negar da mensagem do pedido na moderação."""
+
+    def __init__(self):
+        super().__init__(timeout=None)
+
+    async def pedido_da_interacao(self, interaction):
+        """(pedido_id, pedido) pendente da mensagem; responde e devolve None se não puder seguir."""
+        if not interaction.user.guild_permissions.manage_roles:
+            await interaction.response.send_message("❌ Você precisa da permissão Gerenciar Cargos", ephemeral=True)
+            return None, None
+        pedido_id = str(interaction.message.id)
+        pedido = pedidos_cargo.get(pedido_id)
+        if pedido is None or pedido["status"] != "pendente":
+            # Resolvido em outra mensagem (ex.: aprovação em massa) - só tira os botões
+            await interaction.response.edit_message(embed=embed_pedido(pedido) if pedido else None, view=None)
+            return None, None
+        return pedido_id, pedido
+
+    @discord.ui.select(cls=discord.ui.RoleSelect, placeholder="Cargo a conceder", custom_id="pedido_cargo_select")
+    @medido_interacao("pedido_cargo_selecionar")
+    async def selecionar_cargo(self, interaction: discord.Interaction, select: discord.ui.RoleSelect):
+        pedido_id, pedido = await self.pedido_da_interacao(interaction)
+        if pedido is None:
+            return
+        role = select.values[0]
+        erro = erro_cargo_pedido(interaction.guild, role)
+        if erro:
+            await interaction.response.send_message(erro, ephemeral=True)
+            return
+        atualizar_pedido(pedido_id, cargo_id=role.id)
+        await interaction.response.edit_message(embed=embed_pedido(pedido))
+
+    @discord.ui.button(label="Aprovar", emoji="✅", style=discord.ButtonStyle.success, custom_id="pedido_aprovar")
+    @medido_interacao("pedido_cargo_aprovar")
+    async def aprovar(self, interaction: discord.Interaction, button: Button):
+        pedido_id, pedido = await self.pedido_da_interacao(interaction)
+        if pedido is None:
+            return
+        role = interaction.guild.get_role(pedido.get("cargo_id") or 0)
+        if role is None:
+            await interaction.response.send_message("❌ Escolha primeiro o cargo a conceder no seletor", ephemeral=True)
+            return
+        erro = erro_cargo_pedido(interaction.guild, role)
+        if erro:
+            await interaction.response.send_message(erro, ephemeral=True)
+            return
+        
+        # As novas tentativas podem passar dos 3s da interação
+        await interaction.response.defer()
+        try:
+            await adicionar_cargo(interaction.guild, pedido["user_id"], role, f"Pedido aprovado por {interaction.user}", "pedido_cargo")
+            status = "aprovado"
+        except discord.NotFound:
+            status = "cancelado"
+        except Exception as e:
+            log_membros.error(f"❌ Erro ao aprovar pedido de cargo: {e}", extra={"guild_id": interaction.guild.id, "user_id": pedido["user_id"]})
+            await interaction.followup.send(f"❌ Não foi possível dar o cargo: {e}", ephemeral=True)
+            return
+        resolver_pedido(pedido_id, status, interaction.user.id)
+        await interaction.edit_original_response(embed=embed_pedido(pedido), view=None)
+
+    @discord.ui.button(label="Negar", emoji="✖️", style=discord.ButtonStyle.danger, custom_id="pedido_negar")
+    @medido_interacao("pedido_cargo_negar")
+    async def negar(self, interaction: discord.Interaction, button: Button):
+        pedido_id, pedido = await self.pedido_da_interacao(interaction)
+        if pedido is None:
+            return
+        resolver_pedido(pedido_id, "negado", interaction.user.id)
+        await interaction.response.edit_message(embed=embed_pedido(pedido), view=None)
+
+async def aprovar_pedidos(guild, role, pedido_ids, moderador, progresso=None):
+    """Dá o cargo a cada pedido ainda pendente, em sequência; retorna (aprovados, cancelados, falhas)."""
+    aprovados = cancelados = falhas = 0
+    for i, pedido_id in enumerate(pedido_ids, 1):
+        pedido = pedidos_cargo.get(pedido_id)
+        if pedido is None or pedido["status"] != "pendente":
+            continue  # Resolvido por outro moderador enquanto isso
+        try:
+            async with semaforo_cargos:
+                await adicionar_cargo(guild, pedido["user_id"], role, f"Pedidos aprovados em massa por {moderador}", "pedido_cargo")
+        except discord.NotFound:
+            resolver_pedido(pedido_id, "cancelado", moderador.id)
+            cancelados += 1
+            continue
+        except discord.Forbidden:
+            raise  # Vale para todos os próximos
+        except Exception as e:
+            log_membros.error(f"❌ Erro ao aprovar pedido de cargo: {e}", extra={"guild_id": guild.id, "user_id": pedido["user_id"]})
+            falhas += 1
+            continue
+        atualizar_pedido(pedido_id, cargo_id=role.id)
+        resolver_pedido(pedido_id, "aprovado", moderador.id)
+        aprovados += 1
+        if progresso and i % 25 == 0:
+            await progresso(i)
+    return aprovados, cancelados, falhas
+
+class ConfirmarAprovacaoView(View):
+    def __init__(self, autor_id, role, pedido_ids):
+        super().__init__(timeout=60)
+        self.autor_id = autor_id
+        self.role = role
+        self.pedido_ids = pedido_ids
+
+    async def interaction_check(self, interaction: discord.Interaction):
+        if interaction.user.id != self.autor_id:
+            await interaction.response.send_message("❌ Só quem executou o comando pode confirmar", ephemeral=True)
+            return False
+        return True
+
+    @discord.ui.button(label="✅ Aprovar", style=discord.ButtonStyle.success)
+    @medido_interacao("pedido_cargo_aprovar_massa")
+    async def confirmar(self, interaction: discord.Interaction, button: Button):
+        self.stop()
+        total = len(self.pedido_ids)
+        await interaction.response.edit_message(content=f"⏳ Aprovando {total} pedido(s)...", view=None)
+        
+        async def progresso(feitos):
+            await interaction.edit_original_response(content=f"⏳ Aprovando pedidos... {feitos}/{total}")
+        
+        try:
+            aprovados, cancelados, falhas = await aprovar_pedidos(interaction.guild, self.role, self.pedido_ids, interaction.user, progresso)
+        except discord.Forbidden as e:
+            await interaction.edit_original_response(content=f"❌ Sem permissão para dar o cargo {self.role.mention}: {e}")
+            return
+        
+        resumo = f"✅ {aprovados} pedido(s) aprovado(s) com o cargo {self.role.mention}"
+        if cancelados:
+            resumo += f"\n🚪 {cancelados} cancelado(s) (membro saiu do servidor)"
+        if falhas:
+            resumo += f"\n❌ {falhas} falha(s) - continuam pendentes"
+        log_membros.info(f"📬 {aprovados} pedido(s) de cargo aprovado(s) em massa por {interaction.user}", extra={"guild_id": interaction.guild.id})
+        await interaction.edit_original_response(content=resumo)
+
+    @discord.ui.button(label="❌ Cancelar", style=discord.ButtonStyle.secondary)
+    async def cancelar(self, interaction: discord.Interaction, button: Button):
+        self.stop()
+        await interaction.response.edit_message(content="✅ Operação cancelada", view=None)
+
+# ===== REGISTRO DE TICKETS =====
+LIMITE_TICKETS_PADRAO = 3  # Tickets abertos por usuário, se o servidor não configurar
+
+# Índices dos tickets abertos (reconstruídos a partir do registro ao carregar)
+tickets_abertos_por_tipo = {}     # (guild_id, owner_id, tipo) -> channel_id
+tickets_abertos_por_usuario = {}  # (guild_id, owner_id) -> {channel_ids}
+
+# Uma trava por (servidor, usuário): o limite de tickets é por usuário, então a contagem e o
+# registro de envios simultâneos (de qualquer tipo) acontecem um de cada vez
+travas_tickets = weakref.WeakValueDictionary()
+
+def indexar_ticket_aberto(channel_id, ticket):
+    if ticket["status"] != "aberto" or ticket.get("owner_id") is None:
+        return
+    chave_usuario = (ticket["guild_id"], ticket["owner_id"])
+    tickets_abertos_por_usuario.setdefault(chave_usuario, set()).add(str(channel_id))
+    if ticket.get("tipo"):
+        tickets_abertos_por_tipo[(*chave_usuario, ticket["tipo"])] = str(channel_id)
+
+def desindexar_ticket_aberto(channel_id, ticket):
+    chave_usuario = (ticket["guild_id"], ticket.get("owner_id"))
+    canais = tickets_abertos_por_usuario.get(chave_usuario)
+    if canais:
+        canais.discard(str(channel_id))
+        if not canais:
+            del tickets_abertos_por_usuario[chave_usuario]
+    chave_tipo = (*chave_usuario, ticket.get("tipo"))
+    if tickets_abertos_por_tipo.get(chave_tipo) == str(channel_id):
+        del tickets_abertos_por_tipo[chave_tipo]
+
+def reindexar_tickets_abertos():
+    """Reconstrói os índices de tickets abertos a partir do registro."""
+    tickets_abertos_por_tipo.clear()
+    tickets_abertos_por_usuario.clear()
+    for channel_id, ticket in tickets.items():
+        indexar_ticket_aberto(channel_id, ticket)
 
-            if not mod_channel:
-                await interaction.response.send_message("❌ Canal de tickets não configurado. Contate um administrador.", ephemeral=True)
-                return
+def limite_tickets(guild_id):
+    """Máximo de tickets abertos ao mesmo tempo por usuário no servidor."""
+    return ticket_limites.get(str(guild_id), LIMITE_TICKETS_PADRAO)
 
-            embed = discord.Embed(title="📋 Novo Pedido de Cargo", color=discord.Color.blurple())
-            embed.add_field(name="👤 Usuário", value=interaction.user.mention, inline=False)
-            embed.add_field(name="📝 Nome", value=self.nome.value, inline=True)
-            embed.add_field(name="💼 Cargo desejado", value=self.cargo.value, inline=False)
-            embed.set_footer(text=f"ID: {interaction.user.id}")
-            embed.timestamp = datetime.now()
+def ticket_aberto_existente(guild, owner_id, tipo):
+    """Canal do ticket aberto do usuário para o tipo (descarta registros de canais apagados)."""
+    channel_id = tickets_abertos_por_tipo.get((str(guild.id), owner_id, tipo))
+    if channel_id is None:
+        return None
+    canal = guild.get_channel(int(channel_id))
+    if canal is None:
+        # Canal apagado enquanto o bot estava offline
+        fechar_ticket_registro(channel_id)
+    return canal
 
-            mention = f"<@&{cargo_id}>" if cargo_id else ""
-            await mod_channel.send(content=mention, embed=embed)
-            await interaction.response.send_message("✅ Pedido de cargo enviado com sucesso!", ephemeral=True)
-            
-        except Exception as e:
-            print(f"❌ Erro no TicketModal: {e}")
-            try:
-                await interaction.response.send_message("❌ Erro interno. Tente novamente.", ephemeral=True)
-            except:
-                pass
+def tickets_abertos_do_usuario(guild, owner_id):
+    """Canais de tickets abertos do usuário no servidor (descarta canais apagados)."""
+    canais = []
+    for channel_id in list(tickets_abertos_por_usuario.get((str(guild.id), owner_id), ())):
+        canal = guild.get_channel(int(channel_id))
+        if canal is None:
+            fechar_ticket_registro(channel_id)
+        else:
+            canais.append(canal)
+    return canais
 
-class TicketButton(Button):
-    def __init__(self):
-        super().__init__(label="Solicitar cargo", emoji="📬", style=discord.ButtonStyle.secondary, custom_id="ticket_button")
+def registrar_ticket(channel, owner_id, tipo, criado_em=None):
+    """Registra um canal de ticket aberto (dono, tipo, criação e status)."""
+    ticket = {
+        "guild_id": str(channel.guild.id),
+        "owner_id": owner_id,
+        "tipo": tipo,
+        "criado_em": (criado_em or agora_local()).isoformat(),
+        "status": "aberto",
+    }
+    tickets[str(channel.id)] = ticket
+    indexar_ticket_aberto(channel.id, ticket)
+    armazenamento.salvar_ticket(str(channel.id), ticket)
+    return ticket
 
-    async def callback(self, interaction: discord.Interaction):
-        try:
-            await interaction.response.send_modal(TicketModal())
-        except Exception as e:
-            print(f"❌ Erro no TicketButton: {e}")
+def fechar_ticket_registro(channel_id, fechado_por=None):
+    """Marca o ticket como fechado no registro."""
+    ticket = tickets.get(str(channel_id))
+    if not ticket:
+        return None
+    if ticket["status"] != "fechado":
+        desindexar_ticket_aberto(channel_id, ticket)
+        ticket["status"] = "fechado"
+        ticket["fechado_em"] = agora_local().isoformat()
+    if fechado_por is not None:
+        ticket["fechado_por"] = fechado_por
+    armazenamento.salvar_ticket(str(channel_id), ticket)
+    return ticket
 
-class TicketButtonView(View):
-    def __init__(self):
-        super().__init__(timeout=None)
-        self.add_item(TicketButton())
+def dono_do_ticket(channel_id):
+    """ID do usuário que abriu o ticket (None se não registrado)."""
+    ticket = tickets.get(str(channel_id))
+    return ticket["owner_id"] if ticket else None
+
+async def reconstruir_registro_tickets():
+    """Registra, uma única vez, tickets abertos antes do registro existir (lendo o embed inicial)."""
+    registrados = 0
+    
+    for guild in bot.guilds:
+        category_id = ticket_categories.get(str(guild.id))
+        category = guild.get_channel(category_id) if category_id else None
+        if not isinstance(category, discord.CategoryChannel):
+            continue
+        
+        for canal in category.text_channels:
+            if str(canal.id) in tickets or not canal.name.startswith("ticket-"):
+                continue
+            
+            owner_id = None
+            try:
+                async for message in canal.history(limit=20, oldest_first=True):
+                    if message.embeds and message.author == guild.me:
+                        embed = message.embeds[0]
+                        if embed.footer and embed.footer.text and "ID do usuário:" in embed.footer.text:
+                            owner_id = int(embed.footer.text.split("ID do usuário: ")[1])
+                            break
+            except Exception as e:
+                log_tickets.warning(f"⚠️ Erro ao buscar dono do ticket #{canal.name}: {e}")
+            
+            tipo = canal.name.split("-", 2)[1] if canal.name.count("-") >= 2 else None
+            tipo = tipo if tipo in registro_suporte(guild.id)["tipos"] else None
+            registrar_ticket(canal, owner_id, tipo, criado_em=canal.created_at)
+            registrados += 1
+    
+    if registrados:
+        log_tickets.info(f"🎫 {registrados} ticket(s) existente(s) adicionado(s) ao registro")
 
 # ===== TICKET SUPPORT SYSTEM =====
 class TicketSupportModal(Modal, title="Abrir Ticket de Suporte"):
     assunto = TextInput(label="Assunto", placeholder="Descreva brevemente seu problema", style=TextStyle.short)
     descricao = TextInput(label="Descrição detalhada", placeholder="Explique seu problema em detalhes...", style=TextStyle.paragraph)
 
-    def __init__(self, support_type):
+    def __init__(self, support_type, support_info):
         super().__init__()
         self.support_type = support_type
-        self.title = f"Ticket - {SUPPORT_TYPES[support_type]['name']}"
+        self.support_info = support_info
+        self.title = f"Ticket - {support_info['name']}"[:45]
 
+    @medido_interacao("ticket_suporte")
     async def on_submit(self, interaction: discord.Interaction):
         try:
             guild_id = str(interaction.guild.id)
@@ -458,77 +2988,107 @@ class TicketSupportModal(Modal, title="Abrir Ticket de Suporte"):
                 await interaction.response.send_message("❌ Categoria de tickets não encontrada. Reconfigure com `!setupticket`.", ephemeral=True)
                 return
 
-            # Obter informações do tipo de suporte
-            support_info = SUPPORT_TYPES[self.support_type]
-            support_role = interaction.guild.get_role(support_info['role_id'])
-
-            # Nome único do ticket
-            ticket_name = f"ticket-{self.support_type}-{interaction.user.name.lower().replace(' ', '-')}"
-            
-            # Limitar o nome do canal
-            if len(ticket_name) > 100:
-                ticket_name = ticket_name[:97] + "..."
-            
-            overwrites = {
-                interaction.guild.default_role: discord.PermissionOverwrite(read_messages=False),
-                interaction.user: discord.PermissionOverwrite(read_messages=True, send_messages=True),
-                interaction.guild.me: discord.PermissionOverwrite(read_messages=True, send_messages=True, manage_messages=True)
-            }
-            
-            if support_role:
-                overwrites[support_role] = discord.PermissionOverwrite(read_messages=True, send_messages=True, manage_messages=True)
-
-            # Criar canal do ticket
-            ticket_channel = await interaction.guild.create_text_channel(
-                name=ticket_name,
-                category=category,
-                overwrites=overwrites,
-                topic=f"Ticket de {interaction.user.display_name} - {support_info['name']}"
-            )
+            # Responder já: a criação pode esperar outro envio do mesmo usuário
+            await interaction.response.defer(ephemeral=True, thinking=True)
             
-            embed = discord.Embed(
-                title=f"🎫 {support_info['name']}",
-                color=discord.Color.blue(),
-                timestamp=datetime.now()
-            )
-            embed.add_field(name="👤 Usuário", value=interaction.user.mention, inline=True)
-            embed.add_field(name="📝 Assunto", value=self.assunto.value, inline=True)
-            embed.add_field(name="🏷️ Tipo", value=f"{support_info['emoji']} {support_info['name']}", inline=True)
-            embed.add_field(name="📄 Descrição", value=self.descricao.value, inline=False)
-            embed.set_footer(text=f"ID do usuário: {interaction.user.id}")
-            embed.set_thumbnail(url=interaction.user.display_avatar.url)
-            
-            close_view = TicketCloseView()
+            chave = (guild_id, interaction.user.id)
+            trava = travas_tickets.get(chave)
+            if trava is None:
+                trava = travas_tickets[chave] = asyncio.Lock()
             
-            mention_text = f"{interaction.user.mention}"
-            if support_role:
-                mention_text += f" <@&{support_info['role_id']}>"
+            async with trava:
+                existente = ticket_aberto_existente(interaction.guild, interaction.user.id, self.support_type)
+                if existente:
+                    await interaction.followup.send(f"ℹ️ Você já tem um ticket de **{self.support_info['name']}** aberto: {existente.mention}", ephemeral=True)
+                    return
                 
-            await ticket_channel.send(
-                content=f"{mention_text}\n\n**Olá {interaction.user.mention}!** 👋\nSeu ticket de **{support_info['name']}** foi criado. Nossa equipe irá ajudar em breve.",
-                embed=embed,
-                view=close_view
-            )
+                abertos = tickets_abertos_do_usuario(interaction.guild, interaction.user.id)
+                limite = limite_tickets(guild_id)
+                if len(abertos) >= limite:
+                    links = ", ".join(canal.mention for canal in abertos)
+                    await interaction.followup.send(f"❌ Você já tem {len(abertos)} ticket(s) aberto(s) (limite {limite}): {links}", ephemeral=True)
+                    return
+                
+                ticket_channel = await self.criar_canal_ticket(interaction, category)
             
-            await interaction.response.send_message(f"✅ Ticket criado com sucesso: {ticket_channel.mention}", ephemeral=True)
+            await interaction.followup.send(f"✅ Ticket criado com sucesso: {ticket_channel.mention}", ephemeral=True)
             
         except Exception as e:
-            print(f"❌ Erro ao criar ticket: {e}")
+            log_tickets.error(f"❌ Erro ao criar ticket: {e}")
             try:
-                await interaction.response.send_message(f"❌ Erro ao criar ticket: {str(e)}", ephemeral=True)
+                if interaction.response.is_done():
+                    await interaction.followup.send(f"❌ Erro ao criar ticket: {str(e)}", ephemeral=True)
+                else:
+                    await interaction.response.send_message(f"❌ Erro ao criar ticket: {str(e)}", ephemeral=True)
             except:
                 pass
 
+    async def criar_canal_ticket(self, interaction, category):
+        """Cria o canal do ticket, registra e envia a mensagem inicial."""
+        # Obter informações do tipo de suporte
+        support_info = self.support_info
+        support_role = interaction.guild.get_role(support_info['role_id'])
+
+        # Nome único do ticket
+        ticket_name = f"ticket-{self.support_type}-{interaction.user.name.lower().replace(' ', '-')}"
+        
+        # Limitar o nome do canal
+        if len(ticket_name) > 100:
+            ticket_name = ticket_name[:97] + "..."
+        
+        overwrites = {
+            interaction.guild.default_role: discord.PermissionOverwrite(read_messages=False),
+            interaction.user: discord.PermissionOverwrite(read_messages=True, send_messages=True),
+            interaction.guild.me: discord.PermissionOverwrite(read_messages=True, send_messages=True, manage_messages=True)
+        }
+        
+        if support_role:
+            overwrites[support_role] = discord.PermissionOverwrite(read_messages=True, send_messages=True, manage_messages=True)
+
+        # Criar canal do ticket
+        ticket_channel = await interaction.guild.create_text_channel(
+            name=ticket_name,
+            category=category,
+            overwrites=overwrites,
+            topic=f"Ticket de {interaction.user.display_name} - {support_info['name']}"
+        )
+        registrar_ticket(ticket_channel, interaction.user.id, self.support_type)
+        indice_busca.indexar(
+            f"ticket:{ticket_channel.id}", "ticket", interaction.guild.id, ticket_channel.id,
+            self.assunto.value, self.descricao.value, autor_id=interaction.user.id
+        )
+        
+        embed = discord.Embed(
+            title=f"🎫 {support_info['name']}",
+            color=discord.Color.blue(),
+            timestamp=datetime.now()
+        )
+        embed.add_field(name="👤 Usuário", value=interaction.user.mention, inline=True)
+        embed.add_field(name="📝 Assunto", value=self.assunto.value, inline=True)
+        embed.add_field(name="🏷️ Tipo", value=f"{support_info['emoji']} {support_info['name']}", inline=True)
+        embed.add_field(name="📄 Descrição", value=self.descricao.value, inline=False)
+        embed.set_footer(text=f"ID do usuário: {interaction.user.id}")
+        embed.set_thumbnail(url=interaction.user.display_avatar.url)
+        
+        close_view = TicketCloseView()
+        
+        mention_text = f"{interaction.user.mention}"
+        if support_role:
+            mention_text += f" {support_role.mention}"
+            
+        await ticket_channel.send(
+            content=f"{mention_text}\n\n**Olá {interaction.user.mention}!** 👋\nSeu ticket de **{support_info['name']}** foi criado. Nossa equipe irá ajudar em breve.",
+            embed=embed,
+            view=close_view
+        )
+        return ticket_channel
+
 class SupportTypeSelect(Select):
-    def __init__(self):
-        options = []
-        for key, info in SUPPORT_TYPES.items():
-            options.append(SelectOption(
-                label=info['name'],
-                description=info['description'],
-                emoji=info['emoji'],
-                value=key
-            ))
+    def __init__(self, guild_id=None):
+        options = [
+            SelectOption(label=nome, description=descricao, emoji=emoji, value=chave)
+            for chave, nome, descricao, emoji in registro_suporte(guild_id)["opcoes"]
+        ]
         
         super().__init__(
             placeholder="Selecione o tipo de suporte...",
@@ -536,18 +3096,23 @@ class SupportTypeSelect(Select):
             custom_id="support_type_select"
         )
 
+    @medido_interacao("tipo_suporte")
     async def callback(self, interaction: discord.Interaction):
         try:
             support_type = self.values[0]
-            modal = TicketSupportModal(support_type)
+            support_info = registro_suporte(interaction.guild.id)["tipos"].get(support_type)
+            if not support_info:
+                await interaction.response.send_message("❌ Este tipo de suporte não existe mais. Peça para um administrador atualizar o painel.", ephemeral=True)
+                return
+            modal = TicketSupportModal(support_type, support_info)
             await interaction.response.send_modal(modal)
         except Exception as e:
-            print(f"❌ Erro no SupportTypeSelect: {e}")
+            log_tickets.error(f"❌ Erro no SupportTypeSelect: {e}")
 
 class TicketSupportView(View):
-    def __init__(self):
+    def __init__(self, guild_id=None):
         super().__init__(timeout=None)
-        self.add_item(SupportTypeSelect())
+        self.add_item(SupportTypeSelect(guild_id))
 
 # ===== CLOSE TICKET SYSTEM =====
 class TicketCloseView(View):
@@ -555,24 +3120,15 @@ class TicketCloseView(View):
         super().__init__(timeout=None)
         
     @discord.ui.button(label="🔒 Fechar Ticket", style=discord.ButtonStyle.danger, custom_id="close_ticket_button")
+    @medido_interacao("fechar_ticket")
     async def close_ticket(self, interaction: discord.Interaction, button: Button):
-        user_id = None
-        
-        try:
-            async for message in interaction.channel.history(limit=20, oldest_first=True):
-                if message.embeds and message.author == interaction.guild.me:
-                    embed = message.embeds[0]
-                    if embed.footer and "ID do usuário:" in embed.footer.text:
-                        user_id = int(embed.footer.text.split("ID do usuário: ")[1])
-                        break
-        except Exception as e:
-            print(f"⚠️ Erro ao buscar dono do ticket: {e}")
+        user_id = dono_do_ticket(interaction.channel.id)
         
         # Verificar se o usuário tem permissão (dono do ticket, admin, ou qualquer cargo de suporte)
         has_permission = (
             interaction.user.id == user_id or 
             interaction.user.guild_permissions.manage_channels or
-            any(role.id in [info['role_id'] for info in SUPPORT_TYPES.values()] for role in interaction.user.roles)
+            tem_cargo_suporte(interaction.user)
         )
         
         if not has_permission:
@@ -582,27 +3138,169 @@ class TicketCloseView(View):
         confirm_view = ConfirmCloseView()
         await interaction.response.send_message("⚠️ Tem certeza que deseja fechar este ticket?", view=confirm_view, ephemeral=True)
 
+fechamentos_em_andamento = set()  # Canais sendo arquivados (um único fechamento por ticket)
+
 class ConfirmCloseView(View):
     def __init__(self):
         super().__init__(timeout=30)
         
     @discord.ui.button(label="✅ Sim, fechar", style=discord.ButtonStyle.danger)
+    @medido_interacao("confirmar_fechamento")
     async def confirm_close(self, interaction: discord.Interaction, button: Button):
+        canal_id = interaction.channel.id
+        if canal_id in fechamentos_em_andamento:
+            await interaction.response.send_message("⏳ Este ticket já está sendo fechado", ephemeral=True)
+            return
+        
+        fechamentos_em_andamento.add(canal_id)
         try:
-            await interaction.response.send_message("🔒 Fechando ticket em 3 segundos...")
-            await asyncio.sleep(3)
+            await interaction.response.send_message("🔒 Arquivando e fechando ticket...")
+            
+            try:
+                caminho, total = await arquivar_ticket(interaction.channel)
+            except Exception as e:
+                # Sem arquivo salvo, o canal não é apagado
+                log_tickets.error(f"❌ Erro ao arquivar ticket #{interaction.channel.name}: {e}")
+                await interaction.channel.send("❌ Não foi possível arquivar o ticket. O canal foi mantido; tente novamente.")
+                return
+            
+            log_tickets.info(f"🗄️ Ticket #{interaction.channel.name} arquivado em {caminho} ({total} mensagens)")
+            fechar_ticket_registro(canal_id, interaction.user.id)
             await interaction.channel.delete(reason="Ticket fechado pelo usuário")
         except Exception as e:
-            print(f"❌ Erro ao fechar ticket: {e}")
+            log_tickets.error(f"❌ Erro ao fechar ticket: {e}")
+        finally:
+            fechamentos_em_andamento.discard(canal_id)
             
     @discord.ui.button(label="❌ Cancelar", style=discord.ButtonStyle.secondary)
+    @medido_interacao("cancelar_fechamento")
     async def cancel_close(self, interaction: discord.Interaction, button: Button):
         await interaction.response.send_message("✅ Operação cancelada", ephemeral=True)
 
+# ===== ARQUIVAMENTO DE TICKETS =====
+PASTA_ARQUIVOS_TICKETS = "arquivos_tickets"
+TAMANHO_PAGINA_HISTORICO = 100  # Mensagens gravadas por vez (limita o uso de memória)
+
+async def paginas_historico(canal, tamanho=TAMANHO_PAGINA_HISTORICO):
+    """Percorre o histórico do canal (mais antigas primeiro) em páginas, sem guardar tudo em memória."""
+    pagina = []
+    async for message in canal.history(limit=None, oldest_first=True):
+        pagina.append(message)
+        if len(pagina) >= tamanho:
+            yield pagina
+            pagina = []
+    if pagina:
+        yield pagina
+
+def serializar_mensagem(message):
+    """Converte uma mensagem em uma linha da transcrição."""
+    return {
+        "id": message.id,
+        "autor_id": message.author.id,
+        "autor": str(message.author),
+        "data": message.created_at.isoformat(),
+        "conteudo": message.content,
+        "anexos": [anexo.url for anexo in message.attachments],
+        "embeds": [
+            {
+                "titulo": embed.title,
+                "descricao": embed.description,
+                "campos": [{"nome": campo.name, "valor": campo.value} for campo in embed.fields],
+            }
+            for embed in message.embeds
+        ],
+    }
+
+def texto_para_busca(linhas):
+    """Texto de uma página da transcrição para o índice de busca."""
+    partes = []
+    for linha in linhas:
+        if linha["conteudo"]:
+            partes.append(f"{linha['autor']}: {linha['conteudo']}")
+        for embed in linha["embeds"]:
+            partes.extend(filter(None, [embed["titulo"], embed["descricao"]]))
+            partes.extend(campo["valor"] for campo in embed["campos"] if campo["valor"])
+    return "\n".join(partes)
+
+class ArquivoTranscricao:
+    """Transcrição JSONL compactada (gzip), gravada em um temporário e renomeada ao concluir."""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self.temporario = f"{caminho}.tmp"
+        self.bruto = None
+        self.gz = None
+
+    def abrir(self):
+        os.makedirs(os.path.dirname(self.caminho), exist_ok=True)
+        self.bruto = open(self.temporario, "wb")
+        self.gz = gzip.GzipFile(fileobj=self.bruto, mode="wb")
+
+    def escrever(self, linhas):
+        for linha in linhas:
+            self.gz.write(json.dumps(linha, ensure_ascii=False).encode("utf-8") + b"\n")
+
+    def concluir(self):
+        self.gz.close()
+        self.bruto.flush()
+        os.fsync(self.bruto.fileno())
+        self.bruto.close()
+        os.replace(self.temporario, self.caminho)
+
+    def descartar(self):
+        for arquivo in (self.gz, self.bruto):
+            try:
+                if arquivo:
+                    arquivo.close()
+            except Exception:
+                pass
+        if os.path.exists(self.temporario):
+            os.remove(self.temporario)
+
+async def arquivar_ticket(canal):
+    """Grava a transcrição do ticket em disco e registra o arquivo no registro de tickets."""
+    caminho = os.path.join(PASTA_ARQUIVOS_TICKETS, str(canal.guild.id), f"{canal.id}.jsonl.gz")
+    transcricao = ArquivoTranscricao(caminho)
+    total = 0
+    
+    await asyncio.to_thread(transcricao.abrir)
+    try:
+        async for pagina in paginas_historico(canal):
+            linhas = [serializar_mensagem(message) for message in pagina]
+            await asyncio.to_thread(transcricao.escrever, linhas)
+            total += len(linhas)
+        await asyncio.to_thread(transcricao.concluir)
+    except BaseException:
+        await asyncio.to_thread(transcricao.descartar)
+        raise
+    
+    # Cada página da transcrição vira um documento no índice de busca (segunda leitura, do arquivo já gravado)
+    indice_busca.indexar_transcricao(caminho, canal.guild.id, canal.id, canal.name)
+    
+    ticket = tickets.get(str(canal.id)) or registrar_ticket(canal, None, None, criado_em=canal.created_at)
+    ticket["arquivo"] = caminho
+    ticket["total_mensagens"] = total
+    ticket["nome_canal"] = canal.name
+    armazenamento.salvar_ticket(str(canal.id), ticket)
+    return caminho, total
+
+def tickets_arquivados(guild_id, owner_id=None, tipo=None):
+    """Tickets arquivados do servidor, filtrados por usuário e tipo (mais recentes primeiro)."""
+    guild_id = str(guild_id)
+    encontrados = [
+        (channel_id, ticket) for channel_id, ticket in tickets.items()
+        if ticket["guild_id"] == guild_id and ticket.get("arquivo")
+        and (owner_id is None or ticket.get("owner_id") == owner_id)
+        and (tipo is None or ticket.get("tipo") == tipo)
+    ]
+    encontrados.sort(key=lambda item: item[1].get("fechado_em") or item[1]["criado_em"], reverse=True)
+    return encontrados
+
 # ===== SUGGESTION SYSTEM =====
 class SugestaoModal(Modal, title="Envie sua sugestão"):
     mensagem = TextInput(label="Escreva sua sugestão", style=TextStyle.paragraph, placeholder="Digite sua sugestão aqui...")
 
+    @medido_interacao("sugestao")
     async def on_submit(self, interaction):
         try:
             canal_id = sugestao_channels.get(str(interaction.guild.id))
@@ -616,10 +3314,15 @@ class SugestaoModal(Modal, title="Envie sua sugestão"):
             embed.set_footer(text="Enviado anonimamente")
             embed.timestamp = datetime.now()
             
-            await canal.send(embed=embed)
+            mensagem = await canal.send(embed=embed)
+            # Sugestões são anônimas: o autor não vai para o índice
+            indice_busca.indexar(
+                f"sugestao:{mensagem.id}", "sugestao", interaction.guild.id, mensagem.jump_url,
+                "Sugestão", self.mensagem.value
+            )
             await interaction.response.send_message("✅ Sugestão enviada com sucesso!", ephemeral=True)
         except Exception as e:
-            print(f"❌ Erro na sugestão: {e}")
+            log_sugestoes.error(f"❌ Erro na sugestão: {e}")
             try:
                 await interaction.response.send_message("❌ Erro ao enviar sugestão", ephemeral=True)
             except:
@@ -629,11 +3332,12 @@ class SugestaoButton(Button):
     def __init__(self):
         super().__init__(label="Enviar sugestão", emoji="💡", style=discord.ButtonStyle.secondary, custom_id="sugestao_button")
 
+    @medido_interacao("botao_sugestao")
     async def callback(self, interaction):
         try:
             await interaction.response.send_modal(SugestaoModal())
         except Exception as e:
-            print(f"❌ Erro no SugestaoButton: {e}")
+            log_sugestoes.error(f"❌ Erro no SugestaoButton: {e}")
 
 class SugestaoView(View):
     def __init__(self):
@@ -642,160 +3346,818 @@ class SugestaoView(View):
 
 # ===== BOT EVENTS =====
 @bot.event
-async def on_ready():
+async def setup_hook():
+    """Roda ao fim do login, antes do gateway: as views já atendem enquanto os membros são carregados."""
     global views_registered
+    marcar_inicializacao("login")
+    cache_fotos.iniciar_carga()  # Índice das fotos lido em uma thread, fora do caminho de envio
     
-    if not views_registered:
-        print(f"✅ Bot conectado: {bot.user}")
-        print(f"🔧 Registrando views persistentes...")
-        
-        try:
-            bot.add_view(TicketButtonView())
-            bot.add_view(SugestaoView())
-            bot.add_view(TicketSupportView())
-            bot.add_view(TicketCloseView())
-            views_registered = True
-            print("✅ Views registradas com sucesso")
-            
-            # Carregar controle de mensagens de aniversário
-            carregar_controle_mensagens()
-            
-            # CORREÇÃO: Forçar o início da task de aniversários
-            if not verificar_aniversarios_task.is_running():
-                verificar_aniversarios_task.start()
-                print("🎂 Sistema de aniversários ATIVADO e funcionando!")
-            else:
-                print("🎂 Sistema de aniversários já estava rodando")
-                
-        except Exception as e:
-            print(f"❌ Erro ao registrar views: {e}")
+    try:
+        bot.add_view(TicketButtonView())
+        bot.add_view(SugestaoView())
+        bot.add_view(TicketSupportView())
+        bot.add_view(TicketCloseView())
+        bot.add_view(PedidoCargoView())
+        bot.add_view(ControleLimpezaView())
+        views_registered = True
+        log.info("✅ Views persistentes registradas")
+    except Exception as e:
+        log.error(f"❌ Erro ao registrar views: {e}")
+
+@bot.event
+async def on_ready():
+    global tarefas_iniciadas, tarefa_sincronizacao_membros
+    
+    if tarefas_iniciadas:
+        log.info("ℹ️ Bot reconectado - tasks já iniciadas")
+        return
+    
+    tarefas_iniciadas = True
+    marcar_inicializacao("pronto")
+    log.info(f"✅ Bot conectado: {bot.user} ({texto_inicializacao()})")
+    
+    # Registrar tickets abertos antes do registro existir
+    asyncio.create_task(reconstruir_registro_tickets())
+    
+    # IDs de membros de todos os servidores (os envios de aniversário aguardam)
+    tarefa_sincronizacao_membros = asyncio.create_task(sincronizar_todos_membros())
+    
+    # Índice de aniversários e fotos: carregados em segundo plano pelos before_loop das tasks
+    if not prefetch_fotos_task.is_running():
+        prefetch_fotos_task.start()
+    
+    # Varredura periódica de quem ficou sem o cargo automático
+    if not reconciliar_cargos_task.is_running():
+        reconciliar_cargos_task.start()
+    
+    if not verificar_aniversarios_task.is_running():
+        verificar_aniversarios_task.change_interval(time=horarios_agendados())
+        verificar_aniversarios_task.start()
+        log.info("🎂 Sistema de aniversários ATIVADO e funcionando!")
     else:
-        print("ℹ️ Bot reconectado - Views já registradas")
+        log.info("🎂 Sistema de aniversários já estava rodando")
 
 @bot.event
 async def on_member_join(member):
-    role_id = auto_roles.get(str(member.guild.id))
-    if role_id:
-        role = member.guild.get_role(role_id)
-        if role:
-            try:
-                await member.add_roles(role)
-                print(f"✅ Cargo {role.name} dado para {member.name}")
-            except Exception as e:
-                print(f"❌ Erro ao dar cargo: {e}")
+    membros = membros_por_servidor.get(member.guild.id)
+    if membros is not None:
+        membros.add(member.id)
+    
+    enfileirar_cargo_automatico(member.guild, member.id)
+
+@bot.event
+async def on_guild_channel_delete(channel):
+    atualizar_indice_item(channel, removido=True)
+    ticket = tickets.get(str(channel.id))
+    if ticket and ticket["status"] != "fechado":
+        fechar_ticket_registro(channel.id)
+    if channel.id in limpezas_ativas or str(channel.id) in limpezas_salvas:
+        descartar_limpeza(channel.id)
 
 @bot.event
-async def on_command_completion(ctx):
-    salvar_dados()
+async def on_member_remove(member):
+    membros_por_servidor.get(member.guild.id, set()).discard(member.id)
+    fila = filas_cargo_automatico.get(member.guild.id)
+    if fila:
+        fila.remover(member.id)
+        atualizar_metrica_fila_cargos()
 
 @bot.event
 async def on_guild_join(guild):
-    salvar_dados()
+    try:
+        await sincronizar_membros(guild)
+    except Exception as e:
+        log_membros.warning(f"⚠️ Erro ao buscar membros de {guild.name}: {e}")
 
 @bot.event
 async def on_guild_remove(guild):
-    guild_id = str(guild.id)
-    auto_roles.pop(guild_id, None)
-    ticket_response_channels.pop(guild_id, None)
-    mention_roles.pop(guild_id, None)
-    sugestao_channels.pop(guild_id, None)
-    ticket_categories.pop(guild_id, None)
-    ticket_support_roles.pop(guild_id, None)
-    aniversario_channels.pop(guild_id, None)
-    salvar_dados()
+    membros_por_servidor.pop(guild.id, None)
+    indices_autocompletar.pop(guild.id, None)
+    fila = filas_cargo_automatico.pop(guild.id, None)
+    if fila:
+        fila.descartar("sem_servidor")
+        atualizar_metrica_fila_cargos()
+    remover_config_servidor(guild.id)
+
+# ===== ÍNDICES DE AUTOCOMPLETAR =====
+# Cargos, canais de texto e categorias de cada servidor em listas ordenadas por nome
+# normalizado; o autocompletar responde por busca binária de prefixo, sem limite de itens.
+MAX_SUGESTOES = 25  # Máximo de opções que o Discord aceita por resposta de autocompletar
+
+def normalizar_nome(texto):
+    """Minúsculas e sem acentos (ex.: 'Técnico' -> 'tecnico')."""
+    texto = unicodedata.normalize("NFKD", texto.casefold())
+    return "".join(c for c in texto if not unicodedata.combining(c))
+
+def chaves_nome(nome):
+    """Sufixos a partir do início de cada palavra: 'suporte-técnico' casa com 'sup' e 'tec'."""
+    normalizado = normalizar_nome(nome)
+    return {
+        normalizado[i:] for i, c in enumerate(normalizado)
+        if c.isalnum() and (i == 0 or not normalizado[i - 1].isalnum())
+    } or {normalizado}
+
+class IndicePrefixo:
+    """Lista ordenada de (chave, id, nome) com busca por prefixo via bisect."""
+
+    def __init__(self, itens=()):
+        self.entradas = []
+        self.chaves = {}   # id -> chaves atuais (para remover/renomear)
+        for item_id, nome in itens:
+            self.chaves[item_id] = chaves_nome(nome)
+            self.entradas.extend((chave, item_id, nome) for chave in self.chaves[item_id])
+        self.entradas.sort()
+
+    def remover(self, item_id):
+        for chave in self.chaves.pop(item_id, ()):
+            i = bisect.bisect_left(self.entradas, (chave, item_id))
+            if i < len(self.entradas) and self.entradas[i][:2] == (chave, item_id):
+                del self.entradas[i]
+
+    def atualizar(self, item_id, nome):
+        self.remover(item_id)
+        self.chaves[item_id] = chaves_nome(nome)
+        for chave in self.chaves[item_id]:
+            bisect.insort(self.entradas, (chave, item_id, nome))
+
+    def buscar(self, texto, limite=MAX_SUGESTOES):
+        """[(id, nome)] cujos nomes têm uma palavra começando com o texto."""
+        prefixo = normalizar_nome(texto.strip())
+        encontrados = {}
+        i = bisect.bisect_left(self.entradas, (prefixo,))
+        while i < len(self.entradas) and len(encontrados) < limite:
+            chave, item_id, nome = self.entradas[i]
+            if not chave.startswith(prefixo):
+                break
+            encontrados.setdefault(item_id, nome)
+            i += 1
+        return list(encontrados.items())
+
+    def exato(self, nome):
+        """ID do item com exatamente esse nome (sem diferenciar maiúsculas/acentos)."""
+        chave = normalizar_nome(nome.strip())
+        i = bisect.bisect_left(self.entradas, (chave,))
+        while i < len(self.entradas) and self.entradas[i][0] == chave:
+            _, item_id, nome_item = self.entradas[i]
+            if normalizar_nome(nome_item) == chave:
+                return item_id
+            i += 1
+        return None
+
+indices_autocompletar = {}  # guild_id -> {"cargos", "canais", "categorias": IndicePrefixo}
+
+def cargo_configuravel(role):
+    return not role.is_default() and not role.managed
+
+def tipo_indice(item):
+    """Índice em que o cargo/canal entra (ou None se não for indexado)."""
+    if isinstance(item, discord.Role):
+        return "cargos" if cargo_configuravel(item) else None
+    if isinstance(item, discord.CategoryChannel):
+        return "categorias"
+    if isinstance(item, discord.TextChannel):
+        return "canais"
+    return None
+
+def indices_servidor(guild):
+    """Índices do servidor, montados na primeira consulta e mantidos pelos eventos."""
+    indices = indices_autocompletar.get(guild.id)
+    if indices is None:
+        itens = {"cargos": [], "canais": [], "categorias": []}
+        for item in [*guild.roles, *guild.channels]:
+            tipo = tipo_indice(item)
+            if tipo:
+                itens[tipo].append((item.id, item.name))
+        indices = {tipo: IndicePrefixo(lista) for tipo, lista in itens.items()}
+        indices_autocompletar[guild.id] = indices
+    return indices
+
+def atualizar_indice_item(item, removido=False):
+    """Reflete criação, renomeação ou remoção de cargo/canal num índice já montado."""
+    indices = indices_autocompletar.get(item.guild.id)
+    tipo = tipo_indice(item)
+    if indices is None or tipo is None:
+        return
+    if removido:
+        indices[tipo].remover(item.id)
+    else:
+        indices[tipo].atualizar(item.id, item.name)
+
+def resolver_item(guild, tipo, texto):
+    """ID do item a partir do valor do autocompletar (ID), de uma menção ou do nome exato."""
+    encontrado = re.fullmatch(r"<(?:@&|#)(\d+)>|(\d+)", texto.strip())
+    if encontrado:
+        return int(encontrado.group(1) or encontrado.group(2))
+    return indices_servidor(guild)[tipo].exato(texto)
+
+def resolver_cargo(guild, texto):
+    role = guild.get_role(resolver_item(guild, "cargos", texto) or 0)
+    return role if role and cargo_configuravel(role) else None
+
+def resolver_canal(guild, texto):
+    """Canal de texto onde o bot pode enviar mensagens."""
+    canal = guild.get_channel(resolver_item(guild, "canais", texto) or 0)
+    if isinstance(canal, discord.TextChannel) and canal.permissions_for(guild.me).send_messages:
+        return canal
+    return None
+
+def resolver_categoria(guild, texto):
+    categoria = guild.get_channel(resolver_item(guild, "categorias", texto) or 0)
+    return categoria if isinstance(categoria, discord.CategoryChannel) else None
+
+def sugestoes(guild, tipo, atual):
+    return [
+        app_commands.Choice(name=nome[:100], value=str(item_id))
+        for item_id, nome in indices_servidor(guild)[tipo].buscar(atual)
+    ]
+
+async def autocompletar_cargos(interaction: discord.Interaction, atual: str):
+    return sugestoes(interaction.guild, "cargos", atual)
+
+async def autocompletar_canais(interaction: discord.Interaction, atual: str):
+    return sugestoes(interaction.guild, "canais", atual)
+
+async def autocompletar_categorias(interaction: discord.Interaction, atual: str):
+    return sugestoes(interaction.guild, "categorias", atual)
+
+@bot.event
+async def on_guild_role_create(role):
+    atualizar_indice_item(role)
+
+@bot.event
+async def on_guild_role_update(before, after):
+    if before.name != after.name:
+        atualizar_indice_item(after)
+
+@bot.event
+async def on_guild_role_delete(role):
+    atualizar_indice_item(role, removido=True)
+
+@bot.event
+async def on_guild_channel_create(channel):
+    atualizar_indice_item(channel)
+
+@bot.event
+async def on_guild_channel_update(before, after):
+    if before.name != after.name:
+        atualizar_indice_item(after)
+
+# ===== LIMPEZA DE CANAIS =====
+# O histórico é lido em streaming, das mais novas para as mais antigas. Mensagens com menos de
+# 14 dias saem em lotes de 100 (bulk delete); as mais antigas, que o Discord só apaga uma a uma,
+# vêm todas depois e são apagadas individualmente, com pausa entre as chamadas.
+IDADE_MAXIMA_LOTE = timedelta(days=14, minutes=-5)  # Margem para a mensagem não vencer no caminho
+TAMANHO_LOTE_EXCLUSAO = 100
+PAUSA_ENTRE_LOTES = 1.0          # Segundos entre bulk deletes no mesmo canal
+PAUSA_EXCLUSAO_INDIVIDUAL = 0.5  # Segundos entre exclusões individuais
+INTERVALO_PROGRESSO = 5.0        # Segundos entre edições da mensagem de progresso
+
+limpezas_ativas = {}  # channel_id -> LimpezaCanal (em andamento, ou cancelada aguardando retomada)
+limpezas_salvas = {}  # Limpezas de antes de um reinício, ainda não restauradas: {channel_id: estado}
+ARQUIVO_LIMPEZAS = "limpezas.json"
+
+def montar_limpezas():
+    """Estado das limpezas (ativas e ainda não restauradas) para retomar depois de um reinício."""
+    dados = dict(limpezas_salvas)
+    dados.update({str(canal_id): limpeza.estado() for canal_id, limpeza in limpezas_ativas.items()})
+    return dados
+
+gravador_limpezas = GravadorJSON(ARQUIVO_LIMPEZAS, montar_limpezas)
+
+def carregar_limpezas():
+    try:
+        with open(ARQUIVO_LIMPEZAS, "r", encoding="utf-8") as f:
+            dados = json.load(f)
+    except FileNotFoundError:
+        return
+    except Exception as e:
+        log.warning(f"⚠️ Erro ao carregar {ARQUIVO_LIMPEZAS}: {e}")
+        return
+    limpezas_salvas.update(dados)
+    gravador_limpezas.ultimo_conteudo = gravador_limpezas.serializar(dados)
+
+def limpeza_do_canal(canal):
+    """Limpeza do canal, restaurando a salva em disco (depois de um reinício) se preciso."""
+    limpeza = limpezas_ativas.get(canal.id)
+    if limpeza is None and str(canal.id) in limpezas_salvas:
+        limpeza = limpezas_ativas[canal.id] = LimpezaCanal.restaurar(canal, limpezas_salvas.pop(str(canal.id)))
+    return limpeza
+
+def descartar_limpeza(canal_id):
+    limpezas_ativas.pop(canal_id, None)
+    limpezas_salvas.pop(str(canal_id), None)
+    gravador_limpezas.agendar()
+
+def interpretar_limite_limpeza(texto):
+    """Data (DD/MM/AAAA ou AAAA-MM-DD, no fuso do bot) ou ID/link de mensagem, para before/after."""
+    texto = texto.strip()
+    encontrado = re.fullmatch(r"(?:https?://\S+/)?(\d{15,20})", texto)
+    if encontrado:
+        return discord.Object(int(encontrado.group(1)))
+    for formato in ("%d/%m/%Y", "%Y-%m-%d", "%d/%m/%Y %H:%M", "%Y-%m-%d %H:%M"):
+        try:
+            return datetime.strptime(texto, formato).replace(tzinfo=FUSO_HORARIO)
+        except ValueError:
+            continue
+    raise commands.BadArgument(f"Data inválida: `{texto}` (use DD/MM/AAAA, AAAA-MM-DD ou o ID/link de uma mensagem)")
+
+def momento_limite(limite):
+    return discord.utils.snowflake_time(limite.id) if isinstance(limite, discord.Object) else limite
+
+def texto_limite(limite):
+    """Inverso de interpretar_limite_limpeza (para gravar o filtro em JSON)."""
+    if limite is None:
+        return None
+    if isinstance(limite, discord.Object):
+        return str(limite.id)
+    return limite.astimezone(FUSO_HORARIO).strftime("%Y-%m-%d %H:%M")
+
+class FiltrosLimpeza(commands.FlagConverter):
+    usuario: discord.User = commands.flag(default=None, description="Só mensagens deste usuário")
+    antes: str = commands.flag(default=None, description="Só mensagens antes desta data (DD/MM/AAAA) ou mensagem (ID/link)")
+    depois: str = commands.flag(default=None, description="Só mensagens depois desta data (DD/MM/AAAA) ou mensagem (ID/link)")
+    contem: str = commands.flag(default=None, description="Só mensagens que contêm este texto")
+    bots: bool = commands.flag(default=False, description="Só mensagens de bots")
+    limite: int = commands.flag(default=None, description="Máximo de mensagens apagadas")
+
+class LimpezaCanal:
+    """Uma limpeza de canal: filtros, contadores e a última mensagem analisada (para retomar)."""
+
+    def __init__(self, canal, autor, usuario=None, antes=None, depois=None, contem=None, apenas_bots=False, limite=None):
+        self.canal = canal
+        self.autor = autor
+        self.usuario = usuario
+        self.antes = interpretar_limite_limpeza(antes) if antes else None
+        self.depois = interpretar_limite_limpeza(depois) if depois else None
+        self.contem = contem.casefold() if contem else None
+        self.apenas_bots = apenas_bots
+        self.limite = limite
+        self.ponto_parada = None  # Retomada continua a partir da mensagem anterior a esta (já resolvidas até ela)
+        self.analisadas = 0
+        self.em_lote = 0
+        self.individuais = 0
+        self.ignorar = set()  # Mensagens do próprio comando (confirmação/progresso)
+        self.mensagem = None  # Mensagem de progresso
+        self.cancelada = False
+        self.tarefa = None
+        self.ultima_atualizacao = 0.0
+        self.controle = ControleLimpezaView()  # A mesma view em todas as edições do progresso
+
+    @classmethod
+    def dos_filtros(cls, canal, autor, filtros):
+        return cls(canal, autor, filtros.usuario, filtros.antes, filtros.depois, filtros.contem, filtros.bots, filtros.limite)
+
+    def estado(self):
+        return {
+            "autor_id": self.autor.id,
+            "mensagem_id": self.mensagem.id if self.mensagem else None,
+            "usuario_id": self.usuario.id if self.usuario else None,
+            "antes": texto_limite(self.antes),
+            "depois": texto_limite(self.depois),
+            "contem": self.contem,
+            "bots": self.apenas_bots,
+            "limite": self.limite,
+            "ponto_parada": self.ponto_parada.id if self.ponto_parada else None,
+            "analisadas": self.analisadas,
+            "em_lote": self.em_lote,
+            "individuais": self.individuais,
+        }
+
+    @classmethod
+    def restaurar(cls, canal, dados):
+        """Limpeza interrompida por um reinício, pronta para ser retomada."""
+        usuario_id = dados["usuario_id"]
+        usuario = (bot.get_user(usuario_id) or MembroForaDoCache(usuario_id)) if usuario_id else None
+        limpeza = cls(canal, discord.Object(dados["autor_id"]), usuario, dados["antes"], dados["depois"],
+                      dados["contem"], dados["bots"], dados["limite"])
+        if dados["ponto_parada"]:
+            limpeza.ponto_parada = discord.Object(dados["ponto_parada"])
+        if dados["mensagem_id"]:
+            limpeza.mensagem = canal.get_partial_message(dados["mensagem_id"])
+            limpeza.ignorar.add(dados["mensagem_id"])
+        limpeza.analisadas = dados["analisadas"]
+        limpeza.em_lote = dados["em_lote"]
+        limpeza.individuais = dados["individuais"]
+        limpeza.cancelada = True
+        return limpeza
+
+    def rodando(self):
+        return self.tarefa is not None and not self.tarefa.done() and not self.cancelada
+
+    def view_controle(self):
+        return self.controle.ajustar(self.rodando())
+
+    def marcar_parada(self, message):
+        self.ponto_parada = message
+        gravador_limpezas.agendar()
+
+    @property
+    def apagadas(self):
+        return self.em_lote + self.individuais
+
+    def filtrada(self):
+        return any((self.usuario, self.antes, self.depois, self.contem, self.apenas_bots, self.limite))
+
+    def descricao_filtros(self):
+        filtros = []
+        if self.usuario:
+            filtros.append(f"de {self.usuario.mention}")
+        if self.apenas_bots:
+            filtros.append("só de bots")
+        if self.contem:
+            filtros.append(f"contendo \"{self.contem}\"")
+        if self.antes:
+            filtros.append(f"antes de {discord.utils.format_dt(momento_limite(self.antes))}")
+        if self.depois:
+            filtros.append(f"depois de {discord.utils.format_dt(momento_limite(self.depois))}")
+        if self.limite:
+            filtros.append(f"no máximo {self.limite}")
+        return ", ".join(filtros)
+
+    def aceita(self, message):
+        if message.id in self.ignorar:
+            return False
+        if self.usuario and message.author.id != self.usuario.id:
+            return False
+        if self.apenas_bots and not message.author.bot:
+            return False
+        if self.contem and self.contem not in message.content.casefold():
+            return False
+        return True
+
+    def texto_progresso(self, estado):
+        return (f"{estado} {self.canal.mention}\n"
+                f"📨 {self.analisadas} analisada(s) · 🗑️ {self.apagadas} apagada(s) "
+                f"({self.em_lote} em lote, {self.individuais} uma a uma)")
+
+    async def atualizar_progresso(self, estado, controle=True, forcar=False):
+        """Edita a mensagem de progresso (no máximo a cada INTERVALO_PROGRESSO, salvo se forçado)."""
+        agora = time.monotonic()
+        if not forcar and agora - self.ultima_atualizacao < INTERVALO_PROGRESSO:
+            return
+        self.ultima_atualizacao = agora
+        try:
+            await self.mensagem.edit(content=self.texto_progresso(estado), view=self.view_controle() if controle else None)
+        except discord.HTTPException as e:
+            log.warning(f"⚠️ Erro ao atualizar o progresso da limpeza: {e}")
+
+    async def apagar_lote(self, lote):
+        """Bulk delete do lote; devolve as que passaram dos 14 dias no caminho (vão uma a uma)."""
+        limite = discord.utils.utcnow() - IDADE_MAXIMA_LOTE
+        recentes = [m for m in lote if m.created_at > limite]
+        antigas = [m for m in lote if m.created_at <= limite]
+        if len(recentes) < 2:
+            return recentes + antigas  # O bulk delete exige de 2 a 100 mensagens
+        await self.canal.delete_messages(recentes)
+        self.em_lote += len(recentes)
+        metricas.incrementar("bot_mensagens_apagadas_total", ("lote",), len(recentes))
+        await asyncio.sleep(PAUSA_ENTRE_LOTES)
+        return antigas
+
+    async def apagar_individual(self, message):
+        try:
+            await message.delete()
+        except discord.NotFound:
+            return  # Já apagada por outra pessoa
+        self.individuais += 1
+        metricas.incrementar("bot_mensagens_apagadas_total", ("individual",))
+        await asyncio.sleep(PAUSA_EXCLUSAO_INDIVIDUAL)
+
+    async def esvaziar(self, lote):
+        for message in await self.apagar_lote(lote):
+            await self.apagar_individual(message)
+        lote.clear()
+
+    def iniciar(self):
+        self.cancelada = False
+        limpezas_ativas[self.canal.id] = self
+        self.tarefa = asyncio.create_task(self.executar())
+        gravador_limpezas.agendar()
+
+    async def executar(self):
+        lote = []
+        ultima = None
+        inicio = time.perf_counter()
+        try:
+            historico = self.canal.history(limit=None, before=self.ponto_parada or self.antes, after=self.depois, oldest_first=False)
+            async for message in historico:
+                if self.cancelada or (self.limite and self.apagadas + len(lote) >= self.limite):
+                    break
+                self.analisadas += 1
+                if self.aceita(message):
+                    if message.created_at > discord.utils.utcnow() - IDADE_MAXIMA_LOTE:
+                        lote.append(message)
+                        if len(lote) >= TAMANHO_LOTE_EXCLUSAO:
+                            await self.esvaziar(lote)
+                    else:
+                        # Daqui para trás só há mensagens antigas: termina o lote e segue uma a uma
+                        if lote:
+                            await self.esvaziar(lote)
+                        await self.apagar_individual(message)
+                ultima = message
+                if not lote:
+                    # Com mensagens na fila do bulk delete o ponto não avança: se o lote falhar, a retomada as relê
+                    self.marcar_parada(message)
+                await self.atualizar_progresso("🧹 Limpando")
+            if lote:
+                await self.esvaziar(lote)
+                self.marcar_parada(ultima)
+        except discord.Forbidden as e:
+            descartar_limpeza(self.canal.id)
+            await self.atualizar_progresso(f"❌ Sem permissão para apagar ({e.text}) em", controle=False, forcar=True)
+            return
+        except Exception as e:
+            # Mantém o ponto de parada: dá para retomar
+            log.error(f"❌ Erro na limpeza de #{self.canal}: {e}", extra={"guild_id": self.canal.guild.id})
+            self.cancelada = True
+            await self.atualizar_progresso(f"❌ Erro ({e}) - limpeza interrompida em", forcar=True)
+            return
+        
+        duracao = time.perf_counter() - inicio
+        log.info(f"🧹 #{self.canal}: {self.apagadas} mensagem(ns) apagada(s) ({self.em_lote} em lote, "
+                 f"{self.individuais} uma a uma) - {duracao:.1f}s", extra={"guild_id": self.canal.guild.id})
+        if self.cancelada:
+            await self.atualizar_progresso("⏹️ Limpeza cancelada em", forcar=True)
+        else:
+            descartar_limpeza(self.canal.id)
+            await self.atualizar_progresso("✅ Limpeza concluída em", controle=False, forcar=True)
+
+class ControleLimpezaView(View):
+    """Cancelar (durante a limpeza) ou retomar (depois de cancelada) na mensagem de progresso.
+    
+    Persistente (registrada no setup_hook): acha a limpeza pelo canal, inclusive depois de um reinício.
+    """
+
+    def __init__(self):
+        super().__init__(timeout=None)
+
+    def ajustar(self, rodando):
+        self.cancelar.disabled = not rodando
+        self.retomar.disabled = rodando
+        return self
+
+    async def interaction_check(self, interaction: discord.Interaction):
+        limpeza = limpeza_do_canal(interaction.channel)
+        if limpeza is None:
+            await interaction.response.edit_message(view=None)  # Limpeza já concluída
+            return False
+        if interaction.user.id != limpeza.autor.id and not interaction.user.guild_permissions.administrator:
+            await interaction.response.send_message("❌ Apenas o autor ou um administrador pode controlar a limpeza", ephemeral=True)
+            return False
+        return True
+
+    @discord.ui.button(label="Cancelar", emoji="⏹️", style=discord.ButtonStyle.secondary, custom_id="limpeza_cancelar")
+    @medido_interacao("limpeza_cancelar")
+    async def cancelar(self, interaction: discord.Interaction, button: Button):
+        limpeza = limpeza_do_canal(interaction.channel)
+        if not limpeza.rodando():
+            # Interrompida por um reinício: a mensagem ainda mostrava a limpeza em andamento
+            await interaction.response.edit_message(content=limpeza.texto_progresso("⏹️ Limpeza interrompida em"),
+                                                    view=limpeza.view_controle())
+            return
+        limpeza.cancelada = True
+        await interaction.response.send_message("⏹️ Cancelando depois da mensagem atual...", ephemeral=True)
+
+    @discord.ui.button(label="Retomar", emoji="▶️", style=discord.ButtonStyle.primary, custom_id="limpeza_retomar")
+    @medido_interacao("limpeza_retomar")
+    async def retomar(self, interaction: discord.Interaction, button: Button):
+        limpeza = limpeza_do_canal(interaction.channel)
+        if limpeza.rodando():
+            await interaction.response.send_message("⏳ A limpeza já está em andamento", ephemeral=True)
+            return
+        limpeza.mensagem = interaction.message
+        limpeza.ignorar.add(interaction.message.id)
+        limpeza.iniciar()
+        await interaction.response.edit_message(content=limpeza.texto_progresso("🧹 Retomando"), view=limpeza.view_controle())
+
+async def clonar_canal(canal, autor):
+    """Recria o canal vazio (permissões, categoria, tópico e posição) e apaga o original."""
+    novo = await canal.clone(reason=f"Limpeza por clonagem pedida por {autor}")
+    await novo.edit(position=canal.position)
+    # Configurações que apontavam para o canal antigo passam para o novo
+    guild_id = str(canal.guild.id)
+    for secao, valores in CONFIGS.items():
+        if valores.get(guild_id) == canal.id:
+            definir_config(secao, guild_id, novo.id)
+    await canal.delete(reason=f"Limpeza por clonagem pedida por {autor}")
+    log.info(f"🧹 #{canal} recriado vazio por {autor}", extra={"guild_id": canal.guild.id})
+    return novo
+
+class ConfirmarLimpezaView(View):
+    def __init__(self, limpeza):
+        super().__init__(timeout=60)
+        self.limpeza = limpeza
+        if limpeza.filtrada():
+            self.remove_item(self.clonar)  # Clonar apaga tudo
+
+    async def interaction_check(self, interaction: discord.Interaction):
+        if interaction.user.id != self.limpeza.autor.id:
+            await interaction.response.send_message("❌ Apenas o autor pode confirmar", ephemeral=True)
+            return False
+        return True
+
+    @discord.ui.button(label="Apagar mensagens", emoji="🧹", style=discord.ButtonStyle.danger)
+    @medido_interacao("limpeza_confirmar")
+    async def apagar(self, interaction: discord.Interaction, button: Button):
+        self.stop()
+        limpeza = self.limpeza
+        if limpeza.canal.id in limpezas_ativas or str(limpeza.canal.id) in limpezas_salvas:
+            await interaction.response.edit_message(content="⏳ Já existe uma limpeza neste canal", view=None)
+            return
+        limpeza.mensagem = interaction.message
+        limpeza.ignorar.add(interaction.message.id)
+        limpeza.iniciar()
+        await interaction.response.edit_message(content=limpeza.texto_progresso("🧹 Limpando"), view=limpeza.view_controle())
+
+    @discord.ui.button(label="Clonar canal", emoji="📋", style=discord.ButtonStyle.primary)
+    @medido_interacao("limpeza_clonar")
+    async def clonar(self, interaction: discord.Interaction, button: Button):
+        self.stop()
+        await interaction.response.edit_message(content="📋 Recriando o canal...", view=None)
+        try:
+            novo = await clonar_canal(self.limpeza.canal, interaction.user)
+        except discord.HTTPException as e:
+            await interaction.edit_original_response(content=f"❌ Não foi possível recriar o canal: {e}")
+            return
+        await novo.send(f"✅ Canal recriado vazio por {interaction.user.mention}")
+
+    @discord.ui.button(label="Cancelar", emoji="❌", style=discord.ButtonStyle.secondary)
+    async def desistir(self, interaction: discord.Interaction, button: Button):
+        self.stop()
+        await interaction.response.edit_message(content="✅ Operação cancelada", view=None)
 
 # ===== COMMANDS =====
-@bot.command(aliases=["cargos"])
+@bot.hybrid_command(aliases=["cargos"])
 @commands.has_permissions(administrator=True)
-async def cargo(ctx):
-    roles = [r for r in ctx.guild.roles if not r.is_bot_managed() and r.name != "@everyone"]
-    options = [SelectOption(label=r.name[:100], value=str(r.id)) for r in roles[:25]]
-
-    if not options:
-        await ctx.send("⚠️ Nenhum cargo encontrado")
+async def cargo(ctx, cargo: str = None):
+    """Configura o cargo dado automaticamente a quem entra no servidor."""
+    def configurar(role):
+        definir_config("auto_roles", ctx.guild.id, role.id)
+        return f"✅ Cargo automático configurado: **{role.name}**"
+    
+    if cargo is not None:
+        role = resolver_cargo(ctx.guild, cargo)
+        await ctx.send(configurar(role) if role else "❌ Cargo não encontrado")
         return
 
-    class RoleSelect(Select):
+    class AutoRoleSelect(discord.ui.RoleSelect):
         def __init__(self):
-            super().__init__(placeholder="Selecione o cargo automático", options=options)
+            super().__init__(placeholder="Selecione o cargo automático")
 
         async def callback(self, interaction: discord.Interaction):
-            role_id = int(self.values[0])
-            auto_roles[str(ctx.guild.id)] = role_id
-            salvar_dados()
-            role = ctx.guild.get_role(role_id)
-            await interaction.response.send_message(f"✅ Cargo automático configurado: **{role.name}**", ephemeral=True)
+            role = self.values[0]
+            if not cargo_configuravel(role):
+                await interaction.response.send_message("❌ Escolha um cargo comum (não gerenciado por bot)", ephemeral=True)
+                return
+            await interaction.response.send_message(configurar(role), ephemeral=True)
 
     view = View()
-    view.add_item(RoleSelect())
+    view.add_item(AutoRoleSelect())
     await ctx.send("👥 Selecione o cargo automático:", view=view)
 
-@bot.command()
+@bot.hybrid_command()
 @commands.has_permissions(administrator=True)
-async def setcargo(ctx):
-    roles = [r for r in ctx.guild.roles if not r.is_bot_managed() and r.name != "@everyone"]
-    options = [SelectOption(label=r.name[:100], value=str(r.id)) for r in roles[:25]]
-
-    if not options:
-        await ctx.send("⚠️ Nenhum cargo encontrado")
+async def setcargo(ctx, cargo: str = None):
+    """Define o cargo mencionado nos tickets."""
+    def configurar(role):
+        definir_config("mention_roles", ctx.guild.id, role.id)
+        return f"📌 Cargo para mencionar configurado: **{role.name}**"
+    
+    if cargo is not None:
+        role = resolver_cargo(ctx.guild, cargo)
+        await ctx.send(configurar(role) if role else "❌ Cargo não encontrado")
         return
 
-    class MentionRoleSelect(Select):
+    class MentionRoleSelect(discord.ui.RoleSelect):
         def __init__(self):
-            super().__init__(placeholder="Cargo para mencionar nos tickets", options=options)
+            super().__init__(placeholder="Cargo para mencionar nos tickets")
 
         async def callback(self, interaction: discord.Interaction):
-            role_id = int(self.values[0])
-            mention_roles[str(ctx.guild.id)] = role_id
-            salvar_dados()
-            role = ctx.guild.get_role(role_id)
-            await interaction.response.send_message(f"📌 Cargo para mencionar configurado: **{role.name}**", ephemeral=True)
+            role = self.values[0]
+            if not cargo_configuravel(role):
+                await interaction.response.send_message("❌ Escolha um cargo comum (não gerenciado por bot)", ephemeral=True)
+                return
+            await interaction.response.send_message(configurar(role), ephemeral=True)
 
     view = View()
     view.add_item(MentionRoleSelect())
     await ctx.send("🔣 Selecione o cargo para mencionar nos tickets:", view=view)
 
-@bot.command()
+def painel_solicitacao_cargo():
+    embed = discord.Embed(
+        title="📋 Solicitar Cargo",
+        description="**Clique no botão abaixo para solicitar um cargo no servidor!**\n\n"
+                  "📝 **Como funciona:**\n"
+                  "• Clique em 'Solicitar cargo'\n"
+                  "• Preencha o formulário\n"
+                  "• Aguarde a aprovação da equipe\n\n"
+                  "⚠️ **Importante:** Use apenas para solicitações reais de cargo.",
+        color=discord.Color.blue()
+    )
+    embed.set_footer(text="Sistema de solicitação de cargos")
+    return embed
+
+@bot.hybrid_command()
 @commands.has_permissions(administrator=True)
-async def ticket(ctx):
-    channels = [c for c in ctx.guild.text_channels if c.permissions_for(ctx.guild.me).send_messages]
-    if not channels:
-        await ctx.send("❌ Nenhum canal disponível")
+async def ticket(ctx, canal: str = None):
+    """Configura o sistema de solicitação de cargos."""
+    def configurar(channel):
+        definir_config("ticket_response_channels", ctx.guild.id, channel.id)
+        return f"✅ Canal de tickets configurado: {channel.mention}"
+    
+    async def enviar_painel():
+        # Enviar o painel de solicitação de cargo
+        await ctx.channel.send(embed=painel_solicitacao_cargo(), view=TicketButtonView())
+    
+    if canal is not None:
+        channel = resolver_canal(ctx.guild, canal)
+        if not channel:
+            await ctx.send("❌ Canal não encontrado (ou sem permissão de envio)")
+            return
+        await ctx.send(configurar(channel))
+        await enviar_painel()
         return
 
-    options = [SelectOption(label=c.name[:100], value=str(c.id)) for c in channels[:25]]
-
-    class ChannelSelect(Select):
+    class TicketChannelSelect(discord.ui.ChannelSelect):
         def __init__(self):
-            super().__init__(placeholder="Canal para receber tickets", options=options)
+            super().__init__(placeholder="Canal para receber tickets", channel_types=[discord.ChannelType.text])
 
         async def callback(self, interaction: discord.Interaction):
-            channel_id = int(self.values[0])
-            ticket_response_channels[str(ctx.guild.id)] = channel_id
-            salvar_dados()
-            await interaction.response.send_message(f"✅ Canal de tickets configurado: <#{channel_id}>", ephemeral=True)
-            
-            # Enviar o painel de solicitação de cargo
-            embed = discord.Embed(
-                title="📋 Solicitar Cargo",
-                description="**Clique no botão abaixo para solicitar um cargo no servidor!**\n\n"
-                          "📝 **Como funciona:**\n"
-                          "• Clique em 'Solicitar cargo'\n"
-                          "• Preencha o formulário\n"
-                          "• Aguarde a aprovação da equipe\n\n"
-                          "⚠️ **Importante:** Use apenas para solicitações reais de cargo.",
-                color=discord.Color.blue()
-            )
-            embed.set_footer(text="Sistema de solicitação de cargos")
-            
-            await ctx.send(embed=embed, view=TicketButtonView())
+            channel = resolver_canal(ctx.guild, str(self.values[0].id))
+            if not channel:
+                await interaction.response.send_message("❌ Não posso enviar mensagens nesse canal", ephemeral=True)
+                return
+            await interaction.response.send_message(configurar(channel), ephemeral=True)
+            await enviar_painel()
+
+    view = View()
+    view.add_item(TicketChannelSelect())
+    await ctx.send("📌 Escolha o canal para receber os tickets:", view=view)
+
+@bot.hybrid_command()
+@commands.has_permissions(manage_roles=True)
+async def pedidos(ctx, pagina: int = 1):
+    """Lista os pedidos de cargo pendentes (os mais antigos primeiro)."""
+    pendentes = list(pedidos_pendentes_por_servidor.get(str(ctx.guild.id), {}).items())
+    if not pendentes:
+        await ctx.send("✅ Nenhum pedido de cargo pendente")
+        return
+    
+    paginas = (len(pendentes) + MAX_PEDIDOS_LISTADOS - 1) // MAX_PEDIDOS_LISTADOS
+    pagina = min(max(pagina, 1), paginas)
+    inicio = (pagina - 1) * MAX_PEDIDOS_LISTADOS
+    linhas = []
+    for pedido_id, pedido in pendentes[inicio:inicio + MAX_PEDIDOS_LISTADOS]:
+        cargo = f"<@&{pedido['cargo_id']}>" if pedido.get("cargo_id") else "sem cargo escolhido"
+        linhas.append(f"• <@{pedido['user_id']}> - {pedido['nome'][:40]} - \"{pedido['cargo_desejado'][:40]}\" → {cargo} "
+                      f"([ver]({link_pedido(pedido_id, pedido)}))")
+    
+    embed = discord.Embed(title=f"📬 Pedidos de cargo pendentes ({len(pendentes)})", description="\n".join(linhas),
+                          color=discord.Color.blurple())
+    por_cargo = {}
+    for _, pedido in pendentes:
+        por_cargo[pedido.get("cargo_id")] = por_cargo.get(pedido.get("cargo_id"), 0) + 1
+    resumo = [f"<@&{cargo_id}>: {total}" if cargo_id else f"Sem cargo escolhido: {total}"
+              for cargo_id, total in sorted(por_cargo.items(), key=lambda item: -item[1])[:10]]
+    embed.add_field(name="🎯 Por cargo", value="\n".join(resumo), inline=False)
+    embed.set_footer(text=f"Página {pagina}/{paginas} - !aprovarpedidos <cargo> [texto pedido | *] aprova em massa")
+    await ctx.send(embed=embed)
 
-    view = View()
-    view.add_item(ChannelSelect())
-    await ctx.send("📌 Escolha o canal para receber os tickets:", view=view)
+@bot.hybrid_command()
+@commands.has_permissions(manage_roles=True)
+async def aprovarpedidos(ctx, cargo: str, *, filtro: str = None):
+    """Aprova em massa os pedidos pendentes com o cargo informado.
+    
+    Sem filtro: os pedidos que já estão com esse cargo escolhido. Com filtro: os que pediram
+    um texto contendo o filtro (ex.: "financeiro"); * seleciona todos os pendentes.
+    """
+    role = resolver_cargo(ctx.guild, cargo)
+    if not role:
+        await ctx.send("❌ Cargo não encontrado")
+        return
+    erro = erro_cargo_pedido(ctx.guild, role)
+    if erro:
+        await ctx.send(erro)
+        return
+    
+    pendentes = pedidos_pendentes_por_servidor.get(str(ctx.guild.id), {})
+    if filtro == TODOS_PEDIDOS:
+        selecionados = list(pendentes)
+    elif filtro:
+        chave = normalizar_nome(filtro)
+        selecionados = [pedido_id for pedido_id, p in pendentes.items() if chave in normalizar_nome(p["cargo_desejado"])]
+    else:
+        selecionados = [pedido_id for pedido_id, p in pendentes.items() if p.get("cargo_id") == role.id]
+    
+    if not selecionados:
+        await ctx.send("ℹ️ Nenhum pedido pendente corresponde ao filtro")
+        return
+    
+    view = ConfirmarAprovacaoView(ctx.author.id, role, selecionados)
+    await ctx.send(f"⚠️ Aprovar **{len(selecionados)}** pedido(s) dando o cargo {role.mention}?", view=view)
 
 # ===== COMANDO DE DEBUG =====
-@bot.command()
+@bot.hybrid_command()
 @commands.has_permissions(administrator=True)
 async def debugjson(ctx):
     """Debug para encontrar o arquivo JSON."""
@@ -827,32 +4189,110 @@ async def debugjson(ctx):
     await ctx.send(embed=embed)
 
 # ===== COMANDO DE ANIVERSÁRIO =====
-@bot.command()
+@bot.hybrid_command()
 @commands.has_permissions(administrator=True)
-async def aniversario(ctx):
+async def aniversario(ctx, canal: str = None):
     """Configura o canal para mensagens de aniversário."""
-    channels = [c for c in ctx.guild.text_channels if c.permissions_for(ctx.guild.me).send_messages]
-    if not channels:
-        await ctx.send("❌ Nenhum canal disponível")
+    def configurar(channel):
+        definir_config("aniversario_channels", ctx.guild.id, channel.id)
+        atualizar_horarios_aniversario()
+        return f"🎂 Canal de aniversários configurado: {channel.mention}"
+    
+    if canal is not None:
+        channel = resolver_canal(ctx.guild, canal)
+        await ctx.send(configurar(channel) if channel else "❌ Canal não encontrado (ou sem permissão de envio)")
         return
 
-    options = [SelectOption(label=c.name[:100], value=str(c.id)) for c in channels[:25]]
-
-    class AniversarioChannelSelect(Select):
+    class AniversarioChannelSelect(discord.ui.ChannelSelect):
         def __init__(self):
-            super().__init__(placeholder="Canal para mensagens de aniversário", options=options)
+            super().__init__(placeholder="Canal para mensagens de aniversário", channel_types=[discord.ChannelType.text])
 
         async def callback(self, interaction: discord.Interaction):
-            channel_id = int(self.values[0])
-            aniversario_channels[str(ctx.guild.id)] = channel_id
-            salvar_dados()
-            await interaction.response.send_message(f"🎂 Canal de aniversários configurado: <#{channel_id}>", ephemeral=True)
+            channel = resolver_canal(ctx.guild, str(self.values[0].id))
+            if not channel:
+                await interaction.response.send_message("❌ Não posso enviar mensagens nesse canal", ephemeral=True)
+                return
+            await interaction.response.send_message(configurar(channel), ephemeral=True)
 
     view = View()
     view.add_item(AniversarioChannelSelect())
     await ctx.send("🎉 Escolha o canal para mensagens de aniversário:", view=view)
 
-@bot.command()
+@bot.hybrid_command()
+@commands.has_permissions(administrator=True)
+async def horaaniversario(ctx, hora: int):
+    """Define a hora local (0-23) de envio das mensagens de aniversário."""
+    if not 0 <= hora <= 23:
+        await ctx.send("❌ Informe uma hora entre 0 e 23")
+        return
+    
+    definir_config("aniversario_horarios", ctx.guild.id, hora)
+    atualizar_horarios_aniversario()
+    await ctx.send(f"🕰️ Mensagens de aniversário serão enviadas às **{hora:02d}:00** ({FUSO_HORARIO})")
+
+@bot.hybrid_command()
+@commands.has_permissions(administrator=True)
+async def modeloaniversario(ctx, campo: str = None, *, valor: str = None):
+    """Personaliza a mensagem de aniversário do servidor (sem argumentos mostra o modelo e uma prévia)."""
+    campos = CAMPOS_TEXTO_MODELO + ("mensagens", "cor", "foto", "consolidado")
+    
+    if campo is None:
+        modelo = modelo_aniversario(ctx.guild.id)
+        embed = discord.Embed(title="🎨 Modelo de Aniversário", color=modelo["cor"])
+        for nome in CAMPOS_TEXTO_MODELO:
+            embed.add_field(name=nome, value=f"`{modelo[nome]}`", inline=False)
+        embed.add_field(name="mensagens", value="\n".join(f"`{m}`" for m in modelo["mensagens"])[:1024], inline=False)
+        embed.add_field(name="cor", value=f"#{modelo['cor'].value:06X}", inline=True)
+        embed.add_field(name="foto", value="on" if modelo["foto"] else "off", inline=True)
+        embed.add_field(name="consolidado", value="on" if modelo["consolidado"] else "off", inline=True)
+        embed.set_footer(text="Variáveis: {nome} {idade} {mencao} {servidor} {quantidade} • !modeloaniversario <campo> <valor|padrao>")
+        await ctx.send(embed=embed)
+        
+        # Prévia com o próprio autor como aniversariante
+        exemplo = {"user_id": str(ctx.author.id), "nome": ctx.author.display_name, "idade": 30, "link_foto": ""}
+        mensagem, previa, _ = renderizar_aniversario(modelo, exemplo, ctx.author, ctx.guild)
+        await ctx.send(content=f"👀 **Prévia:** {mensagem}", embed=previa, allowed_mentions=discord.AllowedMentions.none())
+        return
+    
+    campo = campo.lower()
+    if campo not in campos:
+        await ctx.send(f"❌ Campo inválido. Use: {', '.join(f'`{c}`' for c in campos)}")
+        return
+    if valor is None:
+        await ctx.send(f"❌ Informe o valor de `{campo}` (ou `padrao` para restaurar)")
+        return
+    
+    if valor.lower() == "padrao":
+        novo = None
+    elif campo == "mensagens":
+        # Várias mensagens separadas por | (uma é sorteada a cada envio)
+        novo = [m.strip() for m in valor.split("|") if m.strip()]
+    elif campo == "cor":
+        try:
+            novo = int(valor.lstrip("#"), 16)
+        except ValueError:
+            await ctx.send("❌ Cor inválida. Use hexadecimal, ex.: `#FFD700`")
+            return
+        if not 0 <= novo <= 0xFFFFFF:
+            await ctx.send("❌ Cor inválida. Use hexadecimal, ex.: `#FFD700`")
+            return
+    elif campo in ("foto", "consolidado"):
+        if valor.lower() not in ("on", "off"):
+            await ctx.send(f"❌ Use `on` ou `off` para `{campo}`")
+            return
+        novo = valor.lower() == "on"
+    else:
+        novo = valor[:256] if campo in ("titulo", "titulo_consolidado") else valor[:1024]
+    
+    try:
+        definir_modelo_aniversario(ctx.guild.id, campo, novo)
+    except ValueError as e:
+        await ctx.send(f"❌ Modelo inválido: {e}")
+        return
+    
+    await ctx.send(f"✅ Campo `{campo}` {'restaurado ao padrão' if novo is None else 'atualizado'}. Use `!modeloaniversario` para ver a prévia.")
+
+@bot.hybrid_command()
 @commands.has_permissions(administrator=True)
 async def testaraniversario(ctx):
     """Testa o sistema de aniversário manualmente."""
@@ -868,31 +4308,27 @@ async def testaraniversario(ctx):
         await ctx.send("❌ Configure o canal de aniversários primeiro com `!aniversario`")
         return
     
-    enviados = 0
-    for aniversariante in aniversariantes:
-        # Verificar se a pessoa está neste servidor
-        member = ctx.guild.get_member(int(aniversariante["user_id"]))
-        if member:
-            sucesso = await enviar_mensagem_aniversario(ctx.guild, aniversariante)
-            if sucesso:
-                enviados += 1
+    await ctx.defer()
+    resultado = await enviar_aniversarios_servidor(ctx.guild, aniversariantes)
+    salvar_controle_mensagens()
+    enviados = resultado["enviadas"]
     
     await ctx.send(f"✅ {enviados} mensagem(s) de aniversário enviada(s)!")
 
-@bot.command()
+@bot.hybrid_command()
 @commands.has_permissions(administrator=True)
 async def forceaniversario(ctx):
     """Força a verificação de aniversários AGORA (sem restrição de horário)."""
     await ctx.send("🔄 Forçando verificação de aniversários...")
     
     try:
-        # Executar a função diretamente
-        await verificar_aniversarios_task()
+        # Executar o lote diretamente para todos os servidores
+        await executar_lote_aniversarios(bot.guilds)
         await ctx.send("✅ Verificação de aniversários executada!")
     except Exception as e:
         await ctx.send(f"❌ Erro: {e}")
 
-@bot.command()
+@bot.hybrid_command()
 @commands.has_permissions(administrator=True)
 async def debuganiversarios(ctx):
     """Debug detalhado dos aniversários."""
@@ -902,7 +4338,7 @@ async def debuganiversarios(ctx):
         await ctx.send("❌ Nenhum aniversário carregado")
         return
     
-    hoje = date.today()
+    hoje = hoje_local()
     embed = discord.Embed(title="🔍 Debug Aniversários Detalhado", color=discord.Color.blue())
     
     # Informações básicas
@@ -913,6 +4349,26 @@ async def debuganiversarios(ctx):
     task_status = "✅ Rodando" if verificar_aniversarios_task.is_running() else "❌ Parada"
     embed.add_field(name="🔄 Task Status", value=task_status, inline=True)
     
+    proximo = verificar_aniversarios_task.next_iteration
+    proximo_texto = discord.utils.format_dt(proximo, "R") if proximo else "N/A"
+    embed.add_field(name="🕰️ Horário de envio", value=f"{horario_aniversario(ctx.guild.id):02d}:00 (próxima execução {proximo_texto})", inline=True)
+    
+    if ultimo_lote_aniversarios:
+        lote = ultimo_lote_aniversarios
+        embed.add_field(
+            name="📦 Último lote",
+            value=f"{lote['horario'].strftime('%d/%m %H:%M')} - {lote['enviadas']} enviada(s), "
+                  f"{lote['falhas']} falha(s) em {lote['servidores']} servidor(es) ({lote['duracao']:.2f}s)",
+            inline=False
+        )
+    
+    if cache_fotos.carregado:
+        embed.add_field(
+            name="🖼️ Cache de fotos",
+            value=f"{len(cache_fotos.entradas)} foto(s), {cache_fotos.tamanho_total() / (1024 * 1024):.1f} MB",
+            inline=True
+        )
+    
     # Canal configurado
     guild_id = str(ctx.guild.id)
     canal_config = aniversario_channels.get(guild_id)
@@ -922,21 +4378,17 @@ async def debuganiversarios(ctx):
         embed.add_field(name="📺 Canal", value="❌ Não configurado", inline=True)
     
     # Verificar aniversários de hoje
-    hoje_count = 0
     aniversariantes_hoje = []
+    registros_hoje = aniversariantes_do_dia(hoje.month, hoje.day)
+    hoje_count = len(registros_hoje)
+    membros = membros_do_servidor(ctx.guild)
     
-    for user_id, dados in aniversarios.items():
-        try:
-            data_nascimento = datetime.strptime(dados["data_nascimento"], "%Y-%m-%d").date()
-            
-            if data_nascimento.day == hoje.day and data_nascimento.month == hoje.month:
-                hoje_count += 1
-                member = ctx.guild.get_member(int(user_id))
-                status = "✅ No servidor" if member else "❌ Não está no servidor"
-                aniversariantes_hoje.append(f"**{dados['nome']}** - {status}")
-                
-        except Exception as e:
-            embed.add_field(name=f"❌ Erro em {user_id}", value=f"Data: {dados.get('data_nascimento', 'N/A')}\nErro: {str(e)[:50]}", inline=True)
+    for registro in registros_hoje:
+        status = "✅ No servidor" if registro["id"] in membros else "❌ Não está no servidor"
+        aniversariantes_hoje.append(f"**{registro['nome']}** - {status}")
+    
+    for user_id, dados, erro in indice_aniversarios["erros"][:10]:
+        embed.add_field(name=f"❌ Erro em {user_id}", value=f"Data: {dados.get('data_nascimento', 'N/A')}\nErro: {erro[:50]}", inline=True)
     
     embed.add_field(name="🎉 Aniversários HOJE", value=f"{hoje_count} pessoas", inline=False)
     
@@ -948,12 +4400,12 @@ async def debuganiversarios(ctx):
     
     await ctx.send(embed=embed)
 
-@bot.command()
+@bot.hybrid_command()
 @commands.has_permissions(administrator=True)
 async def carregarjson(ctx):
     """Força o carregamento do JSON manualmente."""
     try:
-        aniversarios = carregar_aniversarios()
+        aniversarios = carregar_aniversarios(forcar=True)
         
         if aniversarios:
             embed = discord.Embed(title="✅ JSON Carregado!", color=discord.Color.green())
@@ -961,9 +4413,9 @@ async def carregarjson(ctx):
             
             # Mostrar algumas amostras
             amostras = list(aniversarios.items())[:3]
+            membros = membros_do_servidor(ctx.guild)
             for user_id, dados in amostras:
-                member = ctx.guild.get_member(int(user_id))
-                status = "✅ No servidor" if member else "❌ Não está no servidor"
+                status = "✅ No servidor" if user_id.isdigit() and int(user_id) in membros else "❌ Não está no servidor"
                 embed.add_field(
                     name=f"👤 {dados['nome'][:20]}...", 
                     value=f"Nascimento: {dados['data_nascimento']}\n{status}", 
@@ -977,39 +4429,92 @@ async def carregarjson(ctx):
     except Exception as e:
         await ctx.send(f"❌ Erro: {e}")
 
-@bot.command()
+@bot.hybrid_command()
+@commands.has_permissions(administrator=True)
+async def importaraniversarios(ctx, arquivo: discord.Attachment = None, verificar_membros: bool = True):
+    """Importa aniversários de um anexo .csv ou .jsonl (user_id, nome, data_nascimento, link_foto)."""
+    if arquivo is None:
+        await ctx.send("❌ Anexe um arquivo `.csv` ou `.jsonl` com as colunas `user_id, nome, data_nascimento, link_foto`")
+        return
+    
+    anexo = arquivo
+    formato = formato_do_arquivo(anexo.filename)
+    if not formato:
+        await ctx.send("❌ Formato não suportado. Use `.csv` ou `.jsonl`")
+        return
+    
+    aviso = await ctx.send(f"⏳ Importando `{anexo.filename}`...")
+    inicio = time.perf_counter()
+    try:
+        temporario = await baixar_anexo(anexo)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        await aviso.edit(content=f"❌ Erro ao baixar o anexo: {e}")
+        return
+    membros = frozenset(membros_do_servidor(ctx.guild)) if verificar_membros else None
+    
+    def processar():
+        with io.TextIOWrapper(temporario, encoding="utf-8-sig", newline="") as linhas:
+            return importar_aniversarios(linhas, formato, membros)
+    
+    try:
+        importados, erros = await asyncio.to_thread(processar)
+    except Exception as e:
+        await aviso.edit(content=f"❌ Erro na importação: {e}")
+        return
+    
+    embed = discord.Embed(title="📥 Importação de Aniversários", color=discord.Color.green() if not erros else discord.Color.orange())
+    embed.add_field(name="✅ Importados", value=str(importados), inline=True)
+    embed.add_field(name="⚠️ Com erro", value=str(len(erros)), inline=True)
+    embed.add_field(name="⏱️ Tempo", value=f"{time.perf_counter() - inicio:.2f}s", inline=True)
+    
+    arquivo = None
+    if erros:
+        arquivo = discord.File(io.BytesIO(relatorio_erros_csv(erros)), filename="erros_importacao.csv")
+    await aviso.edit(content=None, embed=embed, attachments=[arquivo] if arquivo else [])
+
+@bot.hybrid_command()
+@commands.has_permissions(administrator=True)
+async def exportaraniversarios(ctx, formato: str = "csv"):
+    """Exporta os aniversários em .csv ou .jsonl."""
+    formato = formato.lower()
+    if formato not in ("csv", "jsonl"):
+        await ctx.send("❌ Formato deve ser `csv` ou `jsonl`")
+        return
+    await ctx.defer()
+    
+    def gerar():
+        # Arquivo temporário em disco: não monta a exportação inteira na memória
+        saida = tempfile.TemporaryFile("w+b")
+        texto = io.TextIOWrapper(saida, encoding="utf-8", newline="")
+        total = exportar_aniversarios(texto, formato)
+        texto.flush()
+        texto.detach()
+        saida.seek(0)
+        return saida, total
+    
+    saida, total = await asyncio.to_thread(gerar)
+    with saida:
+        await ctx.send(f"📤 {total} aniversário(s) exportado(s)", file=discord.File(saida, filename=f"aniversarios.{formato}"))
+
+@bot.hybrid_command()
 async def listaraniversarios(ctx):
     """Lista todos os aniversários do mês atual."""
     aniversarios = carregar_aniversarios()
-    hoje = date.today()
+    hoje = hoje_local()
     mes_atual = hoje.month
     
-    print(f"🔍 Listando aniversários do mês {mes_atual} ({hoje.strftime('%B')})")
+    log_aniversarios.debug("Listando aniversários do mês %d", mes_atual, extra={"guild_id": ctx.guild.id})
     
     aniversariantes_mes = []
     
-    for user_id, dados in aniversarios.items():
-        try:
-            data_nascimento = datetime.strptime(dados["data_nascimento"], "%Y-%m-%d").date()
-            print(f"   Verificando {dados['nome']}: nascimento mês {data_nascimento.month}")
-            
-            if data_nascimento.month == mes_atual:
-                # Verificar se a pessoa está no servidor
-                member = ctx.guild.get_member(int(user_id))
-                if member:  # Só adicionar se estiver no servidor
-                    aniversariantes_mes.append({
-                        "dia": data_nascimento.day,
-                        "nome": dados["nome"],
-                        "member": member
-                    })
-                    print(f"   ✅ Adicionado: {dados['nome']} (dia {data_nascimento.day})")
-                else:
-                    print(f"   ❌ {dados['nome']} não está no servidor")
-        except Exception as e:
-            print(f"   ⚠️ Erro com {user_id}: {e}")
-            continue
+    # Registros já vêm ordenados por dia do índice mensal; só quem está no servidor
+    for registro in aniversariantes_no_servidor(ctx.guild, aniversariantes_do_mes(mes_atual)):
+        aniversariantes_mes.append({
+            "dia": registro["data_nascimento"].day,
+            "nome": registro["nome"],
+        })
     
-    print(f"📊 Total encontrado no servidor: {len(aniversariantes_mes)}")
+    log_aniversarios.debug("Total encontrado no servidor: %d", len(aniversariantes_mes), extra={"guild_id": ctx.guild.id})
     
     if not aniversariantes_mes:
         embed = discord.Embed(
@@ -1021,9 +4526,6 @@ async def listaraniversarios(ctx):
         await ctx.send(embed=embed)
         return
     
-    # Ordenar por dia
-    aniversariantes_mes.sort(key=lambda x: x["dia"])
-    
     embed = discord.Embed(
         title=f"🎂 Aniversariantes de {datetime.now().strftime('%B')}",
         color=discord.Color.gold()
@@ -1039,63 +4541,58 @@ async def listaraniversarios(ctx):
     
     await ctx.send(embed=embed)
 
-@bot.command()
-@commands.has_permissions(administrator=True)
-async def setupticket(ctx):
-    """Configura o sistema de tickets em duas etapas."""
-    guild_id = str(ctx.guild.id)
-    categories = ctx.guild.categories
+def confirmar_categoria_ticket(guild_id, categoria):
+    """Grava a categoria dos tickets e monta a confirmação."""
+    guild_id = str(guild_id)
+    definir_config("ticket_categories", guild_id, categoria.id)
     
-    if not categories:
+    # Confirmação final
+    success_embed = discord.Embed(
+        title="✅ Sistema de Tickets Configurado!",
+        color=discord.Color.green()
+    )
+    success_embed.add_field(name="📁 Categoria", value=categoria.name, inline=True)
+    success_embed.add_field(name="🎯 Tipos Disponíveis", value="\n".join([f"{info['emoji']} {info['name']}" for info in registro_suporte(guild_id)["tipos"].values()]), inline=False)
+    success_embed.add_field(name="📋 Próximo Passo", value="Use `!ticketpanel` para criar o painel", inline=False)
+    return success_embed
+
+@bot.hybrid_command()
+@commands.has_permissions(administrator=True)
+async def setupticket(ctx, categoria: str = None):
+    """Configura a categoria onde os canais de ticket são criados."""
+    if not ctx.guild.categories:
         await ctx.send("❌ **Erro:** Não há categorias no servidor.\n📁 Crie uma categoria primeiro usando as configurações do servidor.")
         return
-        
-    # Criar lista de categorias
-    category_list = "\n".join([f"`{i+1}.` {cat.name}" for i, cat in enumerate(categories[:10])])
     
+    if categoria is not None:
+        selecionada = resolver_categoria(ctx.guild, categoria)
+        if not selecionada:
+            await ctx.send("❌ **Erro:** Categoria não encontrada. Use `!setupticket` novamente.")
+            return
+        await ctx.send(embed=confirmar_categoria_ticket(ctx.guild.id, selecionada))
+        return
+
+    class CategoriaSelect(discord.ui.ChannelSelect):
+        def __init__(self):
+            super().__init__(placeholder="Categoria dos tickets", channel_types=[discord.ChannelType.category])
+
+        async def callback(self, interaction: discord.Interaction):
+            selecionada = ctx.guild.get_channel(self.values[0].id)
+            await interaction.response.send_message(embed=confirmar_categoria_ticket(ctx.guild.id, selecionada))
+
+    view = View()
+    view.add_item(CategoriaSelect())
     embed = discord.Embed(
         title="📁 Configuração de Tickets - Categoria",
-        description=f"**Categorias disponíveis:**\n{category_list}\n\n**Digite o número da categoria desejada:**",
+        description="**Escolha a categoria onde os tickets serão criados:**",
         color=discord.Color.blue()
     )
-    
-    await ctx.send(embed=embed)
-    
-    def check_category(msg):
-        return msg.author == ctx.author and msg.channel == ctx.channel and msg.content.isdigit()
-    
-    try:
-        # Aguardar resposta do usuário para categoria
-        msg = await bot.wait_for('message', check=check_category, timeout=30.0)
-        category_num = int(msg.content) - 1
-        
-        if 0 <= category_num < len(categories):
-            selected_category = categories[category_num]
-            ticket_categories[guild_id] = selected_category.id
-            salvar_dados()
-            
-            # Confirmação final
-            success_embed = discord.Embed(
-                title="✅ Sistema de Tickets Configurado!",
-                color=discord.Color.green()
-            )
-            success_embed.add_field(name="📁 Categoria", value=selected_category.name, inline=True)
-            success_embed.add_field(name="🎯 Tipos Disponíveis", value="\n".join([f"{info['emoji']} {info['name']}" for info in SUPPORT_TYPES.values()]), inline=False)
-            success_embed.add_field(name="📋 Próximo Passo", value="Use `!ticketpanel` para criar o painel", inline=False)
-            
-            await ctx.send(embed=success_embed)
-            
-        else:
-            await ctx.send("❌ **Erro:** Número de categoria inválido. Use `!setupticket` novamente.")
-            
-    except asyncio.TimeoutError:
-        await ctx.send("⏰ **Tempo esgotado!** Use `!setupticket` novamente.")
-    except ValueError:
-        await ctx.send("❌ **Erro:** Digite apenas números. Use `!setupticket` novamente.")
+    await ctx.send(embed=embed, view=view)
 
-@bot.command()
+@bot.hybrid_command()
 @commands.has_permissions(administrator=True)
 async def ticketpanel(ctx):
+    """Envia o painel de abertura de tickets de suporte."""
     guild_id = str(ctx.guild.id)
     
     if guild_id not in ticket_categories:
@@ -1106,10 +4603,7 @@ async def ticketpanel(ctx):
         title="🎫 Sistema de Suporte",
         description="**Precisa de ajuda?** Selecione o tipo de suporte!\n\n"
                    "**📋 Tipos disponíveis:**\n"
-                   f"{SUPPORT_TYPES['tecnico']['emoji']} **{SUPPORT_TYPES['tecnico']['name']}** - {SUPPORT_TYPES['tecnico']['description']}\n"
-                   f"{SUPPORT_TYPES['kommo']['emoji']} **{SUPPORT_TYPES['kommo']['name']}** - {SUPPORT_TYPES['kommo']['description']}\n"
-                   f"{SUPPORT_TYPES['rh']['emoji']} **{SUPPORT_TYPES['rh']['name']}** - {SUPPORT_TYPES['rh']['description']}\n"
-                   f"{SUPPORT_TYPES['gerencia']['emoji']} **{SUPPORT_TYPES['gerencia']['name']}** - {SUPPORT_TYPES['gerencia']['description']}\n\n"
+                   f"{registro_suporte(guild_id)['linhas_painel']}\n\n"
                    "✅ **Como funciona:**\n"
                    "• Selecione o tipo de suporte\n"
                    "• Preencha o formulário\n"
@@ -1120,73 +4614,259 @@ async def ticketpanel(ctx):
     )
     embed.set_footer(text="Selecione o tipo de suporte no menu abaixo")
     
-    await ctx.send(embed=embed, view=TicketSupportView())
+    await ctx.send(embed=embed, view=TicketSupportView(guild_id))
 
-@bot.command()
+@bot.hybrid_command()
 @commands.has_permissions(administrator=True)
-async def reclamacao(ctx):
-    canais = [c for c in ctx.guild.text_channels if c.permissions_for(ctx.guild.me).send_messages]
-    options = [SelectOption(label=c.name[:100], value=str(c.id)) for c in canais[:25]]
+async def tiposuporte(ctx, chave: str, cargo: discord.Role, emoji: str, nome: str, *, descricao: str = "Suporte especializado"):
+    """Adiciona ou edita um tipo de suporte (ex.: !tiposuporte rh @RH 👥 "Suporte RH" Questões de RH)."""
+    chave = chave.lower()
+    if not chave.replace("_", "").isalnum() or len(chave) > 20:
+        await ctx.send("❌ A chave deve ter até 20 letras/números (ex.: `rh`, `financeiro`)")
+        return
+    
+    tipos = registro_suporte(ctx.guild.id)["tipos"]
+    if chave not in tipos and len(tipos) >= MAX_TIPOS_SUPORTE:
+        await ctx.send(f"❌ Limite de {MAX_TIPOS_SUPORTE} tipos de suporte atingido")
+        return
+    
+    acao = "atualizado" if chave in tipos else "adicionado"
+    definir_tipo_suporte(ctx.guild.id, chave, {
+        "name": nome[:100],
+        "emoji": emoji,
+        "role_id": cargo.id,
+        "description": descricao[:100],
+    })
+    await ctx.send(f"✅ Tipo de suporte **{nome}** {acao} (cargo {cargo.mention}). Use `!ticketpanel` para atualizar o painel.")
 
-    class CanalSelect(Select):
-        def __init__(self):
-            super().__init__(placeholder="Canal para sugestões", options=options)
+@bot.hybrid_command()
+@commands.has_permissions(administrator=True)
+async def removertiposuporte(ctx, chave: str):
+    """Remove um tipo de suporte do servidor."""
+    chave = chave.lower()
+    tipos = registro_suporte(ctx.guild.id)["tipos"]
+    if chave not in tipos:
+        await ctx.send(f"❌ Tipo `{chave}` não encontrado")
+        return
+    if len(tipos) == 1:
+        await ctx.send("❌ O servidor precisa de pelo menos um tipo de suporte")
+        return
+    
+    definir_tipo_suporte(ctx.guild.id, chave, None)
+    await ctx.send(f"🗑️ Tipo `{chave}` removido. Use `!ticketpanel` para atualizar o painel.")
 
-        async def callback(self, interaction):
-            canal_id = int(self.values[0])
-            sugestao_channels[str(ctx.guild.id)] = canal_id
-            salvar_dados()
-            await interaction.response.send_message("✅ Canal configurado!", ephemeral=True)
-            
-            # Enviar painel de sugestões
-            embed = discord.Embed(
-                title="💡 Sistema de Sugestões",
-                description="**Tem uma sugestão para melhorar o servidor?**\n\n"
-                          "📝 **Como funciona:**\n"
-                          "• Clique em 'Enviar sugestão'\n"
-                          "• Escreva sua ideia\n"
-                          "• Sua sugestão será enviada anonimamente\n\n"
-                          "💭 **Seja construtivo e respeitoso!**",
-                color=discord.Color.orange()
+@bot.hybrid_command()
+async def tipossuporte(ctx):
+    """Lista os tipos de suporte configurados no servidor."""
+    tipos = registro_suporte(ctx.guild.id)["tipos"]
+    embed = discord.Embed(title="🎯 Tipos de Suporte", color=discord.Color.blue())
+    for chave, info in tipos.items():
+        embed.add_field(
+            name=f"{info['emoji']} {info['name']} (`{chave}`)",
+            value=f"{info['description']}\nCargo: <@&{info['role_id']}>",
+            inline=False
+        )
+    if ctx.guild and str(ctx.guild.id) not in tipos_suporte:
+        embed.set_footer(text="Usando os tipos padrão do bot")
+    await ctx.send(embed=embed)
+
+@bot.hybrid_command()
+@commands.has_permissions(administrator=True)
+async def limiteticket(ctx, limite: int):
+    """Define quantos tickets cada usuário pode ter abertos ao mesmo tempo."""
+    if not 1 <= limite <= 25:
+        await ctx.send("❌ Informe um limite entre 1 e 25")
+        return
+    
+    definir_config("ticket_limites", ctx.guild.id, limite)
+    await ctx.send(f"✅ Cada usuário pode ter até **{limite}** ticket(s) aberto(s)")
+
+@bot.hybrid_command()
+@commands.has_permissions(administrator=True)
+async def arquivos(ctx, membro: discord.User = None, tipo: str = None):
+    """Lista os tickets arquivados (filtros opcionais: usuário e tipo)."""
+    encontrados = tickets_arquivados(ctx.guild.id, membro.id if membro else None, tipo.lower() if tipo else None)
+    
+    if not encontrados:
+        await ctx.send("ℹ️ Nenhum ticket arquivado encontrado")
+        return
+    
+    embed = discord.Embed(title="🗄️ Tickets Arquivados", color=discord.Color.dark_grey())
+    linhas = []
+    for channel_id, ticket in encontrados[:15]:
+        fechado = (ticket.get("fechado_em") or ticket["criado_em"])[:10]
+        dono = f"<@{ticket['owner_id']}>" if ticket.get("owner_id") else "?"
+        linhas.append(f"`{channel_id}` • {fechado} • {ticket.get('tipo') or '-'} • {dono} • {ticket.get('total_mensagens', 0)} msgs")
+    embed.description = "\n".join(linhas)
+    embed.set_footer(text=f"{len(encontrados)} ticket(s) • Use !transcricao <id> para baixar")
+    await ctx.send(embed=embed)
+
+@bot.hybrid_command()
+@commands.has_permissions(administrator=True)
+async def transcricao(ctx, channel_id: str):
+    """Envia o arquivo de transcrição de um ticket arquivado."""
+    ticket = tickets.get(channel_id)
+    if not ticket or ticket["guild_id"] != str(ctx.guild.id) or not ticket.get("arquivo"):
+        await ctx.send("❌ Ticket arquivado não encontrado")
+        return
+    if not os.path.exists(ticket["arquivo"]):
+        await ctx.send("❌ Arquivo da transcrição não está mais no disco")
+        return
+    
+    nome = f"{ticket.get('nome_canal', channel_id)}.jsonl.gz"
+    await ctx.send(f"📄 Transcrição do ticket `{channel_id}`", file=discord.File(ticket["arquivo"], filename=nome))
+
+class BuscaView(View):
+    """Paginação dos resultados do !buscar."""
+    POR_PAGINA = 5
+    ICONES = {"ticket": "🎫", "transcricao": "🗄️", "sugestao": "💡"}
+
+    def __init__(self, autor, guild_id, termos):
+        super().__init__(timeout=120)
+        self.autor = autor
+        self.guild_id = guild_id
+        self.termos = termos
+        self.pagina = 0
+        self.total = 0
+
+    async def montar_embed(self):
+        inicio = time.perf_counter()
+        self.total, resultados = await indice_busca.buscar(self.guild_id, self.termos, self.pagina, self.POR_PAGINA)
+        duracao = (time.perf_counter() - inicio) * 1000
+        
+        paginas = max(1, ceil(self.total / self.POR_PAGINA))
+        embed = discord.Embed(title=f"🔎 Busca: {self.termos[:100]}", color=discord.Color.blurple())
+        if not resultados:
+            embed.description = "Nenhum resultado encontrado"
+        for tipo, referencia, titulo, trecho, autor_id, data in resultados:
+            local = referencia if tipo == "sugestao" else f"ticket `{referencia}`"
+            autor = f" • <@{autor_id}>" if autor_id else ""
+            embed.add_field(
+                name=f"{self.ICONES.get(tipo, '📄')} {titulo[:80] or tipo} • {data[:10]}",
+                value=f"{trecho[:300]}\n{local}{autor}",
+                inline=False
             )
-            embed.set_footer(text="Sistema de sugestões anônimas")
-            
-            await ctx.send(embed=embed, view=SugestaoView())
+        embed.set_footer(text=f"{self.total} resultado(s) • página {self.pagina + 1}/{paginas} • {duracao:.1f}ms")
+        
+        self.anterior.disabled = self.pagina == 0
+        self.proxima.disabled = self.pagina + 1 >= paginas
+        return embed
 
-    view = View()
-    view.add_item(CanalSelect())
-    await ctx.send("🔹 Escolha o canal para receber sugestões:", view=view)
+    async def interaction_check(self, interaction):
+        return interaction.user == self.autor
 
-@bot.command()
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary)
+    @medido_interacao("busca_anterior")
+    async def anterior(self, interaction: discord.Interaction, button: Button):
+        self.pagina = max(0, self.pagina - 1)
+        await interaction.response.edit_message(embed=await self.montar_embed(), view=self)
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary)
+    @medido_interacao("busca_proxima")
+    async def proxima(self, interaction: discord.Interaction, button: Button):
+        self.pagina += 1
+        await interaction.response.edit_message(embed=await self.montar_embed(), view=self)
+
+@bot.hybrid_command()
+@commands.has_permissions(administrator=True)
+async def buscar(ctx, *, termos: str):
+    """Busca em tickets, transcrições arquivadas e sugestões."""
+    view = BuscaView(ctx.author, ctx.guild.id, termos)
+    try:
+        embed = await view.montar_embed()
+    except sqlite3.Error as e:
+        await ctx.send(f"❌ Erro na busca: {e}")
+        return
+    await ctx.send(embed=embed, view=view)
+
+@bot.hybrid_command()
 @commands.has_permissions(administrator=True)
-async def clear(ctx):
-    class ConfirmarLimpeza(Button):
+async def reclamacao(ctx, canal: str = None):
+    """Configura o canal de sugestões e reclamações."""
+    def configurar(channel):
+        definir_config("sugestao_channels", ctx.guild.id, channel.id)
+        return "✅ Canal configurado!"
+    
+    async def enviar_painel():
+        # Enviar painel de sugestões
+        embed = discord.Embed(
+            title="💡 Sistema de Sugestões",
+            description="**Tem uma sugestão para melhorar o servidor?**\n\n"
+                      "📝 **Como funciona:**\n"
+                      "• Clique em 'Enviar sugestão'\n"
+                      "• Escreva sua ideia\n"
+                      "• Sua sugestão será enviada anonimamente\n\n"
+                      "💭 **Seja construtivo e respeitoso!**",
+            color=discord.Color.orange()
+        )
+        embed.set_footer(text="Sistema de sugestões anônimas")
+        await ctx.channel.send(embed=embed, view=SugestaoView())
+    
+    if canal is not None:
+        channel = resolver_canal(ctx.guild, canal)
+        if not channel:
+            await ctx.send("❌ Canal não encontrado (ou sem permissão de envio)")
+            return
+        await ctx.send(configurar(channel))
+        await enviar_painel()
+        return
+
+    class CanalSelect(discord.ui.ChannelSelect):
         def __init__(self):
-            super().__init__(label="Sim, limpar!", style=discord.ButtonStyle.danger)
+            super().__init__(placeholder="Canal para sugestões", channel_types=[discord.ChannelType.text])
 
-        async def callback(self, interaction: discord.Interaction):
-            if interaction.user != ctx.author:
-                await interaction.response.send_message("❌ Apenas o autor pode confirmar", ephemeral=True)
+        async def callback(self, interaction):
+            channel = resolver_canal(ctx.guild, str(self.values[0].id))
+            if not channel:
+                await interaction.response.send_message("❌ Não posso enviar mensagens nesse canal", ephemeral=True)
                 return
-
-            await interaction.response.send_message("🧹 Limpando...")
-            await asyncio.sleep(2)
-            await ctx.channel.purge()
-            
-            aviso = await ctx.send("✅ Canal limpo!")
-            await asyncio.sleep(3)
-            await aviso.delete()
+            await interaction.response.send_message(configurar(channel), ephemeral=True)
+            await enviar_painel()
 
     view = View()
-    view.add_item(ConfirmarLimpeza())
-    await ctx.send("⚠️ Limpar todas as mensagens?", view=view)
+    view.add_item(CanalSelect())
+    await ctx.send("🔹 Escolha o canal para receber sugestões:", view=view)
+
+@bot.hybrid_command()
+@commands.has_permissions(administrator=True)
+async def clear(ctx, *, filtros: FiltrosLimpeza):
+    """Apaga mensagens do canal, com filtros opcionais (pede confirmação).
+    
+    Ex.: !clear usuario: @fulano contem: spam depois: 01/05/2024 limite: 500
+    """
+    existente = limpezas_ativas.get(ctx.channel.id)
+    if existente and existente.tarefa and not existente.tarefa.done():
+        await ctx.send("⏳ Já existe uma limpeza em andamento neste canal")
+        return
+    
+    try:
+        limpeza = LimpezaCanal.dos_filtros(ctx.channel, ctx.author, filtros)
+    except commands.BadArgument as e:
+        await ctx.send(f"❌ {e}")
+        return
+    
+    descricao = limpeza.descricao_filtros()
+    texto = f"⚠️ Limpar as mensagens {descricao or 'todas'} de {ctx.channel.mention}?"
+    if not limpeza.filtrada():
+        texto += ("\n💡 Em canais grandes, **Clonar canal** recria o canal vazio na hora "
+                  "(perde as mensagens fixadas e os tópicos).")
+    await ctx.send(texto, view=ConfirmarLimpezaView(limpeza))
 
 @bot.command()
+@commands.has_permissions(administrator=True)
+async def sincronizar(ctx):
+    """Publica os comandos de barra (/) no Discord."""
+    comandos = await bot.tree.sync()
+    await ctx.send(f"✅ {len(comandos)} comando(s) de barra sincronizado(s)")
+
+@bot.hybrid_command()
 async def ping(ctx):
+    """Mostra a latência do bot."""
     await ctx.send(f"🏓 Pong! Latência: `{round(bot.latency * 1000)}ms`")
 
-@bot.command()
+@bot.hybrid_command()
 async def status(ctx):
+    """Mostra o status do bot."""
     embed = discord.Embed(title="🤖 Status do Bot", color=discord.Color.green())
     embed.add_field(name="📊 Status", value="✅ Online", inline=True)
     embed.add_field(name="🏓 Ping", value=f"{round(bot.latency * 1000)}ms", inline=True)
@@ -1194,12 +4874,16 @@ async def status(ctx):
     embed.add_field(name="👥 Usuários", value=len(bot.users), inline=True)
     embed.add_field(name="📋 Views", value="✅ Ativas" if views_registered else "❌ Inativas", inline=True)
     embed.add_field(name="🔒 Instância", value="✅ Única", inline=True)
+    embed.add_field(name="💾 Armazenamento", value=armazenamento.nome.upper(), inline=True)
+    embed.add_field(name="🧠 Perfil", value="Baixa memória" if PERFIL_BAIXA_MEMORIA else "Padrão", inline=True)
     embed.add_field(name="🎂 Aniversários", value="✅ Ativo" if verificar_aniversarios_task.is_running() else "❌ Inativo", inline=True)
+    embed.add_field(name="🚀 Inicialização", value=texto_inicializacao(), inline=False)
     
     await ctx.send(embed=embed)
 
-@bot.command(name="ajuda")
+@bot.hybrid_command(name="ajuda")
 async def ajuda(ctx):
+    """Lista os comandos do bot."""
     embed = discord.Embed(title="📖 Comandos do Bot", color=discord.Color.green())
     
     # Comandos de configuração
@@ -1207,10 +4891,17 @@ async def ajuda(ctx):
 `!cargo` - Configurar cargo automático
 `!setcargo` - Cargo para mencionar em tickets
 `!ticket` - Sistema de solicitação de cargos
+`!pedidos` - Pedidos de cargo pendentes
+`!aprovarpedidos <cargo>` - Aprovar pedidos em massa
 `!setupticket` - Configurar sistema de suporte
 `!ticketpanel` - Criar painel de tickets
+`!tiposuporte` / `!removertiposuporte` / `!tipossuporte` - Tipos de suporte
+`!limiteticket <n>` - Tickets abertos por usuário
+`!arquivos [@usuário] [tipo]` / `!transcricao <id>` - Tickets arquivados
+`!buscar <termos>` - Buscar em tickets e sugestões
 `!reclamacao` - Sistema de sugestões
 `!aniversario` - Configurar canal de aniversários
+`!horaaniversario <hora>` - Horário de envio dos aniversários
 """, inline=False)
     
     # Comandos de aniversário
@@ -1220,68 +4911,450 @@ async def ajuda(ctx):
 `!forceaniversario` - Forçar verificação (Admin)
 `!debuganiversarios` - Debug detalhado (Admin)
 `!carregarjson` - Recarregar dados (Admin)
+`!modeloaniversario [campo] [valor]` - Personalizar a mensagem de aniversário (Admin)
+`!importaraniversarios` / `!exportaraniversarios` - Importar/exportar CSV ou JSONL (Admin)
 """, inline=False)
     
     # Comandos utilitários
     embed.add_field(name="**🔧 Utilitários**", value="""
-`!clear` - Limpar canal
+`!clear [usuario:] [contem:] [antes:] [depois:] [bots:] [limite:]` - Limpar canal
 `!ping` - Testar latência
 `!status` - Status do bot
 `!debugjson` - Debug arquivo JSON (Admin)
+`!sincronizar` - Publicar os comandos de barra (Admin)
 """, inline=False)
     
-    embed.set_footer(text="Use !comando para executar • (Admin) = Apenas administradores")
+    embed.set_footer(text="Use !comando ou /comando para executar • (Admin) = Apenas administradores")
     
     await ctx.send(embed=embed)
 
+# Autocompletar dos comandos de barra
+cargo.autocomplete("cargo")(autocompletar_cargos)
+setcargo.autocomplete("cargo")(autocompletar_cargos)
+aprovarpedidos.autocomplete("cargo")(autocompletar_cargos)
+ticket.autocomplete("canal")(autocompletar_canais)
+aniversario.autocomplete("canal")(autocompletar_canais)
+reclamacao.autocomplete("canal")(autocompletar_canais)
+setupticket.autocomplete("categoria")(autocompletar_categorias)
+
+# ===== API ADMINISTRATIVA =====
+# Rotas /api do servidor HTTP (desativadas sem BOT_API_TOKEN). As requisições rodam nas threads do
+# servidor; tudo que toca o estado do bot é executado no event loop via run_coroutine_threadsafe.
+TEMPO_LIMITE_API = 15.0
+MAX_POR_PAGINA_API = 500
+SECOES_ID = frozenset({
+    "auto_roles", "ticket_response_channels", "mention_roles", "sugestao_channels",
+    "ticket_categories", "ticket_support_roles", "aniversario_channels",
+})
+SECOES_HORARIO = frozenset({"aniversario_horarios", "aniversario_channels"})
+
+class ErroAPI(Exception):
+    """Erro devolvido ao cliente da API como JSON com o status informado."""
+
+    def __init__(self, mensagem, status=400, detalhes=None):
+        super().__init__(mensagem)
+        self.status = status
+        self.detalhes = detalhes
+
+def chamar_no_loop(funcao, *args):
+    """Executa a função no event loop do bot e espera o resultado (chamado pelas threads do HTTP)."""
+    loop = bot.loop
+    if not isinstance(loop, asyncio.AbstractEventLoop) or not loop.is_running():
+        raise ErroAPI("bot ainda não está em execução", 503)
+    
+    async def executar():
+        return funcao(*args)
+    
+    futuro = asyncio.run_coroutine_threadsafe(executar(), loop)
+    try:
+        return futuro.result(TEMPO_LIMITE_API)
+    except TimeoutError:
+        futuro.cancel()
+        raise ErroAPI("tempo esgotado esperando o bot", 504)
+
+def validar_id(valor):
+    if isinstance(valor, bool) or not str(valor).isdigit():
+        raise ValueError(f"ID inválido: {valor!r}")
+    return int(valor)
+
+def validar_inteiro(valor, minimo, maximo):
+    if isinstance(valor, bool) or not isinstance(valor, int) or not minimo <= valor <= maximo:
+        raise ValueError(f"informe um inteiro entre {minimo} e {maximo}")
+    return valor
+
+def validar_tipos_suporte(tipos):
+    """Mesmas regras do !tiposuporte, para o conjunto inteiro de tipos."""
+    if not isinstance(tipos, dict) or not tipos:
+        raise ValueError("informe um objeto {chave: {name, emoji, role_id, description}} não vazio")
+    if len(tipos) > MAX_TIPOS_SUPORTE:
+        raise ValueError(f"limite de {MAX_TIPOS_SUPORTE} tipos de suporte")
+    
+    normalizados = {}
+    for chave, info in tipos.items():
+        chave = str(chave).lower()
+        if not chave.replace("_", "").isalnum() or len(chave) > 20:
+            raise ValueError(f"chave '{chave}' inválida (até 20 letras/números)")
+        if not isinstance(info, dict) or not info.get("name") or not info.get("emoji"):
+            raise ValueError(f"tipo '{chave}' precisa de name, emoji e role_id")
+        normalizados[chave] = {
+            "name": str(info["name"])[:100],
+            "emoji": str(info["emoji"]),
+            "role_id": validar_id(info.get("role_id")),
+            "description": str(info.get("description") or "Suporte especializado")[:100],
+        }
+    return normalizados
+
+def validar_modelo_aniversario(personalizado):
+    if not isinstance(personalizado, dict):
+        raise ValueError("informe um objeto com os campos do modelo")
+    desconhecidos = set(personalizado) - set(MODELO_ANIVERSARIO_PADRAO)
+    if desconhecidos:
+        raise ValueError(f"campos desconhecidos: {', '.join(sorted(desconhecidos))}")
+    try:
+        compilar_modelo_aniversario(personalizado)
+    except (TypeError, KeyError) as e:
+        raise ValueError(f"modelo inválido: {e}") from e
+    return personalizado or None
+
+def validar_config(secao, valor):
+    """Valida e normaliza o valor de uma seção de configuração (None remove); lança ValueError."""
+    if secao not in CONFIGS:
+        raise ValueError(f"seção '{secao}' desconhecida")
+    if valor is None:
+        return None
+    if secao in SECOES_ID:
+        return validar_id(valor)
+    if secao == "aniversario_horarios":
+        return validar_inteiro(valor, 0, 23)
+    if secao == "ticket_limites":
+        return validar_inteiro(valor, 1, 25)
+    if secao == "tipos_suporte":
+        return validar_tipos_suporte(valor)
+    return validar_modelo_aniversario(valor)
+
+def validar_alteracoes(alteracoes):
+    """Valida uma lista de {guild_id, secao, valor}; retorna as normalizadas ou lança ErroAPI com os erros."""
+    if not isinstance(alteracoes, list) or not alteracoes:
+        raise ErroAPI("informe uma lista de alterações {guild_id, secao, valor}")
+    
+    validas = []
+    erros = []
+    for posicao, alteracao in enumerate(alteracoes):
+        try:
+            if not isinstance(alteracao, dict) or "secao" not in alteracao:
+                raise ValueError("alteração precisa de guild_id, secao e valor")
+            guild_id = str(validar_id(alteracao.get("guild_id")))
+            secao = alteracao["secao"]
+            validas.append((guild_id, secao, validar_config(secao, alteracao.get("valor"))))
+        except ValueError as e:
+            erros.append({"posicao": posicao, "erro": str(e)})
+    if erros:
+        # Nada é aplicado se alguma alteração do lote for inválida
+        raise ErroAPI("alterações inválidas", detalhes=erros)
+    return validas
+
+def aplicar_alteracoes(alteracoes):
+    """Grava as alterações já validadas e invalida os caches afetados (roda no event loop)."""
+    reagendar = False
+    for guild_id, secao, valor in alteracoes:
+        definir_config(secao, guild_id, valor)
+        cache_tipos_suporte.pop(guild_id, None)
+        cache_modelos_aniversario.pop(guild_id, None)
+        reagendar = reagendar or secao in SECOES_HORARIO
+    if reagendar:
+        atualizar_horarios_aniversario()
+    return len(alteracoes)
+
+def config_do_servidor(guild_id):
+    return {secao: valores.get(guild_id) for secao, valores in CONFIGS.items()}
+
+def recarregar_config_api():
+    if gravador_dados.pendente():
+        raise ErroAPI("há alterações de configuração ainda não gravadas; tente novamente em instantes", 409)
+    return recarregar_config()
+
+def resumo_servidores():
+    return [
+        {"id": str(guild.id), "nome": guild.name, "membros": guild.member_count, "configurado": any(
+            str(guild.id) in valores for valores in CONFIGS.values()
+        )}
+        for guild in bot.guilds
+    ]
+
+def status_bot():
+    return {
+        "pronto": bot.is_ready(),
+        "latencia_ms": round(bot.latency * 1000, 1) if bot.is_ready() else None,
+        "servidores": len(bot.guilds),
+        "armazenamento": armazenamento.nome,
+        "tickets_abertos": sum(1 for ticket in tickets.values() if ticket.get("status") == "aberto"),
+        "pedidos_pendentes": sum(1 for pedido in pedidos_cargo.values() if pedido.get("status") == "pendente"),
+        "aniversarios": len(indice_aniversarios["dados"]),
+        "origem_aniversarios": indice_aniversarios["origem"],
+        "inicializacao": {fase: round(segundos, 3) for fase, segundos in tempos_inicializacao.items()},
+    }
+
+def aniversario_json(user_id, info):
+    return {
+        "user_id": user_id,
+        "nome": info.get("nome", ""),
+        "data_nascimento": info.get("data_nascimento", ""),
+        "link_foto": info.get("link_foto", ""),
+    }
+
+def listar_aniversarios(mes, pagina, por_pagina):
+    """Página dos aniversários (de um mês, ordenados por dia, ou todos); retorna (total, registros)."""
+    indice = atualizar_indice_aniversarios()
+    if mes:
+        registros = [(r["user_id"], indice["dados"][r["user_id"]]) for r in indice["por_mes"].get(mes, [])]
+    else:
+        registros = list(indice["dados"].items())
+    inicio = (pagina - 1) * por_pagina
+    return len(registros), [aniversario_json(user_id, info) for user_id, info in registros[inicio:inicio + por_pagina]]
+
+def buscar_aniversario(user_id):
+    info = atualizar_indice_aniversarios()["dados"].get(user_id)
+    return aniversario_json(user_id, info) if info else None
+
+def gravar_aniversarios_api(registros, remover):
+    """Valida e grava o lote (fora do event loop, como a importação); retorna (gravados, removidos, erros)."""
+    validos = {}
+    erros = []
+    for posicao, registro in enumerate(registros):
+        try:
+            user_id, dados = validar_aniversario(registro)
+        except ValueError as e:
+            erros.append({"posicao": posicao, "erro": str(e)})
+            continue
+        validos[user_id] = dados
+    
+    ids_remover = []
+    for posicao, user_id in enumerate(remover):
+        if not str(user_id).isdigit():
+            erros.append({"posicao": posicao, "erro": f"remover: user_id inválido '{user_id}'"})
+            continue
+        ids_remover.append(str(user_id))
+    
+    gravacao = armazenamento.salvar_aniversarios(validos) if validos else None
+    remocao = armazenamento.remover_aniversarios(ids_remover) if ids_remover else []
+    if gravacao is not None:
+        gravacao.result()
+    # JSON devolve a lista dos removidos; SQLite, o Future com a contagem do DELETE
+    removidos = len(remocao) if isinstance(remocao, list) else remocao.result()
+    # O índice percebe a mudança da origem e é recarregado no próximo uso
+    return len(validos), removidos, erros
+
+def filtrar_tickets(guild_id, status, owner_id):
+    return [
+        {"channel_id": channel_id, **ticket}
+        for channel_id, ticket in tickets.items()
+        if (guild_id is None or ticket.get("guild_id") == guild_id)
+        and (status is None or ticket.get("status") == status)
+        and (owner_id is None or str(ticket.get("owner_id")) == owner_id)
+    ]
+
+def registrar_api(app):
+    """Adiciona as rotas /api ao app do servidor HTTP."""
+    from flask import jsonify, request
+    
+    token = os.getenv("BOT_API_TOKEN", "")
+    if not token:
+        log.info("ℹ️ API administrativa desativada (defina BOT_API_TOKEN para ativar)")
+    
+    def corpo_json():
+        corpo = request.get_json(silent=True)
+        if corpo is None:
+            raise ErroAPI("corpo da requisição deve ser JSON")
+        return corpo
+    
+    def argumento_inteiro(nome, padrao=None, minimo=1, maximo=None):
+        valor = request.args.get(nome)
+        if valor is None:
+            return padrao
+        try:
+            return validar_inteiro(int(valor), minimo, maximo or sys.maxsize)
+        except ValueError:
+            raise ErroAPI(f"parâmetro '{nome}' inválido")
+    
+    @app.before_request
+    def autenticar():
+        if not request.path.startswith("/api/"):
+            return None
+        if not token:
+            raise ErroAPI("API desativada", 404)
+        enviado = request.headers.get("Authorization", "").removeprefix("Bearer ")
+        if not hmac.compare_digest(enviado.encode(), token.encode()):
+            raise ErroAPI("não autorizado", 401)
+        return None
+    
+    @app.after_request
+    def contar_requisicao(resposta):
+        if request.path.startswith("/api/"):
+            metricas.incrementar("bot_api_requisicoes_total", (request.method, str(resposta.status_code)))
+        return resposta
+    
+    @app.errorhandler(ErroAPI)
+    def erro_api(erro):
+        corpo = {"erro": str(erro)}
+        if erro.detalhes:
+            corpo["detalhes"] = erro.detalhes
+        return jsonify(corpo), erro.status
+    
+    @app.get("/api/status")
+    def rota_status():
+        return jsonify(chamar_no_loop(status_bot))
+    
+    @app.get("/api/servidores")
+    def rota_servidores():
+        return jsonify(chamar_no_loop(resumo_servidores))
+    
+    @app.get("/api/servidores/<int:guild_id>/config")
+    def rota_config(guild_id):
+        return jsonify(chamar_no_loop(config_do_servidor, str(guild_id)))
+    
+    @app.patch("/api/servidores/<int:guild_id>/config")
+    def rota_alterar_config(guild_id):
+        corpo = corpo_json()
+        if not isinstance(corpo, dict) or not corpo:
+            raise ErroAPI("informe um objeto {secao: valor} (null remove a configuração)")
+        alteracoes = validar_alteracoes([{"guild_id": guild_id, "secao": s, "valor": v} for s, v in corpo.items()])
+        chamar_no_loop(aplicar_alteracoes, alteracoes)
+        return jsonify(chamar_no_loop(config_do_servidor, str(guild_id)))
+    
+    @app.post("/api/config/lote")
+    def rota_config_lote():
+        alteracoes = validar_alteracoes(corpo_json())
+        return jsonify({"aplicadas": chamar_no_loop(aplicar_alteracoes, alteracoes)})
+    
+    @app.post("/api/config/recarregar")
+    def rota_recarregar():
+        return jsonify({"servidores": chamar_no_loop(recarregar_config_api)})
+    
+    @app.get("/api/aniversarios")
+    def rota_aniversarios():
+        mes = argumento_inteiro("mes", maximo=12)
+        pagina = argumento_inteiro("pagina", 1)
+        por_pagina = argumento_inteiro("por_pagina", 100, maximo=MAX_POR_PAGINA_API)
+        total, registros = chamar_no_loop(listar_aniversarios, mes, pagina, por_pagina)
+        return jsonify({"total": total, "pagina": pagina, "aniversarios": registros})
+    
+    @app.get("/api/aniversarios/<int:user_id>")
+    def rota_aniversario(user_id):
+        registro = chamar_no_loop(buscar_aniversario, str(user_id))
+        if registro is None:
+            raise ErroAPI("aniversário não encontrado", 404)
+        return jsonify(registro)
+    
+    @app.post("/api/aniversarios/lote")
+    def rota_aniversarios_lote():
+        corpo = corpo_json()
+        registros = corpo.get("aniversarios", []) if isinstance(corpo, dict) else None
+        remover = corpo.get("remover", []) if isinstance(corpo, dict) else None
+        if not isinstance(registros, list) or not isinstance(remover, list) or not (registros or remover):
+            raise ErroAPI("informe {aniversarios: [{user_id, nome, data_nascimento, link_foto}], remover: [user_id]}")
+        gravados, removidos, erros = gravar_aniversarios_api(registros, remover)
+        return jsonify({"gravados": gravados, "removidos": removidos, "erros": erros})
+    
+    @app.get("/api/tickets")
+    def rota_tickets():
+        filtros = (request.args.get("guild_id"), request.args.get("status"), request.args.get("owner_id"))
+        return jsonify(chamar_no_loop(filtrar_tickets, *filtros))
+    
+    @app.get("/api/tickets/<int:channel_id>")
+    def rota_ticket(channel_id):
+        ticket = chamar_no_loop(lambda: dict(tickets.get(str(channel_id)) or {}))
+        if not ticket:
+            raise ErroAPI("ticket não encontrado", 404)
+        return jsonify({"channel_id": str(channel_id), **ticket})
+
 # ===== ERROR HANDLING =====
 @bot.event
 async def on_command_error(ctx, error):
+    if ctx.command is not None:
+        metricas.incrementar("bot_erros_total", ("comando", ctx.command.qualified_name))
+    
     if isinstance(error, commands.MissingPermissions):
         await ctx.send("❌ Você não tem permissão para usar este comando")
     elif isinstance(error, commands.CommandNotFound):
         pass  # Ignorar comandos não encontrados
     else:
-        print(f"❌ Erro no comando: {error}")
+        log_comandos.error(f"❌ Erro no comando: {error}", exc_info=error, extra={
+            "comando": ctx.command.qualified_name if ctx.command else None,
+            "guild_id": ctx.guild.id if ctx.guild else None,
+            "user_id": ctx.author.id,
+        })
         await ctx.send("❌ Ocorreu um erro interno. Tente novamente.")
 
 # ===== CLEANUP ON EXIT =====
+recursos_liberados = False  # Chamado pelo finally do main e pelo atexit: só a primeira vez limpa
+
 def cleanup_on_exit():
     """Limpa recursos ao sair."""
+    global recursos_liberados
+    if recursos_liberados:
+        return
+    recursos_liberados = True
+    
+    salvar_controle_mensagens()
+    armazenamento.fechar()
+    indice_busca.fechar()
+    for gravador in (cache_fotos.gravador, gravador_limpezas):
+        if gravador.pendente():
+            gravador.gravar_agora()
+    
     try:
         if 'lock_socket' in globals():
             lock_socket.close()
-        print("🧹 Recursos limpos")
+        log.info("🧹 Recursos limpos")
     except:
         pass
+    
+    parar_logging()
 
 import atexit
 atexit.register(cleanup_on_exit)
 
 # ===== MAIN =====
+async def iniciar_bot(token):
+    """Login e carga dos dados em paralelo; o gateway só conecta com a configuração em memória."""
+    async with bot:
+        carga = asyncio.create_task(carregar_dados_async())
+        try:
+            await bot.login(token)
+        finally:
+            await carga
+        await bot.connect()
+
 if __name__ == "__main__":
+    # Importação/exportação de aniversários pela linha de comando (sem iniciar o bot)
+    if len(sys.argv) > 1 and sys.argv[1] in COMANDOS_CLI:
+        sys.exit(executar_cli(sys.argv[1:]))
+    
+    marcar_inicializacao("importacao")
+    
     try:
-        print("🚀 Iniciando Bot Bmz Server...")
-        print(f"🔒 PID: {os.getpid()}")
+        # Criar lock de instância única ANTES de iniciar o bot
+        lock_socket = get_single_instance_lock()
         
-        # Carregar dados
-        carregar_dados()
+        log.info(f"🚀 Iniciando Bot Bmz Server... (PID {os.getpid()})")
         
-        # Carregar token
+        # Carregar token (o .env também pode trazer o BOT_API_TOKEN)
         load_dotenv()
         TOKEN = os.getenv("DISCORD_TOKEN")
         
         if not TOKEN:
-            print("❌ Token não encontrado no .env")
+            log.error("❌ Token não encontrado no .env")
             sys.exit(1)
         
+        iniciar_servidor_http()
+        
         # Iniciar bot
-        bot.run(TOKEN)
+        asyncio.run(iniciar_bot(TOKEN))
         
     except KeyboardInterrupt:
-        print("\n🛑 Bot interrompido pelo usuário")
+        log.info("🛑 Bot interrompido pelo usuário")
     except Exception as e:
-        print(f"❌ Erro fatal: {e}")
+        log.error(f"❌ Erro fatal: {e}")
     finally:
         cleanup_on_exit()
         sys.exit(0)
\ No newline at end of file